@@ -0,0 +1,107 @@
+import hashlib
+import hmac
+import secrets
+import time
+
+import jwt  # PyJWT
+from cryptography.hazmat.primitives import serialization
+
+SUPPORTED_ALGS = ("HS256", "ES256")
+
+
+def parse_key_spec(spec: str):
+    """
+    "kid1=value1,kid2=value2" -> [(kid, value)]. The first key signs new
+    tokens; the rest only verify, so a rotated-out key keeps validating the
+    tokens it issued until they expire.
+    """
+    keys = []
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        kid, sep, value = part.partition("=")
+        if not sep or not kid or not value:
+            raise ValueError(f"access token key entry must be kid=value: {part!r}")
+        keys.append((kid.strip(), value.strip()))
+    return keys
+
+
+def _load_es256_key(value: str):
+    """PEM file path (private key to sign, or public key to verify only)."""
+    with open(value, "rb") as f:
+        pem = f.read()
+    if b"PRIVATE KEY" in pem:
+        return serialization.load_pem_private_key(pem, password=None)
+    return serialization.load_pem_public_key(pem)
+
+
+class AccessTokenSigner:
+    """
+    Self-contained OID4VCI access tokens: compact JWTs (typ at+jwt) carrying
+    iss, aud, iat, exp, jti and config_id, signed with HS256 or ES256. Any
+    worker holding the keys can validate them without shared state. Keys are
+    looked up by the kid header; the first configured key signs.
+    """
+
+    def __init__(self, alg, keys, issuer, ttl=600, leeway=5):
+        if alg not in SUPPORTED_ALGS:
+            raise ValueError(f"Unsupported access token algorithm: {alg}")
+        if not keys:
+            raise ValueError("at least one access token key is required")
+        self.alg = alg
+        self.issuer = issuer
+        self.ttl = ttl
+        self.leeway = leeway
+        self.signing_kid, signing_key = keys[0]
+        self._verify_keys = {}
+        for kid, key in keys:
+            if alg == "ES256":
+                key = _load_es256_key(key) if isinstance(key, str) else key
+                self._verify_keys[kid] = key.public_key() if hasattr(key, "public_key") else key
+            else:
+                key = key.encode() if isinstance(key, str) else key
+                if len(key) < 32:
+                    raise ValueError(f"HS256 access token key {kid!r} must be at least 32 bytes")
+                self._verify_keys[kid] = key
+        if alg == "ES256":
+            signing_key = _load_es256_key(signing_key) if isinstance(signing_key, str) else signing_key
+            if not hasattr(signing_key, "sign"):
+                raise ValueError("the first ES256 access token key must be a private key")
+            self._signing_key = signing_key
+        else:
+            self._signing_key = self._verify_keys[self.signing_kid]
+
+    @classmethod
+    def from_config(cls, alg, key_spec, issuer, ttl=600, fallback_secret=None):
+        """Build from ACCESS_TOKEN_ALG / ACCESS_TOKEN_KEYS; HS256 falls back to a key derived from SECRET_KEY."""
+        keys = parse_key_spec(key_spec)
+        if not keys and alg == "HS256" and fallback_secret:
+            derived = hmac.new(fallback_secret.encode(), b"oid4vci-access-token", hashlib.sha256).hexdigest()
+            keys = [("default", derived)]
+        return cls(alg, keys, issuer, ttl=ttl)
+
+    def mint(self, config_id: str) -> str:
+        now = int(time.time())
+        claims = {
+            "iss": self.issuer,
+            "aud": self.issuer,
+            "iat": now,
+            "exp": now + self.ttl,
+            "jti": secrets.token_urlsafe(16),
+            "config_id": config_id,
+        }
+        return jwt.encode(claims, self._signing_key, algorithm=self.alg,
+                          headers={"kid": self.signing_kid, "typ": "at+jwt"})
+
+    def verify(self, token: str):
+        """Return the claims of a valid token, or None."""
+        try:
+            header = jwt.get_unverified_header(token)
+            key = self._verify_keys.get(header.get("kid"))
+            if key is None or header.get("typ") != "at+jwt":
+                return None
+            return jwt.decode(token, key, algorithms=[self.alg], audience=self.issuer, issuer=self.issuer,
+                              leeway=self.leeway, options={"require": ["exp", "iat", "config_id"]})
+        except jwt.PyJWTError:
+            return None
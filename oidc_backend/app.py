@@ -19,6 +19,8 @@ from pycose.keys.curves import P256
 # pymdoccbor helper
 from pymdoccbor.mdoc.issuer import MdocCborIssuer
 
+from token_store import MemoryTokenStore
+
 app = Flask(__name__)
 
 # ---------------------------------------------------------------------
@@ -29,10 +31,11 @@ CONFIG_ID = "org.iso.18013.5.1.mDL"            # supported configuration id
 ALG_COSE = -7                                  # ES256 (COSE numeric)
 ALG_JOSE = "ES256"                             # ES256 (JOSE string)
 
-# In-memory stores (use Redis/DB in production)
-PRE_AUTH_CODES = {}    # code -> {"config_id": str, "created": int}
-ACCESS_TOKENS = {}     # token -> {"expires": int}
-NONCES = {}            # c_nonce -> expires_at
+# In-memory TTL store (use app_with_db.py's postgres/redis backends in production):
+#   pre_auth_code: code -> {"config_id": str, "created": int}
+#   access_token:  token -> {"expires": int}
+#   c_nonce:       nonce -> expires_at
+TOKENS = MemoryTokenStore()
 
 # ---------------------------------------------------------------------
 # Demo issuer key (static; replace with KMS/HSM in prod)
@@ -112,9 +115,9 @@ def verify_jwt_proof(proof_jwt: str, aud: str):
     claims = jwt.decode(proof_jwt, key=pem, algorithms=[ALG_JOSE], audience=aud)
     now = int(time.time())
     nonce = claims.get("nonce")
-    if not nonce or nonce not in NONCES or NONCES[nonce] < now:
+    expires_at = TOKENS.consume("c_nonce", nonce) if nonce else None  # one-time use
+    if expires_at is None or expires_at < now:
         raise ValueError("nonce invalid/expired")
-    del NONCES[nonce]  # one-time use
     return holder_jwk, claims
 
 def _selfsigned_cert_der_ec(priv_key, cn="Demo DS (not for prod)", days=365) -> bytes:
@@ -275,7 +278,7 @@ def openid4vci_meta():
 @app.post("/offer")
 def offer():
     code = secrets.token_urlsafe(24)
-    PRE_AUTH_CODES[code] = {"config_id": CONFIG_ID, "created": int(time.time())}
+    TOKENS.put("pre_auth_code", code, {"config_id": CONFIG_ID, "created": int(time.time())}, 600)
     offer_obj = {
         "credential_issuer": ISSUER,
         "credential_configuration_ids": [CONFIG_ID],
@@ -296,12 +299,11 @@ def token():
     if gt != "urn:ietf:params:oauth:grant-type:pre-authorized_code":
         return jsonify({"error": "unsupported_grant_type"}), 400
     code = request.form.get("pre-authorized_code")
-    if not code or code not in PRE_AUTH_CODES:
+    if not code or TOKENS.consume("pre_auth_code", code) is None:  # single-use
         return jsonify({"error": "invalid_grant"}), 400
-    del PRE_AUTH_CODES[code]  # single-use
 
     access_token = secrets.token_urlsafe(32)
-    ACCESS_TOKENS[access_token] = {"expires": int(time.time()) + 600}
+    TOKENS.put("access_token", access_token, {"expires": int(time.time()) + 600}, 600)
     return jsonify({"access_token": access_token, "token_type": "Bearer", "expires_in": 600})
 
 # ---------------------------------------------------------------------
@@ -310,7 +312,7 @@ def token():
 @app.post("/nonce")
 def nonce():
     c_nonce = secrets.token_urlsafe(24)
-    NONCES[c_nonce] = int(time.time()) + 180
+    TOKENS.put("c_nonce", c_nonce, int(time.time()) + 180, 180)
     return jsonify({"c_nonce": c_nonce})
 
 def _require_bearer():
@@ -318,7 +320,7 @@ def _require_bearer():
     if not auth.startswith("Bearer "):
         return None
     token = auth.split(" ", 1)[1]
-    info = ACCESS_TOKENS.get(token)
+    info = TOKENS.get("access_token", token)
     if not info or info["expires"] < int(time.time()):
         return None
     return token
@@ -483,9 +485,9 @@ REQUEST_CREDENTIAL_HTML = """
 def request_credential():
     out = None
     if request.method == "POST":
-        # 1) Offer
+        # 1) Offer (the demo walks the flow inline, so the code, token and
+        #    nonce below are never redeemed and are not stored)
         code = secrets.token_urlsafe(24)
-        PRE_AUTH_CODES[code] = {"config_id": CONFIG_ID, "created": int(time.time())}
         offer = {
             "credential_issuer": ISSUER,
             "credential_configuration_ids": [CONFIG_ID],
@@ -493,10 +495,8 @@ def request_credential():
         }
         # 2) Token
         access_token = secrets.token_urlsafe(32)
-        ACCESS_TOKENS[access_token] = {"expires": int(time.time()) + 600}
         # 3) Nonce
         c_nonce = secrets.token_urlsafe(24)
-        NONCES[c_nonce] = int(time.time()) + 180
         # 4) Proof
         holder_priv = ec.generate_private_key(ec.SECP256R1())
         holder_pub = holder_priv.public_key().public_numbers()
@@ -694,9 +694,8 @@ def form_credential():
             "kid": "demo-holder"
         }
 
-        # 2. Get nonce
+        # 2. Get nonce (only embedded in the self-issued proof, so not stored)
         nonce = secrets.token_urlsafe(24)
-        NONCES[nonce] = int(time.time()) + 180
 
         # 3. Create proof JWT
         proof_header = {"typ": "openid4vci-proof+jwt", "alg": ALG_JOSE, "jwk": holder_jwk}
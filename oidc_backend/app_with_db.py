@@ -1,17 +1,20 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, request, jsonify, render_template_string, Response, stream_with_context, g
 from flask_cors import CORS
-import base64, cbor2, datetime, hashlib, os, secrets, time, json
+from werkzeug.middleware.proxy_fix import ProxyFix
+import base64, cbor2, datetime, hashlib, hmac, os, random, secrets, time, json
 from cbor2 import CBORTag
 import re
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import insert, update, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DataError, IntegrityError
+from sqlalchemy.orm import Session
 
 import jwt  # PyJWT
 from cryptography.hazmat.primitives.asymmetric import ec
 from cryptography.hazmat.primitives import serialization
 
-from cryptography import x509
-from cryptography.x509 import NameOID
-from cryptography.hazmat.primitives import hashes
-import tempfile
 
 # COSE (for verification UI)
 from pycose.messages import Sign1Message
@@ -23,8 +26,24 @@ from pymdoccbor.mdoc.issuer import MdocCborIssuer
 
 # Database imports
 from config import config
-from database import init_db, get_db_session
+from database import init_db, get_db_session, db
 from models import Credential, VerificationLog
+from ds_cert import DSCertificateManager
+from mdoc_builder import NativeMdocIssuer
+from signing_service import SigningService
+from key_pool import HolderKeyPool
+from deferred import DeferredIssuanceQueue, QueueFull, DONE, FAILED
+from stage_timing import StageTimings, server_timing_header
+from idempotency import IdempotencyStore, idempotent
+from mdoc_decoder import decode_mdoc, verify_digests, verify_issuer_auth, UnsupportedSign1
+from log_writer import BatchLogWriter
+from ttl_cache import LRUTTLCache
+from trust_store import TrustStore
+from token_store import create_token_store
+from access_tokens import AccessTokenSigner
+from nonces import StatelessNonces, StoreReplayFilter, TimeBucketedReplayFilter
+from pagination import InvalidCursor, count_rows, keyset_page
+from rate_limit import RateLimiter, ConcurrencyLimiter, parse_rate_limits, rate_limited, admission_controlled
 
 app = Flask(__name__)
 
@@ -34,9 +53,34 @@ CORS(app, origins=["http://localhost:4200", re.compile(r"https://.*\.ngrok-free\
 # Load configuration
 app.config.from_object(config['development'])
 
+# Behind nginx, take the client address from the X-Forwarded-For entries the
+# trusted proxies appended (PROXY_FIX_X_FOR hops; 0 = not behind a proxy)
+if app.config.get('PROXY_FIX_X_FOR', 0):
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'],
+                            x_proto=app.config['PROXY_FIX_X_FOR'])
+
 # Initialize database
 init_db(app)
 
+# Per-stage timings of the issuance pipelines (histograms at /api/metrics/stages)
+STAGE_TIMINGS = StageTimings()
+SERVER_TIMING = app.config.get('SERVER_TIMING', False)
+
+@app.before_request
+def _begin_stage_timing():
+    g.request_started_ns = time.perf_counter_ns()
+    STAGE_TIMINGS.begin_request()
+
+@app.after_request
+def _add_server_timing(response):
+    stages = STAGE_TIMINGS.request_stages()
+    if stages and request.endpoint:
+        total_ns = time.perf_counter_ns() - g.request_started_ns
+        if SERVER_TIMING:
+            response.headers['Server-Timing'] = server_timing_header(stages, total_ns)
+        STAGE_TIMINGS.record(f"{request.endpoint}.total", total_ns)
+    return response
+
 # ---------------------------------------------------------------------
 # Config (demo)
 # ---------------------------------------------------------------------
@@ -44,11 +88,67 @@ ISSUER = app.config.get('ISSUER', "https://issuer.example.com")
 CONFIG_ID = app.config.get('CONFIG_ID', "org.issuance-vc.bank.account.mDL")
 ALG_COSE = app.config.get('ALG_COSE', -7)
 ALG_JOSE = app.config.get('ALG_JOSE', "ES256")
-
-# In-memory stores (use Redis/DB in production)
-PRE_AUTH_CODES = {}    # code -> {"config_id": str, "created": int}
-ACCESS_TOKENS = {}     # token -> {"expires": int}
-NONCES = {}            # c_nonce -> expires_at
+MDOC_BUILDER = app.config.get('MDOC_BUILDER', 'pymdoccbor')
+BATCH_CREDENTIAL_ISSUANCE_SIZE = app.config.get('BATCH_CREDENTIAL_ISSUANCE_SIZE', 10)
+DEFERRED_ISSUANCE = app.config.get('DEFERRED_ISSUANCE', 'off')
+DEFERRED_RETRY_INTERVAL = app.config.get('DEFERRED_RETRY_INTERVAL', 5)
+
+# OID4VCI state shared by all workers (TOKEN_STORE_BACKEND: memory, postgres, redis):
+#   pre_auth_code: code -> {"config_id": str, "created": int}
+#   access_token:  sha256(token) -> {"expires": int}
+#   used_nonce:    nonce tag -> 1 (NONCE_REPLAY_FILTER=store, the default)
+_TOKENS = create_token_store(
+    app.config.get('TOKEN_STORE_BACKEND', 'postgres'),
+    session_factory=lambda: Session(db.engine),
+    url=app.config.get('TOKEN_STORE_URL'),
+    prefix=app.config.get('TOKEN_STORE_PREFIX', 'oid4vci:'),
+    max_entries=app.config.get('TOKEN_STORE_MAX_ENTRIES', 100000),
+    shards=app.config.get('TOKEN_STORE_SHARDS', 16)
+)
+PRE_AUTH_CODE_TTL = app.config.get('PRE_AUTH_CODE_TTL', 600)
+ACCESS_TOKEN_TTL = app.config.get('ACCESS_TOKEN_TTL', 600)
+C_NONCE_TTL = app.config.get('C_NONCE_TTL', 180)
+
+# c_nonces are self-validating (issue time + HMAC) and accepted by any worker,
+# so their single use must be tracked where every worker sees it: the token
+# store. NONCE_REPLAY_FILTER=local keeps it in this process (single worker only).
+_nonce_secrets = [x.strip() for x in (app.config.get('NONCE_SECRETS') or '').split(',') if x.strip()] or \
+    [hmac.new(app.config['SECRET_KEY'].encode(), b"oid4vci-c-nonce", hashlib.sha256).hexdigest()]
+NONCE_REPLAY_FILTER = app.config.get('NONCE_REPLAY_FILTER', 'store')
+if NONCE_REPLAY_FILTER not in ('store', 'local'):
+    raise ValueError(f"Unknown NONCE_REPLAY_FILTER: {NONCE_REPLAY_FILTER}")
+_NONCES = StatelessNonces(
+    _nonce_secrets,
+    C_NONCE_TTL,
+    StoreReplayFilter(_TOKENS) if NONCE_REPLAY_FILTER == 'store' else TimeBucketedReplayFilter(C_NONCE_TTL)
+)
+
+# ACCESS_TOKEN_FORMAT=jwt: self-contained signed access tokens, validated by
+# any worker without the token store (opaque tokens live in the store)
+ACCESS_TOKEN_FORMAT = app.config.get('ACCESS_TOKEN_FORMAT', 'opaque')
+_ACCESS_TOKEN_SIGNER = AccessTokenSigner.from_config(
+    app.config.get('ACCESS_TOKEN_ALG', 'HS256'),
+    app.config.get('ACCESS_TOKEN_KEYS'),
+    ISSUER,
+    ttl=ACCESS_TOKEN_TTL,
+    fallback_secret=app.config.get('SECRET_KEY')
+) if ACCESS_TOKEN_FORMAT == 'jwt' else None
+
+# Per-client token buckets for the OID4VCI endpoints (RATE_LIMITS) and a cap
+# on concurrent /credential requests, both kept in the token store so every
+# worker sharing its backend enforces the same budget
+_RATE_LIMITER = RateLimiter(_TOKENS, parse_rate_limits(app.config.get('RATE_LIMITS')))
+_CREDENTIAL_ADMISSION = ConcurrencyLimiter(
+    _TOKENS,
+    app.config.get('CREDENTIAL_MAX_CONCURRENCY', 16),
+    lease=app.config.get('CREDENTIAL_SLOT_LEASE_SECONDS', 120),
+    wait=app.config.get('CREDENTIAL_ADMISSION_WAIT', 0.25)
+)
+CREDENTIAL_RETRY_AFTER = app.config.get('CREDENTIAL_RETRY_AFTER', 1)
+
+def _rate_limit_client() -> str:
+    """Bucket by client address (set from X-Forwarded-For by ProxyFix behind a proxy)."""
+    return f"ip:{request.remote_addr}"
 
 # ---------------------------------------------------------------------
 # Demo issuer key (static; replace with KMS/HSM in prod)
@@ -64,7 +164,6 @@ _ISSUER_D = _issuer_d_int.to_bytes(32, "big")
 
 # COSE keys for verification UI
 _ISSUER_SIGN_KEY = EC2Key(crv=P256, x=_ISSUER_X, y=_ISSUER_Y, d=_ISSUER_D)
-_ISSUER_VERIFY_KEY = EC2Key(crv=P256, x=_ISSUER_X, y=_ISSUER_Y)  # public only
 
 # pymdoccbor expects COSE-like dict for the private key
 ISSUER_PKEY = {
@@ -75,6 +174,66 @@ ISSUER_PKEY = {
     "KID": b"issuer-demo-kid"  # optional
 }
 
+# Self-signed DS certificate for the issuer key: created once, cached in memory
+_DS_CERTS = DSCertificateManager(
+    _crypto_priv,
+    cert_dir=app.config.get('DS_CERT_DIR'),
+    validity_days=app.config.get('DS_CERT_VALIDITY_DAYS', 365),
+    rotate_days=app.config.get('DS_CERT_ROTATE_DAYS', 30)
+)
+
+# Issuer keys accepted by the verifiers: our own DS certificate (rotated
+# certificates chain to it, being signed by the same key), the demo kid, and
+# any anchors in TRUST_ANCHOR_DIR. Credentials without kid/x5chain fall back
+# to the demo issuer key unless TRUST_ALLOW_UNIDENTIFIED is off.
+_TRUST_STORE = TrustStore(
+    chain_cache_size=app.config.get('TRUST_CHAIN_CACHE_SIZE', 1000),
+    chain_cache_ttl=app.config.get('TRUST_CHAIN_CACHE_TTL_SECONDS', 3600)
+)
+_TRUST_STORE.add_anchor(_DS_CERTS.current().der)
+_issuer_trusted_key = _TRUST_STORE.add_key(ISSUER_PKEY["KID"], _crypto_pub, source="issuer")
+if app.config.get('TRUST_ALLOW_UNIDENTIFIED', True):
+    _TRUST_STORE.default_key = _issuer_trusted_key
+if app.config.get('TRUST_ANCHOR_DIR'):
+    _TRUST_STORE.load_anchor_dir(app.config['TRUST_ANCHOR_DIR'])
+
+# Signing executor (SIGNING_POOL_WORKERS > 0 moves ECDSA work to a process pool)
+_SIGNER = SigningService(
+    ISSUER_D_HEX,
+    workers=app.config.get('SIGNING_POOL_WORKERS', 0),
+    timeout=app.config.get('SIGNING_TIMEOUT', 30),
+    start_method=app.config.get('SIGNING_POOL_START_METHOD', 'forkserver')
+)
+
+# Fan-out for interactive OID4VCI work (proof verification, mdoc builds of
+# one /credential request); the signing itself goes through _SIGNER
+_ISSUANCE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=app.config.get('ISSUANCE_WORKERS', 4),
+    thread_name_prefix='issuance'
+)
+# Bulk issuance has its own, smaller pool: a 500-item chunk queues here, not
+# ahead of wallets, and at most BATCH_ISSUANCE_WORKERS of its builds are in
+# flight (and competing for _SIGNER) at any time
+_BATCH_ISSUANCE_EXECUTOR = ThreadPoolExecutor(
+    max_workers=app.config.get('BATCH_ISSUANCE_WORKERS', 2),
+    thread_name_prefix='batch-issuance'
+)
+
+# In-process mdoc builder (MDOC_BUILDER=native); same output as pymdoccbor
+_NATIVE_MDOC_ISSUER = NativeMdocIssuer(
+    _crypto_priv, _DS_CERTS, alg=ALG_JOSE,
+    signer=STAGE_TIMINGS.timed('mdoc.sign', _SIGNER.sign_cose_sign1)
+)
+
+# Idempotency-Key support for the issuance endpoints (responses kept in idempotency_key)
+_IDEMPOTENCY = IdempotencyStore(
+    lambda: Session(db.engine),
+    ttl_seconds=app.config.get('IDEMPOTENCY_TTL_SECONDS', 86400),
+    wait_timeout=app.config.get('IDEMPOTENCY_WAIT_TIMEOUT', 30),
+    lock_timeout=app.config.get('IDEMPOTENCY_LOCK_TIMEOUT', 120),
+    cache_size=app.config.get('IDEMPOTENCY_CACHE_SIZE', 10000)
+)
+
 # ---------------------------------------------------------------------
 # Utils
 # ---------------------------------------------------------------------
@@ -103,8 +262,8 @@ def jwk_to_cose_ec2_map(jwk: dict) -> dict:
         cose_key[2] = jwk["kid"].encode()
     return cose_key
 
-def verify_jwt_proof(proof_jwt: str, aud: str):
-    """Validate 'openid4vci-proof+jwt' with embedded holder JWK, aud, and nonce."""
+def _verify_proof_signature(proof_jwt: str, aud: str):
+    """Validate 'openid4vci-proof+jwt' typ, embedded holder JWK, signature and aud (nonce not consumed)."""
     header = jwt.get_unverified_header(proof_jwt)
     if header.get("typ") != "openid4vci-proof+jwt":
         raise ValueError("invalid proof typ")
@@ -126,34 +285,19 @@ def verify_jwt_proof(proof_jwt: str, aud: str):
     )
 
     claims = jwt.decode(proof_jwt, key=pem, algorithms=[ALG_JOSE], audience=aud)
-    now = int(time.time())
-    nonce = claims.get("nonce")
-    if not nonce or nonce not in NONCES or NONCES[nonce] < now:
-        raise ValueError("nonce invalid/expired")
-    del NONCES[nonce]  # one-time use
     return holder_jwk, claims
 
-def _selfsigned_cert_der_ec(priv_key, cn="Demo DS (not for prod)", days=365) -> bytes:
-    now = datetime.datetime.utcnow()
-    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, cn)])
-    builder = (
-        x509.CertificateBuilder()
-        .subject_name(name)
-        .issuer_name(name)
-        .public_key(priv_key.public_key())
-        .serial_number(x509.random_serial_number())
-        .not_valid_before(now - datetime.timedelta(minutes=1))
-        .not_valid_after(now + datetime.timedelta(days=days))
-        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
-    )
-    cert = builder.sign(private_key=priv_key, algorithm=hashes.SHA256())
-    return cert.public_bytes(serialization.Encoding.DER)
+def _consume_nonce(nonce):
+    """Single-use check of a c_nonce issued by /nonce or /token."""
+    if not nonce:
+        raise ValueError("nonce invalid/expired")
+    _NONCES.consume(nonce)  # one-time use
 
-def _write_temp_der(der_bytes: bytes) -> str:
-    fd, path = tempfile.mkstemp(prefix="issuer_ds_", suffix=".der")
-    with os.fdopen(fd, "wb") as f:
-        f.write(der_bytes)
-    return path
+def verify_jwt_proof(proof_jwt: str, aud: str):
+    """Validate 'openid4vci-proof+jwt' with embedded holder JWK, aud, and nonce."""
+    holder_jwk, claims = _verify_proof_signature(proof_jwt, aud)
+    _consume_nonce(claims.get("nonce"))
+    return holder_jwk, claims
 
 # ---------- Robust CBOR helpers --------------------------------------
 def _untag_deep(obj):
@@ -166,57 +310,6 @@ def _untag_deep(obj):
         return [ _untag_deep(x) for x in obj ]
     return obj
 
-def _as_bytes(x: object) -> bytes:
-    """Return raw bytes from possibly-tagged bytes/bytearray."""
-    x = _untag_deep(x)
-    if isinstance(x, bytes):
-        return x
-    if isinstance(x, bytearray):
-        return bytes(x)
-    raise TypeError(f"Expected bytes, got {type(x)}")
-
-def _to_str_key(k):
-    k = _untag_deep(k)
-    if isinstance(k, (bytes, bytearray)):
-        return k.decode()
-    return k
-
-def _norm_ns_keys(d):
-    """Normalize namespace map keys to str (deep-untag first)."""
-    d = _untag_deep(d)
-    return { _to_str_key(k): v for k, v in d.items() }
-
-def _extract_issuersigned(decoded_any):
-    """
-    Accepts any mdoc/IssuerSigned encoding variant and returns a dict
-    that has at least keys: 'issuerAuth' and 'nameSpaces'.
-    """
-    d = _untag_deep(decoded_any)
-
-    # Direct IssuerSigned dict
-    if isinstance(d, dict) and "issuerAuth" in d and "nameSpaces" in d:
-        return _untag_deep(d)
-
-    # Array form: [IssuerSigned, DeviceSigned?]
-    if isinstance(d, list) and d:
-        first = _untag_deep(d[0])
-        if isinstance(first, dict) and "issuerAuth" in first and "nameSpaces" in first:
-            return _untag_deep(first)
-
-    # Wrapper form: { status, version, documents: [ { issuerSigned: ... } ] }
-    if isinstance(d, dict) and "documents" in d:
-        docs = d.get("documents") or []
-        if isinstance(docs, list) and docs:
-            doc0 = _untag_deep(docs[0])
-            if isinstance(doc0, dict) and "issuerSigned" in doc0:
-                isd = _untag_deep(doc0["issuerSigned"])
-                if isinstance(isd, list) and isd:
-                    isd = _untag_deep(isd[0])
-                if isinstance(isd, dict) and "issuerAuth" in isd and "nameSpaces" in isd:
-                    return _untag_deep(isd)
-
-    raise ValueError("Could not locate IssuerSigned in decoded structure")
-
 def _sign1_from_issuer_auth(issuer_auth):
     """
     Accept issuerAuth as:
@@ -251,17 +344,43 @@ def _sign1_from_issuer_auth(issuer_auth):
 # Database API Endpoints
 # ---------------------------------------------------------------------
 
+PAGE_SIZE_DEFAULT = app.config.get('PAGE_SIZE_DEFAULT', 100)
+PAGE_SIZE_MAX = app.config.get('PAGE_SIZE_MAX', 1000)
+
+def _page_response(session, stmt, columns, descending=False):
+    """
+    Keyset-paginated listing: ?limit= (default PAGE_SIZE_DEFAULT, at most
+    PAGE_SIZE_MAX), ?cursor= (next_cursor of the previous page) and
+    ?include_total=true for a separate COUNT of the whole listing.
+    """
+    try:
+        limit = int(request.args.get('limit', PAGE_SIZE_DEFAULT))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= PAGE_SIZE_MAX:
+        return jsonify({'success': False, 'error': f'limit must be between 1 and {PAGE_SIZE_MAX}'}), 400
+    try:
+        rows, next_cursor = keyset_page(session, stmt, columns, request.args.get('cursor'), limit, descending)
+    except InvalidCursor as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    response = {
+        'success': True,
+        'data': [row.to_dict() for row in rows],
+        'count': len(rows),
+        'limit': limit,
+        'next_cursor': next_cursor
+    }
+    if request.args.get('include_total', '').lower() in ('1', 'true', 'yes'):
+        response['total'] = count_rows(session, stmt)
+    return jsonify(response)
+
 @app.route('/api/credentials', methods=['GET'])
 def get_credentials():
-    """Get all credentials"""
+    """Get credentials, newest first (by id), one page at a time"""
     try:
         session = get_db_session()
-        credentials = session.query(Credential).all()
-        return jsonify({
-            'success': True,
-            'data': [cred.to_dict() for cred in credentials],
-            'count': len(credentials)
-        })
+        return _page_response(session, select(Credential), [Credential.id], descending=True)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -301,15 +420,11 @@ def create_credential():
 
 @app.route('/api/verification-logs', methods=['GET'])
 def get_verification_logs():
-    """Get all verification logs"""
+    """Get verification logs, newest first, one page at a time"""
     try:
         session = get_db_session()
-        logs = session.query(VerificationLog).order_by(VerificationLog.checked_at.desc()).all()
-        return jsonify({
-            'success': True,
-            'data': [log.to_dict() for log in logs],
-            'count': len(logs)
-        })
+        return _page_response(session, select(VerificationLog),
+                              [VerificationLog.checked_at, VerificationLog.id], descending=True)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -336,15 +451,11 @@ def create_verification_log():
 
 @app.route('/api/credentials/<credential_id>/verification-logs', methods=['GET'])
 def get_credential_verification_logs(credential_id):
-    """Get verification logs for a specific credential"""
+    """Get verification logs for a specific credential, newest first, one page at a time"""
     try:
         session = get_db_session()
-        logs = session.query(VerificationLog).filter_by(credential_id=credential_id).order_by(VerificationLog.checked_at.desc()).all()
-        return jsonify({
-            'success': True,
-            'data': [log.to_dict() for log in logs],
-            'count': len(logs)
-        })
+        return _page_response(session, select(VerificationLog).where(VerificationLog.credential_id == credential_id),
+                              [VerificationLog.checked_at, VerificationLog.id], descending=True)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -365,6 +476,8 @@ def openid4vci_meta():
         "credential_issuer": ISSUER,
         "credential_endpoint": f"{ISSUER}/credential",
         "nonce_endpoint": f"{ISSUER}/nonce",
+        "deferred_credential_endpoint": f"{ISSUER}/deferred_credential",
+        "batch_credential_issuance": {"batch_size": BATCH_CREDENTIAL_ISSUANCE_SIZE},
         "credential_configurations_supported": {
             CONFIG_ID: {
                 "format": "mso_mdoc",
@@ -390,9 +503,10 @@ def openid4vci_meta():
 # Offer (pre-authorized)
 # ---------------------------------------------------------------------
 @app.post("/offer")
+@rate_limited(_RATE_LIMITER, "offer", _rate_limit_client)
 def offer():
     code = secrets.token_urlsafe(24)
-    PRE_AUTH_CODES[code] = {"config_id": CONFIG_ID, "created": int(time.time())}
+    _TOKENS.put('pre_auth_code', code, {"config_id": CONFIG_ID, "created": int(time.time())}, PRE_AUTH_CODE_TTL)
     offer_obj = {
         "credential_issuer": ISSUER,
         "credential_configuration_ids": [CONFIG_ID],
@@ -408,44 +522,75 @@ def offer():
 # Token (pre-authorized_code)
 # ---------------------------------------------------------------------
 @app.post("/token")
+@rate_limited(_RATE_LIMITER, "token", _rate_limit_client)
 def token():
     gt = request.form.get("grant_type")
     if gt != "urn:ietf:params:oauth:grant-type:pre-authorized_code":
         return jsonify({"error": "unsupported_grant_type"}), 400
     code = request.form.get("pre-authorized_code")
-    if not code or code not in PRE_AUTH_CODES:
+    if not code or _TOKENS.consume('pre_auth_code', code) is None:  # single-use
         return jsonify({"error": "invalid_grant"}), 400
-    del PRE_AUTH_CODES[code]  # single-use
 
-    access_token = secrets.token_urlsafe(32)
-    ACCESS_TOKENS[access_token] = {"expires": int(time.time()) + 600}
-    return jsonify({"access_token": access_token, "token_type": "Bearer", "expires_in": 600})
+    if _ACCESS_TOKEN_SIGNER is not None:
+        access_token = _ACCESS_TOKEN_SIGNER.mint(CONFIG_ID)
+    else:
+        access_token = secrets.token_urlsafe(32)
+        _TOKENS.put('access_token', _token_hash(access_token),
+                    {"expires": int(time.time()) + ACCESS_TOKEN_TTL}, ACCESS_TOKEN_TTL)
+    # c_nonce inline saves the wallet its /nonce round trip before /credential
+    return jsonify({"access_token": access_token, "token_type": "Bearer", "expires_in": ACCESS_TOKEN_TTL,
+                    "c_nonce": _NONCES.issue(), "c_nonce_expires_in": C_NONCE_TTL})
 
 # ---------------------------------------------------------------------
 # Nonce endpoint
 # ---------------------------------------------------------------------
 @app.post("/nonce")
+@rate_limited(_RATE_LIMITER, "nonce", _rate_limit_client)
 def nonce():
-    c_nonce = secrets.token_urlsafe(24)
-    NONCES[c_nonce] = int(time.time()) + 180
-    return jsonify({"c_nonce": c_nonce})
+    """One c_nonce, or with "count" (JSON body or query) up to batch_size of them."""
+    body = request.get_json(force=True, silent=True) or {}
+    count = body.get("count", request.args.get("count")) if isinstance(body, dict) else request.args.get("count")
+    if count is None:
+        return jsonify({"c_nonce": _NONCES.issue(), "c_nonce_expires_in": C_NONCE_TTL})
+    try:
+        count = int(count)
+    except (TypeError, ValueError):
+        count = 0
+    if not 1 <= count <= BATCH_CREDENTIAL_ISSUANCE_SIZE:
+        return jsonify({
+            "error": "invalid_request",
+            "error_description": f"count must be between 1 and {BATCH_CREDENTIAL_ISSUANCE_SIZE}"
+        }), 400
+    return jsonify({"c_nonces": [_NONCES.issue() for _ in range(count)], "c_nonce_expires_in": C_NONCE_TTL})
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
 
 def _require_bearer():
     auth = request.headers.get("Authorization", "")
     if not auth.startswith("Bearer "):
         return None
     token = auth.split(" ", 1)[1]
-    info = ACCESS_TOKENS.get(token)
+    if _ACCESS_TOKEN_SIGNER is not None:
+        claims = _ACCESS_TOKEN_SIGNER.verify(token)
+        return token if claims and claims["config_id"] == CONFIG_ID else None
+    info = _TOKENS.get('access_token', _token_hash(token))
     if not info or info["expires"] < int(time.time()):
         return None
     return token
 
+def _bearer_caller():
+    """Idempotency scope for /credential: the access token's hash, None if invalid."""
+    token = _require_bearer()
+    return _token_hash(token) if token is not None else None
+
 # ---------------------------------------------------------------------
 # Credential (mdoc issuance via pymdoccbor)
 # ---------------------------------------------------------------------
 def build_mdoc_issuersigned_with_helper(doctype: str, data: dict, device_cose_key: dict) -> bytes:
     """
     Use pymdoccbor to construct IssuerSigned and embed an X.509 (x5chain).
+    With MDOC_BUILDER=native the in-process builder produces the same layout.
     Returns CBOR(IssuerSigned).
     """
     today = datetime.date.today()
@@ -454,28 +599,98 @@ def build_mdoc_issuersigned_with_helper(doctype: str, data: dict, device_cose_ke
         "expiry_date": (today.replace(year=today.year + 1)).isoformat()
     }
 
-    # 1) make a self-signed DS cert (DER) for demo
-    der = _selfsigned_cert_der_ec(_crypto_priv)
-    cert_path = _write_temp_der(der)
-
-    # 2) build with pymdoccbor (will include x5chain from cert_path)
-    issuer = MdocCborIssuer(private_key=ISSUER_PKEY, alg="ES256")
-    issuer.new(
-        doctype=doctype,
-        data=data,                         # {"namespace": {...}}
-        devicekeyinfo=device_cose_key,     # COSE_Key (int labels)
-        validity=validity,
-        cert_path=cert_path                # required by current pymdoccbor to embed x5chain
-    )
+    if MDOC_BUILDER == 'native':
+        with STAGE_TIMINGS.stage('mdoc.native_build'):
+            return _NATIVE_MDOC_ISSUER.build(doctype, data, device_cose_key, validity)
+
+    # 1) cached self-signed DS cert (DER on disk once per key, rotated on schedule)
+    with STAGE_TIMINGS.stage('mdoc.ds_cert'):
+        ds_cert = _DS_CERTS.current()
+
+    if _SIGNER.workers > 0:
+        # pymdoccbor signs the MSO internally, so the whole build runs in the signing pool
+        with STAGE_TIMINGS.stage('mdoc.pymdoccbor_build'):
+            return _SIGNER.build_mdoc_pymdoccbor(doctype, data, device_cose_key, validity, ds_cert.path)
+
+    # 2) build with pymdoccbor (will include x5chain from cert_path; signs the MSO too)
+    with STAGE_TIMINGS.stage('mdoc.pymdoccbor_build'):
+        issuer = MdocCborIssuer(private_key=ISSUER_PKEY, alg="ES256")
+        issuer.new(
+            doctype=doctype,
+            data=data,                         # {"namespace": {...}}
+            devicekeyinfo=device_cose_key,     # COSE_Key (int labels)
+            validity=validity,
+            cert_path=ds_cert.path             # required by current pymdoccbor to embed x5chain
+        )
 
     # 3) dump IssuerSigned (some versions use dump_issuersigned, others dump)
-    dump_issuersigned = getattr(issuer, "dump_issuersigned", None)
-    result = dump_issuersigned() if callable(dump_issuersigned) else issuer.dump()
+    with STAGE_TIMINGS.stage('mdoc.dump'):
+        dump_issuersigned = getattr(issuer, "dump_issuersigned", None)
+        result = dump_issuersigned() if callable(dump_issuersigned) else issuer.dump()
     return result
 
+def _verify_proofs(proofs, aud: str):
+    """
+    Verify a batch of proof JWTs in parallel (nonces not consumed).
+    Returns [(holder_jwk, claims)] in request order.
+    """
+    if len(proofs) == 1:
+        results = [_verify_proof_signature(proofs[0], aud)]
+    else:
+        results = list(_ISSUANCE_EXECUTOR.map(lambda p: _verify_proof_signature(p, aud), proofs))
+
+    seen_keys = set()
+    for holder_jwk, _claims in results:
+        key_id = (holder_jwk.get("x"), holder_jwk.get("y"))
+        if key_id in seen_keys:
+            raise ValueError("duplicate holder key in proofs")
+        seen_keys.add(key_id)
+    return results
+
+def _build_oid4vci_credentials(issue_request: dict):
+    """Build one mdoc per holder key; returns base64url credentials in request order."""
+    def build(holder_jwk):
+        return b64url(build_mdoc_issuersigned_with_helper(
+            doctype=issue_request["doctype"],
+            data=issue_request["data"],
+            device_cose_key=jwk_to_cose_ec2_map(holder_jwk)
+        ))
+    holder_jwks = issue_request["holder_jwks"]
+    if len(holder_jwks) == 1:
+        return [build(holder_jwks[0])]
+    return list(_ISSUANCE_EXECUTOR.map(build, holder_jwks))
+
+# Deferred issuance: jobs live in issuance_job, so accepted requests survive restarts
+_DEFERRED_QUEUE = DeferredIssuanceQueue(
+    app,
+    _build_oid4vci_credentials,
+    workers=app.config.get('DEFERRED_ISSUANCE_WORKERS', 2),
+    max_pending=app.config.get('DEFERRED_QUEUE_MAX_PENDING', 1000),
+    poll_interval=app.config.get('DEFERRED_POLL_INTERVAL', 1.0),
+    lease_seconds=app.config.get('DEFERRED_JOB_LEASE_SECONDS', 120)
+)
+
+@app.before_request
+def _start_deferred_workers():
+    # Per process and after the gunicorn fork: jobs accepted before a restart
+    # are picked up without waiting for a new deferred submission
+    if DEFERRED_ISSUANCE != 'off':
+        _DEFERRED_QUEUE.start()
+
+def _should_defer() -> bool:
+    if DEFERRED_ISSUANCE == 'always':
+        return True
+    if DEFERRED_ISSUANCE == 'auto':
+        return _SIGNER.metrics()['queue_depth'] >= app.config.get('DEFERRED_ISSUANCE_AUTO_DEPTH', 8)
+    return False
+
 @app.post("/credential")
+@rate_limited(_RATE_LIMITER, "credential", _rate_limit_client)
+@idempotent(_IDEMPOTENCY, caller=_bearer_caller)
+@admission_controlled(_CREDENTIAL_ADMISSION, retry_after=CREDENTIAL_RETRY_AFTER)
 def credential():
-    if _require_bearer() is None:
+    token = _require_bearer()
+    if token is None:
         return jsonify({"error": "invalid_token"}), 401
 
     body = request.get_json(force=True, silent=True) or {}
@@ -485,27 +700,298 @@ def credential():
         return jsonify({"error": "unsupported_credential_configuration_id"}), 400
     if not proofs:
         return jsonify({"error": "invalid_request", "error_description": "missing proofs.jwt"}), 400
+    if len(proofs) > BATCH_CREDENTIAL_ISSUANCE_SIZE:
+        return jsonify({
+            "error": "invalid_request",
+            "error_description": f"too many proofs (batch_size is {BATCH_CREDENTIAL_ISSUANCE_SIZE})"
+        }), 400
 
-    holder_jwk, _claims = verify_jwt_proof(proofs[0], aud=ISSUER)
-    device_cose_key = jwk_to_cose_ec2_map(holder_jwk)
+    try:
+        with STAGE_TIMINGS.stage('oid4vci.proof_verify'):
+            verified = _verify_proofs(proofs, aud=ISSUER)
+    except Exception as e:
+        return jsonify({"error": "invalid_proof", "error_description": str(e)}), 400
 
-    data = {
-        "org.issuance-vc.bank.account": {
-            "given_name": "Erika",
-            "family_name": "Mustermann",
-            "birth_date": "1990-01-01",
-        }
+    # Wallets usually sign every proof of a batch over the same c_nonce,
+    # so each distinct nonce is consumed once
+    try:
+        with STAGE_TIMINGS.stage('oid4vci.nonce'):
+            for nonce in {claims.get("nonce") for _jwk, claims in verified}:
+                _consume_nonce(nonce)
+    except ValueError as e:
+        return jsonify({"error": "invalid_nonce", "error_description": str(e)}), 400
+
+    issue_request = {
+        "doctype": "org.issuance-vc.bank.account.mDL",
+        "data": {
+            "org.issuance-vc.bank.account": {
+                "given_name": "Erika",
+                "family_name": "Mustermann",
+                "birth_date": "1990-01-01",
+            }
+        },
+        "holder_jwks": [holder_jwk for holder_jwk, _claims in verified]
     }
 
-    issuer_signed_bytes = build_mdoc_issuersigned_with_helper(
-        doctype="org.issuance-vc.bank.account.mDL",
-        data=data,
-        device_cose_key=device_cose_key
-    )
+    if _should_defer():
+        try:
+            with STAGE_TIMINGS.stage('oid4vci.enqueue'):
+                transaction_id = _DEFERRED_QUEUE.submit(issue_request, _token_hash(token))
+        except QueueFull as e:
+            return jsonify({"error": "temporarily_unavailable", "error_description": str(e)}), 503, \
+                {"Retry-After": str(DEFERRED_RETRY_INTERVAL)}
+        return jsonify({"transaction_id": transaction_id, "interval": DEFERRED_RETRY_INTERVAL}), 202
+
+    with STAGE_TIMINGS.stage('oid4vci.mdoc_build'):
+        credentials = _build_oid4vci_credentials(issue_request)
     return jsonify({"credentials": [{
         "format": "mso_mdoc",
-        "credential": b64url(issuer_signed_bytes)
-    }]})
+        "credential": issued
+    } for issued in credentials]})
+
+@app.post("/deferred_credential")
+def deferred_credential():
+    token = _require_bearer()
+    if token is None:
+        return jsonify({"error": "invalid_token"}), 401
+
+    body = request.get_json(force=True, silent=True) or {}
+    transaction_id = body.get("transaction_id")
+    if not transaction_id:
+        return jsonify({"error": "invalid_request", "error_description": "missing transaction_id"}), 400
+
+    status, result = _DEFERRED_QUEUE.fetch(transaction_id, _token_hash(token))
+    if status is None:
+        return jsonify({"error": "invalid_transaction_id"}), 400
+    if status == FAILED:
+        return jsonify({"error": "credential_request_denied", "error_description": result}), 400
+    if status != DONE:
+        return jsonify({"error": "issuance_pending", "interval": DEFERRED_RETRY_INTERVAL}), 400
+
+    return jsonify({"credentials": [{"format": "mso_mdoc", "credential": issued} for issued in result]})
+
+def _json_safe(value):
+    """Dates/datetimes (tags 0/1004) as ISO strings for JSON output."""
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+# Verification outcomes keyed by SHA-256 of the credential bytes. Revoke and
+# extend clear this worker's cache; other workers' entries age out after the TTL.
+_VERIFY_CACHE = LRUTTLCache(
+    max_entries=app.config.get('VERIFY_CACHE_SIZE', 10000),
+    ttl_seconds=app.config.get('VERIFY_CACHE_TTL_SECONDS', 60)
+)
+
+# Verification fan-out: items of /api/verify_credentials/batch and the
+# documents of a multi-document credential
+_VERIFY_EXECUTOR = ThreadPoolExecutor(
+    max_workers=app.config.get('VERIFY_WORKERS', 4),
+    thread_name_prefix='verify'
+)
+
+def _verify_document(doc) -> dict:
+    """
+    Check the issuer signature and the value digests of one decoded document.
+    The verification key comes from the trust store (kid / x5chain); an
+    untrusted issuer raises UntrustedIssuer.
+    """
+    trusted = _TRUST_STORE.resolve_sign1(doc.issuer_auth)
+    try:
+        sig_ok = verify_issuer_auth(doc.issuer_auth, trusted.public_key)
+    except UnsupportedSign1:
+        sign1 = _sign1_from_issuer_auth(doc.issuer_auth)
+        sign1.key = trusted.cose_key
+        sig_ok = sign1.verify_signature()
+    dig_ok = verify_digests(doc)
+    return {
+        'signature_valid': bool(sig_ok),
+        'digests_valid': bool(dig_ok),
+        'issuer': {
+            'kid': trusted.kid.decode(errors='replace') if trusted.kid else None,
+            'fingerprint': trusted.fingerprint,
+            'source': trusted.source
+        },
+        'docType': doc.mso.get("docType"),
+        'validityInfo': _json_safe(doc.mso.get("validityInfo")),
+        'namespaces': {
+            str(ns): [str(item.element_identifier or "") for item in items]
+            for ns, items in doc.name_spaces.items()
+        }
+    }
+
+def _verify_mdoc(raw: bytes) -> dict:
+    """Decode a credential once (mdoc_decoder) and verify its first document."""
+    return _verify_document(decode_mdoc(raw)[0])
+
+def _verify_document_entry(indexed_doc) -> dict:
+    """_verify_document() for one entry of a DeviceResponse; failures become a FAIL entry."""
+    index, doc = indexed_doc
+    try:
+        checked = _verify_document(doc)
+        result = 'PASS' if checked['signature_valid'] and checked['digests_valid'] else 'FAIL'
+        return {'index': index, 'result': result, **checked}
+    except Exception as e:
+        return {'index': index, 'result': 'FAIL', 'docType': doc.doctype, 'validityInfo': None,
+                'error': str(e)}
+
+def _verify_mdoc_documents(raw: bytes) -> dict:
+    """Verify every document of the credential, concurrently when there are several."""
+    docs = list(enumerate(decode_mdoc(raw)))
+    if len(docs) == 1:
+        return {'documents': [_verify_document_entry(docs[0])]}
+    return {'documents': list(_VERIFY_EXECUTOR.map(_verify_document_entry, docs))}
+
+def _valid_until_ts(validity_info):
+    valid_until = (validity_info or {}).get('validUntil')
+    try:
+        return datetime.datetime.fromisoformat(valid_until).timestamp() if valid_until else None
+    except (TypeError, ValueError):
+        return None
+
+def _verify_mdoc_cached(raw: bytes, all_documents=False):
+    """
+    _verify_mdoc() (or _verify_mdoc_documents() with all_documents) through the
+    verification cache; returns (result, cache_hit). Entries never outlive the
+    earliest validUntil involved. Decode errors are not cached.
+    """
+    key = hashlib.sha256(raw).digest() + (b'/all' if all_documents else b'')
+    result = _VERIFY_CACHE.get(key)
+    if result is not None:
+        return result, True
+    if all_documents:
+        result = _verify_mdoc_documents(raw)
+        if any('error' in doc for doc in result['documents']):
+            return result, False
+        deadlines = [_valid_until_ts(doc['validityInfo']) for doc in result['documents']]
+    else:
+        result = _verify_mdoc(raw)
+        deadlines = [_valid_until_ts(result['validityInfo'])]
+    deadlines = [d for d in deadlines if d is not None]
+    _VERIFY_CACHE.put(key, result, expires_at=min(deadlines) if deadlines else None)
+    return result, False
+
+# ---------------------------------------------------------------------
+# Verification logging
+# ---------------------------------------------------------------------
+# credential_ids known to have a credential row in this worker, so their log
+# entries skip the placeholder upsert. Cleared when it reaches the cap, or
+# when a log insert hits the FK (e.g. a released reservation).
+_KNOWN_CREDENTIAL_IDS = set()
+_KNOWN_CREDENTIAL_IDS_MAX = app.config.get('KNOWN_CREDENTIAL_IDS_MAX', 100000)
+
+def _remember_credential_ids(credential_ids):
+    if len(_KNOWN_CREDENTIAL_IDS) + len(credential_ids) > _KNOWN_CREDENTIAL_IDS_MAX:
+        _KNOWN_CREDENTIAL_IDS.clear()
+    _KNOWN_CREDENTIAL_IDS.update(credential_ids)
+
+def _ensure_placeholder_credentials(session, credential_ids):
+    """
+    Create 'Unknown' credential rows for log entries whose credential is not
+    on file, with a single INSERT ... ON CONFLICT (credential_id) DO NOTHING.
+    IDs already seen by this worker are skipped.
+    """
+    credential_ids = set(credential_ids) - _KNOWN_CREDENTIAL_IDS
+    if not credential_ids:
+        return
+    now = datetime.datetime.now()
+    rows = [{
+        'credential_id': cid,
+        'type': 'Unknown',
+        'format': 'ISO mdoc',
+        'status': 'active',
+        'issued': now
+    } for cid in credential_ids]
+    dialect = _upsert_dialect(session)
+    if dialect is not None:
+        session.execute(dialect.insert(Credential).on_conflict_do_nothing(
+            index_elements=[Credential.credential_id]), rows)
+    else:
+        existing = {cid for (cid,) in session.query(Credential.credential_id)
+                    .filter(Credential.credential_id.in_(credential_ids)).all()}
+        for row in rows:
+            if row['credential_id'] in existing:
+                continue
+            try:
+                with session.begin_nested():
+                    session.execute(insert(Credential), [row])
+            except IntegrityError:
+                pass
+
+def _insert_verification_logs(session, rows):
+    """Multi-row INSERT of verification log dicts (caller commits)."""
+    _ensure_placeholder_credentials(session, {row['credential_id'] for row in rows})
+    session.execute(insert(VerificationLog), rows)
+
+def _commit_verification_logs(session, rows):
+    """
+    Placeholder upsert and log insert in one transaction. A FK failure means a
+    remembered credential row is gone: forget the known IDs and retry once.
+    """
+    for attempt in range(2):
+        try:
+            _insert_verification_logs(session, rows)
+            session.commit()
+            break
+        except IntegrityError:
+            session.rollback()
+            if attempt:
+                raise
+            _KNOWN_CREDENTIAL_IDS.clear()
+        except Exception:
+            session.rollback()
+            raise
+    _remember_credential_ids({row['credential_id'] for row in rows})
+
+def _write_verification_logs(rows):
+    """Flush callback of the log writer: one transaction per batch."""
+    with app.app_context():
+        session = get_db_session()
+        try:
+            _commit_verification_logs(session, rows)
+        finally:
+            session.close()
+
+_LOG_WRITER = BatchLogWriter(
+    _write_verification_logs,
+    max_queue=app.config.get('VERIFY_LOG_QUEUE_SIZE', 10000),
+    batch_size=app.config.get('VERIFY_LOG_BATCH_SIZE', 500),
+    flush_interval=app.config.get('VERIFY_LOG_FLUSH_INTERVAL', 0.5),
+    put_timeout=app.config.get('VERIFY_LOG_PUT_TIMEOUT', 1.0),
+    name='verification-log-writer',
+    logger=app.logger,
+    # a constraint or value error is down to some row; split the batch to find it
+    is_row_error=lambda e: isinstance(e, (IntegrityError, DataError))
+)
+
+def _log_column_text(value, column) -> str:
+    """str(value) cut to the column's length (verifier and friends come from clients)."""
+    return str(value if value is not None else '')[:column.type.length]
+
+def _verification_log_row(credential_id, result, response_time, verifier):
+    try:
+        response_time = int(response_time)
+    except (TypeError, ValueError):
+        response_time = 0
+    return {
+        'credential_id': _log_column_text(credential_id or 'UNKNOWN', VerificationLog.credential_id),
+        'result': _log_column_text(result, VerificationLog.result),
+        'response_time': response_time,
+        'verifier': _log_column_text(verifier, VerificationLog.verifier),
+        'checked_at': datetime.datetime.now()
+    }
+
+def _log_verifications(rows):
+    """Record verifications; queued for the batched writer unless VERIFY_LOG_ASYNC is off."""
+    if app.config.get('VERIFY_LOG_ASYNC', True):
+        _LOG_WRITER.submit_many(rows)
+    else:
+        _LOG_WRITER.write(rows)
+
+def _log_verification(credential_id, result, response_time, verifier):
+    _log_verifications([_verification_log_row(credential_id, result, response_time, verifier)])
 
 # ---------------------------------------------------------------------
 # Simple verifier UI (manual sanity check)
@@ -534,37 +1020,9 @@ def verify():
             start_time = time.time()
             raw = b64url_decode_to_bytes(cred_b64)
 
-            # Load, deep-untag, and normalize to an IssuerSigned dict
-            decoded_any = _untag_deep(cbor2.loads(raw))
-            issuer_signed = _extract_issuersigned(decoded_any)
-
-            # issuerAuth -> COSE_Sign1
-            issuer_auth = issuer_signed["issuerAuth"]
-            sign1 = _sign1_from_issuer_auth(issuer_auth)
-            mso = cbor2.loads(sign1.payload)
-            sign1.key = _ISSUER_VERIFY_KEY
-            sig_ok = sign1.verify_signature()
-
-            # Verify digests with normalized namespace keys and deep-untagged bytes
-            ns_map = _norm_ns_keys(issuer_signed["nameSpaces"])      # { ns: [bstr,...] }
-            vd_all = _norm_ns_keys(mso["valueDigests"]["nameSpaces"])# { ns: {digestID: digest} }
-
-            dig_ok = True
-            for ns, items in ns_map.items():
-                vd_ns = vd_all.get(ns)
-                if vd_ns is None:
-                    dig_ok = False
-                    break
-                for item_b in items:
-                    b = _as_bytes(item_b)           # deep-untag -> bytes
-                    item = cbor2.loads(b)           # IssuerSignedItem
-                    want = vd_ns[item["digestID"]]
-                    got = hashlib.sha256(b).digest()
-                    if want != got:
-                        dig_ok = False
-                        break
-                if not dig_ok:
-                    break
+            # Single-pass decode, issuer signature and value digests (cached by credential hash)
+            checked, cache_hit = _verify_mdoc_cached(raw)
+            sig_ok, dig_ok = checked['signature_valid'], checked['digests_valid']
 
             # Calculate response time
             response_time = int((time.time() - start_time) * 1000)
@@ -575,79 +1033,30 @@ def verify():
             # Extract credential ID from mdoc if possible
             credential_id = None
             try:
-                doc_type = mso.get("docType", "")
+                doc_type = checked['docType'] or ""
                 if doc_type:
                     credential_id = f"EXTRACTED-{doc_type.split('.')[-1]}"
             except:
                 pass
             
-            # Save verification log to database
-            session = get_db_session()
-            try:
-                # If we have a credential_id, check if it exists in database
-                if credential_id:
-                    existing_credential = session.query(Credential).filter_by(credential_id=credential_id).first()
-                    if not existing_credential:
-                        # Create a placeholder credential if it doesn't exist
-                        placeholder_credential = Credential(
-                            credential_id=credential_id,
-                            type='Unknown',
-                            format='ISO mdoc',
-                            status='active',
-                            issued=datetime.datetime.now()
-                        )
-                        session.add(placeholder_credential)
-                        session.commit()
-                
-                # Create verification log
-                verification_log = VerificationLog(
-                    credential_id=credential_id or 'UNKNOWN',
-                    result=verification_result,
-                    response_time=response_time,
-                    verifier=verifier,
-                    checked_at=datetime.datetime.now()
-                )
-                session.add(verification_log)
-                session.commit()
-                
-            except Exception as db_error:
-                session.rollback()
-                print(f"Database error during verification log save: {db_error}")
-                # Continue with verification even if database save fails
-            
-            finally:
-                session.close()
+            # Queue the verification log (written in batches off the request path)
+            _log_verification(credential_id or 'UNKNOWN', verification_result, response_time, verifier)
 
             result = json.dumps({
-                "docType": mso.get("docType"),
-                "validityInfo": mso.get("validityInfo"),
+                "docType": checked['docType'],
+                "validityInfo": checked['validityInfo'],
                 "signature_valid": bool(sig_ok),
                 "digests_valid": bool(dig_ok),
                 "verification_result": verification_result,
                 "response_time_ms": response_time,
                 "verifier": verifier,
-                "namespaces": { ns: [cbor2.loads(_as_bytes(b))["elementIdentifier"] for b in items]
-                                for ns, items in ns_map.items() }
+                "namespaces": checked['namespaces'],
+                "issuer": checked['issuer']
             }, indent=2)
         except Exception as e:
             # Save failed verification log
             response_time = int((time.time() - start_time) * 1000) if 'start_time' in locals() else 0
-            session = get_db_session()
-            try:
-                verification_log = VerificationLog(
-                    credential_id='UNKNOWN',
-                    result='FAIL',
-                    response_time=response_time,
-                    verifier=request.form.get("verifier", "Web-Verifier"),
-                    checked_at=datetime.datetime.now()
-                )
-                session.add(verification_log)
-                session.commit()
-            except Exception as db_error:
-                session.rollback()
-                print(f"Database error during failed verification log save: {db_error}")
-            finally:
-                session.close()
+            _log_verification('UNKNOWN', 'FAIL', response_time, request.form.get("verifier", "Web-Verifier"))
             
             result = f"Verification failed: {e}"
     return render_template_string(VERIFY_HTML, result=result)
@@ -705,7 +1114,7 @@ DASHBOARD_HTML = """
         <button class="refresh-btn" onclick="location.reload()">Refresh Data</button>
 
         <div class="section">
-            <h2>Credentials</h2>
+            <h2>Latest Credentials</h2>
             <table>
                 <thead>
                     <tr>
@@ -768,15 +1177,15 @@ def dashboard():
     try:
         session = get_db_session()
         
-        # Get credentials
-        credentials = session.query(Credential).all()
+        # Latest credentials only; the totals are COUNT queries
+        credentials = session.query(Credential).order_by(Credential.id.desc()).limit(PAGE_SIZE_DEFAULT).all()
         
         # Get verification logs
         verification_logs = session.query(VerificationLog).order_by(VerificationLog.checked_at.desc()).limit(20).all()
         
         # Calculate stats
-        total_credentials = len(credentials)
-        active_credentials = len([c for c in credentials if c.status == 'active'])
+        total_credentials = session.query(Credential).count()
+        active_credentials = session.query(Credential).filter_by(status='active').count()
         total_verifications = session.query(VerificationLog).count()
         successful_verifications = session.query(VerificationLog).filter_by(result='PASS').count()
         
@@ -897,163 +1306,278 @@ def get_metrics():
         session.close()
 
 # ---------------------------------------------------------------------
-# Issue Credential API (for Angular frontend)
+# Runtime Metrics API (issuer internals, not the dashboard figures)
 # ---------------------------------------------------------------------
-@app.route("/api/issue_credential", methods=["POST", "OPTIONS"])
-def issue_credential():
-    """Issue a new credential and save to database"""
-    if request.method == "OPTIONS":
-        return "", 200
-    
-    try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['credential_id', 'type', 'subject_id']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({
-                    'success': False, 
-                    'error': f'Missing required field: {field}'
-                }), 400
-        
-        # Resolve subject details from account_id if provided (fake data or random)
-        account_id = data.get('account_id')
-        resolved_first_name = None
-        resolved_last_name = None
-        resolved_birth_date = None
-        if account_id:
-            FAKE_ACCOUNTS = {
-                'ACC-123456': { 'given_name': 'Alice', 'family_name': 'Nguyen', 'birth_date': '1991-05-12' },
-                'ACC-654321': { 'given_name': 'Bob', 'family_name': 'Martinez', 'birth_date': '1988-11-03' },
-                'ACC-777777': { 'given_name': 'Charlie', 'family_name': 'Khan', 'birth_date': '1995-02-25' },
-                'ACC-888888': { 'given_name': 'Diana', 'family_name': 'Rossi', 'birth_date': '1993-07-19' },
-            }
-            details = FAKE_ACCOUNTS.get(account_id)
-            if not details:
-                # Random fallback
-                import random
-                samples = [
-                    { 'given_name': 'Evan', 'family_name': 'Kim', 'birth_date': '1990-09-09' },
-                    { 'given_name': 'Fatima', 'family_name': 'Hassan', 'birth_date': '1992-04-21' },
-                    { 'given_name': 'George', 'family_name': 'Ivanov', 'birth_date': '1987-12-30' },
-                    { 'given_name': 'Hana', 'family_name': 'Yamamoto', 'birth_date': '1996-03-14' },
-                ]
-                details = random.choice(samples)
-            resolved_first_name = details['given_name']
-            resolved_last_name = details['family_name']
-            resolved_birth_date = details['birth_date']  # YYYY-MM-DD
-        
-        # Generate holder key pair
-        holder_priv = ec.generate_private_key(ec.SECP256R1())
-        holder_pub = holder_priv.public_key().public_numbers()
-        holder_jwk = {
-            "kty": "EC",
-            "crv": "P-256",
-            "x": base64.urlsafe_b64encode(holder_pub.x.to_bytes(32, "big")).rstrip(b"=").decode(),
-            "y": base64.urlsafe_b64encode(holder_pub.y.to_bytes(32, "big")).rstrip(b"=").decode(),
-            "kid": f"holder-{data['credential_id']}"
+@app.route('/api/metrics/runtime', methods=['GET'])
+def get_runtime_metrics():
+    """Get in-process metrics for this worker (signing executor, ...)"""
+    return jsonify({
+        'success': True,
+        'data': {
+            'pid': os.getpid(),
+            'signing': _SIGNER.metrics(),
+            'holder_key_pool': _HOLDER_KEYS.metrics(),
+            'deferred_issuance': _DEFERRED_QUEUE.metrics(),
+            'idempotency': _IDEMPOTENCY.metrics(),
+            'verification_cache': _VERIFY_CACHE.metrics(),
+            'verification_log_writer': _LOG_WRITER.metrics(),
+            'trust_store': _TRUST_STORE.metrics(),
+            'token_store': _TOKENS.metrics(),
+            'nonces': _NONCES.metrics(),
+            'rate_limits': _RATE_LIMITER.metrics(),
+            'credential_admission': _CREDENTIAL_ADMISSION.metrics()
         }
+    })
 
-        # Get nonce
-        nonce = secrets.token_urlsafe(24)
-        NONCES[nonce] = int(time.time()) + 180
-
-        # Create proof JWT
-        proof_header = {"typ": "openid4vci-proof+jwt", "alg": ALG_JOSE, "jwk": holder_jwk}
-        proof_payload = {
-            "iss": "demo-holder",
-            "aud": ISSUER,
-            "iat": int(time.time()),
-            "exp": int(time.time()) + 300,
-            "nonce": nonce
+@app.route('/api/metrics/stages', methods=['GET', 'DELETE'])
+def get_stage_metrics():
+    """Get (GET) or reset (DELETE) this worker's per-stage timing histograms"""
+    if request.method == 'DELETE':
+        STAGE_TIMINGS.reset()
+    return jsonify({
+        'success': True,
+        'data': {
+            'pid': os.getpid(),
+            'buckets_ms': list(STAGE_TIMINGS.buckets_ms),
+            'stages': STAGE_TIMINGS.snapshot()
         }
-        proof_jwt = jwt.encode(proof_payload, holder_priv, algorithm=ALG_JOSE, headers=proof_header)
+    })
 
-        # Build mdoc data with user-provided or resolved information
-        given_name = data.get('given_name') or resolved_first_name or 'John'
-        family_name = data.get('family_name') or resolved_last_name or 'Doe'
-        birth_date = data.get('birth_date') or resolved_birth_date or '1990-01-01'
-        mdoc_data = {
-            "org.issuance-vc.bank.account": {
-                "given_name": given_name,
-                "family_name": family_name,
-                "birth_date": birth_date,
-            }
+# ---------------------------------------------------------------------
+# Issue Credential API (for Angular frontend)
+# ---------------------------------------------------------------------
+ISSUE_REQUIRED_FIELDS = ['credential_id', 'type', 'subject_id']
+
+FAKE_ACCOUNTS = {
+    'ACC-123456': { 'given_name': 'Alice', 'family_name': 'Nguyen', 'birth_date': '1991-05-12' },
+    'ACC-654321': { 'given_name': 'Bob', 'family_name': 'Martinez', 'birth_date': '1988-11-03' },
+    'ACC-777777': { 'given_name': 'Charlie', 'family_name': 'Khan', 'birth_date': '1995-02-25' },
+    'ACC-888888': { 'given_name': 'Diana', 'family_name': 'Rossi', 'birth_date': '1993-07-19' },
+}
+FAKE_ACCOUNT_SAMPLES = [
+    { 'given_name': 'Evan', 'family_name': 'Kim', 'birth_date': '1990-09-09' },
+    { 'given_name': 'Fatima', 'family_name': 'Hassan', 'birth_date': '1992-04-21' },
+    { 'given_name': 'George', 'family_name': 'Ivanov', 'birth_date': '1987-12-30' },
+    { 'given_name': 'Hana', 'family_name': 'Yamamoto', 'birth_date': '1996-03-14' },
+]
+
+# Pre-generated holder keys for server-side issuance
+_HOLDER_KEYS = HolderKeyPool(
+    low_watermark=app.config.get('HOLDER_KEY_POOL_LOW_WATERMARK', 32),
+    high_watermark=app.config.get('HOLDER_KEY_POOL_HIGH_WATERMARK', 256)
+)
+
+def _resolve_account_details(account_id):
+    """Resolve subject details from account_id (fake data or random)"""
+    if not account_id:
+        return {}
+    details = FAKE_ACCOUNTS.get(account_id)
+    if not details:
+        # Random fallback
+        details = random.choice(FAKE_ACCOUNT_SAMPLES)
+    return details
+
+def _validate_issue_request(data):
+    """Validate an issuance request; returns (credential_data, error message)."""
+    if not isinstance(data, dict):
+        return None, 'Issuance request must be a JSON object'
+    for field in ISSUE_REQUIRED_FIELDS:
+        if field not in data:
+            return None, f'Missing required field: {field}'
+
+    credential_data = {
+        'credential_id': data['credential_id'],
+        'subject_id': data.get('subject_id'),
+        'type': data['type'],
+        'format': data.get('format', 'ISO mdoc'),
+        'status': data.get('status', 'active'),
+        'issued': datetime.datetime.now(),
+        'expires': None
+    }
+
+    # Parse expiry date if provided
+    if 'expires' in data and data['expires']:
+        try:
+            credential_data['expires'] = datetime.datetime.fromisoformat(data['expires'].replace('Z', '+00:00'))
+        except ValueError:
+            return None, 'Invalid expiry date format. Use ISO format (YYYY-MM-DDTHH:MM:SS)'
+    return credential_data, None
+
+def _issue_mdoc(data):
+    """Generate holder key, proof JWT and the signed mdoc for one issuance request."""
+    account_id = data.get('account_id')
+    details = _resolve_account_details(account_id)
+
+    # Take a pre-generated holder key pair (generated inline if the pool is empty)
+    with STAGE_TIMINGS.stage('issue.holder_key'):
+        holder_key = _HOLDER_KEYS.acquire()
+        holder_kid = f"holder-{data['credential_id']}"
+        holder_jwk = holder_key.jwk(kid=holder_kid)
+
+    # Nonce for the self-issued proof; it never reaches /credential, so it is
+    # not registered in the token store
+    nonce = secrets.token_urlsafe(24)
+
+    # Create proof JWT
+    proof_header = {"typ": "openid4vci-proof+jwt", "alg": ALG_JOSE, "jwk": holder_jwk}
+    proof_payload = {
+        "iss": "demo-holder",
+        "aud": ISSUER,
+        "iat": int(time.time()),
+        "exp": int(time.time()) + 300,
+        "nonce": nonce
+    }
+    with STAGE_TIMINGS.stage('issue.proof_jwt'):
+        proof_jwt = _SIGNER.sign_jwt(proof_payload, proof_header, holder_key.private_key)
+
+    # Build mdoc data with user-provided or resolved information
+    given_name = data.get('given_name') or details.get('given_name') or 'John'
+    family_name = data.get('family_name') or details.get('family_name') or 'Doe'
+    birth_date = data.get('birth_date') or details.get('birth_date') or '1990-01-01'
+    mdoc_data = {
+        "org.issuance-vc.bank.account": {
+            "given_name": given_name,
+            "family_name": family_name,
+            "birth_date": birth_date,
         }
+    }
 
-        # Add custom fields if provided, and include account_id for traceability
-        if 'custom_fields' in data and isinstance(data['custom_fields'], dict):
-            mdoc_data["org.issuance-vc.bank.account"].update(data['custom_fields'])
-        if account_id:
-            mdoc_data["org.issuance-vc.bank.account"]["account_id"] = account_id
+    # Add custom fields if provided, and include account_id for traceability
+    if 'custom_fields' in data and isinstance(data['custom_fields'], dict):
+        mdoc_data["org.issuance-vc.bank.account"].update(data['custom_fields'])
+    if account_id:
+        mdoc_data["org.issuance-vc.bank.account"]["account_id"] = account_id
 
-        # Generate mdoc credential using pymdoccbor
-        device_cose_key = jwk_to_cose_ec2_map(holder_jwk)
+    # Generate mdoc credential using pymdoccbor
+    device_cose_key = holder_key.cose_key(kid=holder_kid)
+    with STAGE_TIMINGS.stage('issue.mdoc_build'):
         mdoc_bytes = build_mdoc_issuersigned_with_helper(
-            "org.issuance-vc.bank.account.mDL", 
-            mdoc_data, 
+            "org.issuance-vc.bank.account.mDL",
+            mdoc_data,
             device_cose_key
         )
-        mdoc_b64url = b64url(mdoc_bytes)
-        mdoc_hex = mdoc_bytes.hex()
+    return {
+        'mdoc': {
+            'base64url': b64url(mdoc_bytes),
+            'hex': mdoc_bytes.hex()
+        },
+        'jwk': holder_jwk,
+        'proof_jwt': proof_jwt,
+        'nonce': nonce
+    }
+
+def _credential_summary(credential_data, credential_pk):
+    return {
+        'id': credential_pk,
+        'credential_id': credential_data['credential_id'],
+        'subject_id': credential_data['subject_id'],
+        'type': credential_data['type'],
+        'format': credential_data['format'],
+        'status': credential_data['status'],
+        'issued': credential_data['issued'].isoformat(),
+        'expires': credential_data['expires'].isoformat() if credential_data['expires'] else None
+    }
+
+def _upsert_dialect(session):
+    """Dialect module whose insert() supports ON CONFLICT, or None."""
+    return {'postgresql': postgresql, 'sqlite': sqlite}.get(session.get_bind().dialect.name)
+
+def _reserve_credentials(session, rows):
+    """
+    Reserve credential IDs before any signing work: insert the rows as
+    'pending' with INSERT ... ON CONFLICT (credential_id) DO NOTHING RETURNING
+    and return {credential_id: pk} for the reservations that won. A pending
+    row older than CREDENTIAL_RESERVATION_TIMEOUT (its request died before
+    activating it) is taken over instead of being treated as a conflict.
+    """
+    if not rows:
+        return {}
+    rows = [dict(row, status='pending') for row in rows]
+    dialect = _upsert_dialect(session)
+
+    if dialect is not None:
+        stmt = dialect.insert(Credential)
+        stale_before = datetime.datetime.now() - datetime.timedelta(
+            seconds=app.config.get('CREDENTIAL_RESERVATION_TIMEOUT', 300))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Credential.credential_id],
+            set_={c: stmt.excluded[c] for c in ('subject_id', 'type', 'format', 'issued', 'expires')},
+            where=(Credential.status == 'pending') & (Credential.issued < stale_before)
+        ).returning(Credential.id, Credential.credential_id)
+        reserved = {cid: pk for pk, cid in session.execute(stmt, rows)}
+        session.commit()
+        return reserved
+
+    # Other databases: one savepoint per row, a unique violation means taken
+    stmt = insert(Credential).returning(Credential.id, Credential.credential_id)
+    reserved = {}
+    for row in rows:
+        try:
+            with session.begin_nested():
+                pk, cid = session.execute(stmt, [row]).one()
+            reserved[cid] = pk
+        except IntegrityError:
+            pass
+    session.commit()
+    return reserved
+
+def _activate_credentials(session, statuses):
+    """Move reserved rows ({pk: final status}) out of 'pending' in one statement."""
+    if statuses:
+        session.execute(update(Credential), [{'id': pk, 'status': st} for pk, st in statuses.items()])
+    session.commit()
+
+def _release_reservations(session, pks):
+    """Drop reservations whose issuance failed so the IDs can be used again."""
+    if pks:
+        session.execute(delete(Credential).where(Credential.id.in_(pks), Credential.status == 'pending'))
+    session.commit()
+
+@app.route("/api/issue_credential", methods=["POST", "OPTIONS"])
+@idempotent(_IDEMPOTENCY)
+def issue_credential():
+    """Issue a new credential and save to database"""
+    if request.method == "OPTIONS":
+        return "", 200
+    
+    try:
+        data = request.get_json()
+        credential_data, error = _validate_issue_request(data)
+        if error:
+            return jsonify({
+                'success': False, 
+                'error': error
+            }), 400
 
-        # Save credential to database
         session = get_db_session()
         try:
-            # Check if credential_id already exists
-            existing = session.query(Credential).filter_by(credential_id=data['credential_id']).first()
-            if existing:
+            # Reserve the credential_id first, so a duplicate costs one INSERT, not an issuance
+            with STAGE_TIMINGS.stage('issue.reserve'):
+                reserved = _reserve_credentials(session, [credential_data])
+            if not reserved:
                 return jsonify({
                     'success': False, 
                     'error': 'Credential ID already exists'
                 }), 400
-            
-            # Create credential record
-            credential_data = {
-                'credential_id': data['credential_id'],
-                'subject_id': data.get('subject_id'),
-                'type': data['type'],
-                'format': data.get('format', 'ISO mdoc'),
-                'status': data.get('status', 'active'),
-                'issued': datetime.datetime.now(),
-                'expires': None
-            }
-            
-            # Parse expiry date if provided
-            if 'expires' in data and data['expires']:
-                try:
-                    credential_data['expires'] = datetime.datetime.fromisoformat(data['expires'].replace('Z', '+00:00'))
-                except ValueError:
-                    return jsonify({
-                        'success': False, 
-                        'error': 'Invalid expiry date format. Use ISO format (YYYY-MM-DDTHH:MM:SS)'
-                    }), 400
-            
-            credential = Credential(**credential_data)
-            session.add(credential)
-            session.commit()
+            credential_pk = reserved[credential_data['credential_id']]
+
+            try:
+                issued = _issue_mdoc(data)
+            except Exception as e:
+                _release_reservations(session, [credential_pk])
+                return jsonify({
+                    'success': False, 
+                    'error': f'Credential issuance failed: {str(e)}'
+                }), 500
+
+            with STAGE_TIMINGS.stage('issue.db_commit'):
+                _activate_credentials(session, {credential_pk: credential_data['status']})
             
             # Prepare response
             response_data = {
                 'success': True,
-                'credential': {
-                    'id': credential.id,
-                    'credential_id': credential.credential_id,
-                    'subject_id': credential.subject_id,
-                    'type': credential.type,
-                    'format': credential.format,
-                    'status': credential.status,
-                    'issued': credential.issued.isoformat(),
-                    'expires': credential.expires.isoformat() if credential.expires else None
-                },
-                'mdoc': {
-                    'base64url': mdoc_b64url,
-                    'hex': mdoc_hex
-                },
-                'jwk': holder_jwk,
-                'proof_jwt': proof_jwt,
-                'nonce': nonce
+                'credential': _credential_summary(credential_data, credential_pk),
+                **issued
             }
             
             return jsonify(response_data), 201
@@ -1073,9 +1597,143 @@ def issue_credential():
             'error': f'Credential issuance failed: {str(e)}'
         }), 500
 
+# ---------------------------------------------------------------------
+# Batch Issue Credentials API
+# ---------------------------------------------------------------------
+def _issue_batch_chunk(session, chunk, offset, seen_ids):
+    """Issue one chunk of a batch; yields one result dict per item, in order."""
+    results = [None] * len(chunk)
+    pending = {}  # index -> credential_data
+
+    for i, data in enumerate(chunk):
+        credential_data, error = _validate_issue_request(data)
+        if error:
+            results[i] = {'success': False, 'error': error}
+        elif credential_data['credential_id'] in seen_ids:
+            results[i] = {'success': False, 'error': 'Duplicate credential_id in batch'}
+        else:
+            seen_ids.add(credential_data['credential_id'])
+            pending[i] = credential_data
+
+    # Reserve every ID of the chunk in one statement; only winners get signed
+    reserved = _reserve_credentials(session, list(pending.values()))
+    for i in [i for i, cd in pending.items() if cd['credential_id'] not in reserved]:
+        results[i] = {'success': False, 'error': 'Credential ID already exists'}
+        del pending[i]
+
+    # Sign in parallel; one failure only fails (and releases) its own item
+    futures = {i: _BATCH_ISSUANCE_EXECUTOR.submit(_issue_mdoc, chunk[i]) for i in pending}
+    issued, failed_pks = {}, []
+    for i, future in futures.items():
+        try:
+            issued[i] = future.result()
+        except Exception as e:
+            results[i] = {'success': False, 'error': f'Credential issuance failed: {str(e)}'}
+            failed_pks.append(reserved[pending[i]['credential_id']])
+    _release_reservations(session, failed_pks)
+
+    _activate_credentials(session, {
+        reserved[pending[i]['credential_id']]: pending[i]['status'] for i in issued
+    })
+    for i, issued_item in issued.items():
+        credential_data = pending[i]
+        results[i] = {
+            'success': True,
+            'credential': _credential_summary(credential_data, reserved[credential_data['credential_id']]),
+            **issued_item
+        }
+
+    for i, result in enumerate(results):
+        data = chunk[i]
+        result['index'] = offset + i
+        result.setdefault('credential_id', data.get('credential_id') if isinstance(data, dict) else None)
+        yield result
+
+@app.route("/api/issue_credentials/batch", methods=["POST", "OPTIONS"])
+def issue_credentials_batch():
+    """
+    Issue many credentials in one request.
+
+    Accepts a JSON array of issuance requests (same fields as
+    /api/issue_credential) or {"credentials": [...]}. Items are processed in
+    chunks: one bulk ID reservation, parallel signing and one bulk activation
+    per chunk. Results are streamed back as NDJSON, one line per item in request
+    order, followed by a summary line.
+    """
+    if request.method == "OPTIONS":
+        return "", 200
+
+    body = request.get_json(silent=True)
+    items = body.get('credentials') if isinstance(body, dict) else body
+    if not isinstance(items, list) or not items:
+        return jsonify({
+            'success': False,
+            'error': 'Request body must be a non-empty array of credentials'
+        }), 400
+    max_items = app.config.get('BATCH_ISSUE_MAX_ITEMS', 50000)
+    if len(items) > max_items:
+        return jsonify({
+            'success': False,
+            'error': f'Batch too large: {len(items)} items (max {max_items})'
+        }), 413
+
+    chunk_size = app.config.get('BATCH_ISSUE_CHUNK_SIZE', 500)
+
+    def generate():
+        session = get_db_session()
+        seen_ids = set()
+        issued_count = 0
+        try:
+            for offset in range(0, len(items), chunk_size):
+                for result in _issue_batch_chunk(session, items[offset:offset + chunk_size], offset, seen_ids):
+                    issued_count += result['success']
+                    yield json.dumps(result) + "\n"
+        except Exception as e:
+            session.rollback()
+            yield json.dumps({'success': False, 'error': f'Batch issuance aborted: {str(e)}'}) + "\n"
+        finally:
+            session.close()
+        yield json.dumps({'summary': {
+            'total': len(items),
+            'issued': issued_count,
+            'failed': len(items) - issued_count
+        }}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 # ---------------------------------------------------------------------
 # Enhanced Verification API (saves to database)
 # ---------------------------------------------------------------------
+def _verify_all_documents_response(raw, verifier, start_time):
+    """
+    all_documents mode of /api/verify_credential: every document of a
+    DeviceResponse is verified (concurrently), reported individually and
+    logged as one row each, queued together as a single batch.
+    """
+    checked, cache_hit = _verify_mdoc_cached(raw, all_documents=True)
+    response_time = int((time.time() - start_time) * 1000)
+    documents = checked['documents']
+    verification_result = 'PASS' if all(doc['result'] == 'PASS' for doc in documents) else 'FAIL'
+
+    _log_verifications([
+        _verification_log_row(
+            f"EXTRACTED-{doc['docType'].split('.')[-1]}" if doc.get('docType') else 'UNKNOWN',
+            doc['result'], response_time, verifier)
+        for doc in documents
+    ])
+
+    return jsonify({
+        'success': True,
+        'verification': {
+            'result': verification_result,
+            'response_time_ms': response_time,
+            'verifier': verifier,
+            'document_count': len(documents),
+            'documents': documents,
+            'cache_hit': cache_hit
+        }
+    })
+
 @app.route("/api/verify_credential", methods=["POST"])
 def verify_credential_api():
     """Verify a credential and save verification log to database"""
@@ -1096,37 +1754,12 @@ def verify_credential_api():
         try:
             raw = b64url_decode_to_bytes(cred_b64)
 
-            # Load, deep-untag, and normalize to an IssuerSigned dict
-            decoded_any = _untag_deep(cbor2.loads(raw))
-            issuer_signed = _extract_issuersigned(decoded_any)
-
-            # issuerAuth -> COSE_Sign1
-            issuer_auth = issuer_signed["issuerAuth"]
-            sign1 = _sign1_from_issuer_auth(issuer_auth)
-            mso = cbor2.loads(sign1.payload)
-            sign1.key = _ISSUER_VERIFY_KEY
-            sig_ok = sign1.verify_signature()
-
-            # Verify digests with normalized namespace keys and deep-untagged bytes
-            ns_map = _norm_ns_keys(issuer_signed["nameSpaces"])
-            vd_all = _norm_ns_keys(mso["valueDigests"]["nameSpaces"])
-
-            dig_ok = True
-            for ns, items in ns_map.items():
-                vd_ns = vd_all.get(ns)
-                if vd_ns is None:
-                    dig_ok = False
-                    break
-                for item_b in items:
-                    b = _as_bytes(item_b)
-                    item = cbor2.loads(b)
-                    want = vd_ns[item["digestID"]]
-                    got = hashlib.sha256(b).digest()
-                    if want != got:
-                        dig_ok = False
-                        break
-                if not dig_ok:
-                    break
+            if data.get('all_documents'):
+                return _verify_all_documents_response(raw, verifier, start_time)
+
+            # Single-pass decode, issuer signature and value digests (cached by credential hash)
+            checked, cache_hit = _verify_mdoc_cached(raw)
+            sig_ok, dig_ok = checked['signature_valid'], checked['digests_valid']
 
             # Calculate response time
             response_time = int((time.time() - start_time) * 1000)  # Convert to milliseconds
@@ -1138,49 +1771,15 @@ def verify_credential_api():
             credential_id = None
             try:
                 # Try to extract from docType or other fields
-                doc_type = mso.get("docType", "")
+                doc_type = checked['docType'] or ""
                 if doc_type:
                     # You might need to adjust this based on your credential structure
                     credential_id = f"EXTRACTED-{doc_type.split('.')[-1]}"
             except:
                 pass
             
-            # Save verification log to database
-            session = get_db_session()
-            try:
-                # If we have a credential_id, check if it exists in database
-                if credential_id:
-                    existing_credential = session.query(Credential).filter_by(credential_id=credential_id).first()
-                    if not existing_credential:
-                        # Create a placeholder credential if it doesn't exist
-                        placeholder_credential = Credential(
-                            credential_id=credential_id,
-                            type='Unknown',
-                            format='ISO mdoc',
-                            status='active',
-                            issued=datetime.datetime.now()
-                        )
-                        session.add(placeholder_credential)
-                        session.commit()
-                
-                # Create verification log
-                verification_log = VerificationLog(
-                    credential_id=credential_id or 'UNKNOWN',
-                    result=verification_result,
-                    response_time=response_time,
-                    verifier=verifier,
-                    checked_at=datetime.datetime.now()
-                )
-                session.add(verification_log)
-                session.commit()
-                
-            except Exception as db_error:
-                session.rollback()
-                print(f"Database error during verification log save: {db_error}")
-                # Continue with verification even if database save fails
-            
-            finally:
-                session.close()
+            # Queue the verification log (written in batches off the request path)
+            _log_verification(credential_id or 'UNKNOWN', verification_result, response_time, verifier)
 
             # Prepare verification result
             verification_data = {
@@ -1191,12 +1790,11 @@ def verify_credential_api():
                     'verifier': verifier,
                     'signature_valid': bool(sig_ok),
                     'digests_valid': bool(dig_ok),
-                    'docType': mso.get("docType"),
-                    'validityInfo': mso.get("validityInfo"),
-                    'namespaces': {
-                        str(ns): [str(cbor2.loads(_as_bytes(b)).get("elementIdentifier", "")) for b in items]
-                        for ns, items in ns_map.items()
-                    }
+                    'docType': checked['docType'],
+                    'validityInfo': checked['validityInfo'],
+                    'namespaces': checked['namespaces'],
+                    'issuer': checked['issuer'],
+                    'cache_hit': cache_hit
                 }
             }
             
@@ -1207,22 +1805,7 @@ def verify_credential_api():
             response_time = int((time.time() - start_time) * 1000)
             
             # Save failed verification log
-            session = get_db_session()
-            try:
-                verification_log = VerificationLog(
-                    credential_id='UNKNOWN',
-                    result='FAIL',
-                    response_time=response_time,
-                    verifier=verifier,
-                    checked_at=datetime.datetime.now()
-                )
-                session.add(verification_log)
-                session.commit()
-            except Exception as db_error:
-                session.rollback()
-                print(f"Database error during failed verification log save: {db_error}")
-            finally:
-                session.close()
+            _log_verification('UNKNOWN', 'FAIL', response_time, verifier)
             
             return jsonify({
                 'success': False,
@@ -1240,6 +1823,121 @@ def verify_credential_api():
             'error': f'Verification request failed: {str(e)}'
         }), 500
 
+# ---------------------------------------------------------------------
+# Batch Verify Credentials API
+# ---------------------------------------------------------------------
+
+def _verify_batch_item(item, default_verifier):
+    """Verify one batch item; returns (result line, verification log row)."""
+    if isinstance(item, str):
+        item = {'credential': item}
+    verifier = (item.get('verifier') if isinstance(item, dict) else None) or default_verifier
+    start_time = time.time()
+    try:
+        if not isinstance(item, dict) or not isinstance(item.get('credential'), str):
+            raise ValueError('Missing credential data')
+        checked, cache_hit = _verify_mdoc_cached(b64url_decode_to_bytes(item['credential'].strip()))
+        response_time = int((time.time() - start_time) * 1000)
+        verification_result = 'PASS' if (checked['signature_valid'] and checked['digests_valid']) else 'FAIL'
+        doc_type = checked['docType'] or ""
+        credential_id = f"EXTRACTED-{doc_type.split('.')[-1]}" if doc_type else 'UNKNOWN'
+        line = {
+            'success': True,
+            'verification': {
+                'result': verification_result,
+                'response_time_ms': response_time,
+                'verifier': verifier,
+                **checked,
+                'cache_hit': cache_hit
+            }
+        }
+    except Exception as e:
+        response_time = int((time.time() - start_time) * 1000)
+        verification_result, credential_id = 'FAIL', 'UNKNOWN'
+        line = {
+            'success': False,
+            'error': f'Verification failed: {str(e)}',
+            'verification': {'result': 'FAIL', 'response_time_ms': response_time, 'verifier': verifier}
+        }
+    return line, _verification_log_row(credential_id, verification_result, response_time, verifier)
+
+def _read_verify_batch_items():
+    """
+    Return (items iterator, default verifier, error) for a JSON array /
+    {"credentials": [...]} body, or an NDJSON body read line by line.
+    """
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        def ndjson_items():
+            for line in request.stream:
+                line = line.strip()
+                if line:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield None  # reported as a per-item failure
+        return ndjson_items(), request.args.get('verifier', 'Batch-Processor'), None
+
+    body = request.get_json(silent=True)
+    items = body.get('credentials') if isinstance(body, dict) else body
+    if not isinstance(items, list) or not items:
+        return None, None, 'Request body must be a non-empty array of credentials'
+    verifier = (body.get('verifier') if isinstance(body, dict) else None) or 'Batch-Processor'
+    return iter(items), verifier, None
+
+@app.route("/api/verify_credentials/batch", methods=["POST", "OPTIONS"])
+def verify_credentials_batch():
+    """
+    Verify many credentials in one request.
+
+    Accepts a JSON array (of base64url strings or {"credential", "verifier"}
+    objects), {"credentials": [...], "verifier": ...}, or the same items as
+    NDJSON (Content-Type: application/x-ndjson). Items are verified in chunks
+    on the verification pool; results are streamed back as NDJSON in request
+    order, followed by a summary line. Each chunk's verification logs are
+    handed to the batched log writer before its results are streamed, so they
+    are kept even if the batch is aborted or the client disconnects.
+    """
+    if request.method == "OPTIONS":
+        return "", 200
+
+    items, default_verifier, error = _read_verify_batch_items()
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+
+    max_items = app.config.get('VERIFY_BATCH_MAX_ITEMS', 50000)
+    chunk_size = app.config.get('VERIFY_BATCH_CHUNK_SIZE', 500)
+
+    def chunks():
+        chunk, total = [], 0
+        for item in items:
+            total += 1
+            if total > max_items:
+                raise ValueError(f'Batch too large (max {max_items} items)')
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def generate():
+        counts = {'total': 0, 'passed': 0, 'failed': 0}
+        try:
+            for chunk in chunks():
+                results = list(_VERIFY_EXECUTOR.map(lambda item: _verify_batch_item(item, default_verifier), chunk))
+                with STAGE_TIMINGS.stage('verify_batch.log_enqueue'):
+                    _log_verifications([log_row for _line, log_row in results])
+                for line, log_row in results:
+                    line['index'] = counts['total']
+                    counts['total'] += 1
+                    counts['passed' if log_row['result'] == 'PASS' else 'failed'] += 1
+                    yield json.dumps(line) + "\n"
+        except Exception as e:
+            yield json.dumps({'success': False, 'error': f'Batch verification aborted: {str(e)}'}) + "\n"
+        yield json.dumps({'summary': counts}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 # ---------------------------------------------------------------------
 # Revoke Credential API
 # ---------------------------------------------------------------------
@@ -1284,6 +1982,7 @@ def revoke_credential():
             credential.status = 'revoked'
             
             session.commit()
+            _VERIFY_CACHE.invalidate()
             
             # Prepare response
             response_data = {
@@ -1397,6 +2096,7 @@ def extend_credential_expiry():
                 credential.status = 'active'
             
             session.commit()
+            _VERIFY_CACHE.invalidate()
             
             # Prepare response
             response_data = {
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Benchmark issuer signature verification: the previous pycose path (build a
+Sign1Message through a tag-18 re-encode and decode, then verify with an
+EC2Key) against the fast path in mdoc_decoder.verify_issuer_auth (Sig_structure
+from the raw protected header and payload, cryptography ECDSA verify with a
+cached public key object).
+
+Usage: python bench_cose_verify.py [iterations]
+"""
+import datetime
+import sys
+import tempfile
+import time
+
+import cbor2
+from cbor2 import CBORTag
+from cryptography.hazmat.primitives.asymmetric import ec
+from pycose.keys.curves import P256
+from pycose.keys.ec2 import EC2Key
+from pycose.messages import Sign1Message
+
+from ds_cert import DSCertificateManager
+from mdoc_builder import NativeMdocIssuer
+from mdoc_decoder import decode_mdoc, verify_issuer_auth
+
+ISSUER_D_HEX = "11" * 32  # same demo key as app_with_db.py
+DOCTYPE = "org.issuance-vc.bank.account.mDL"
+DATA = {"org.issuance-vc.bank.account": {"given_name": "Erika", "family_name": "Mustermann"}}
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    priv = ec.derive_private_key(int(ISSUER_D_HEX, 16), ec.SECP256R1())
+    pub = priv.public_key()
+    nums = pub.public_numbers()
+    cose_key = EC2Key(crv=P256, x=nums.x.to_bytes(32, "big"), y=nums.y.to_bytes(32, "big"))
+
+    issuer = NativeMdocIssuer(priv, DSCertificateManager(priv, cert_dir=tempfile.mkdtemp(prefix="bench_ds_")))
+    holder = ec.generate_private_key(ec.SECP256R1()).public_key().public_numbers()
+    device_key = {1: 2, -1: 1, -2: holder.x.to_bytes(32, "big"), -3: holder.y.to_bytes(32, "big")}
+    today = datetime.date.today()
+    raw = issuer.build(DOCTYPE, DATA, device_key, {
+        "issuance_date": today.isoformat(),
+        "expiry_date": today.replace(year=today.year + 1).isoformat()
+    })
+    issuer_auth = decode_mdoc(raw)[0].issuer_auth
+    tampered = issuer_auth[:3] + [bytes([issuer_auth[3][0] ^ 1]) + issuer_auth[3][1:]]
+
+    def pycose_path(auth):
+        sign1 = Sign1Message.decode(cbor2.dumps(CBORTag(18, auth)))
+        sign1.key = cose_key
+        return sign1.verify_signature()
+
+    def fast_path(auth):
+        return verify_issuer_auth(auth, pub)
+
+    for auth, expected in ((issuer_auth, True), (tampered, False)):
+        assert bool(pycose_path(auth)) == fast_path(auth) == expected, "verifiers disagree"
+    print("✅ both verifiers accept the issued signature and reject a tampered one")
+
+    print(f"\n{iterations} verifications each")
+    timings = {}
+    for name, fn in (("pycose", pycose_path), ("fast-path", fast_path)):
+        fn(issuer_auth)  # warm-up
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn(issuer_auth)
+        timings[name] = elapsed = time.perf_counter() - start
+        print(f"{name:<10} {iterations / elapsed:10.1f} ops/s   {elapsed / iterations * 1e6:8.1f} us/op")
+    print(f"\nspeed-up: {timings['pycose'] / timings['fast-path']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark the native mdoc builder against the pymdoccbor (MdocCborIssuer) path.
+
+Both builders sign with the demo issuer key and the same cached DS certificate.
+The native output is also checked for compatibility: it must have the same
+CBOR layout as the pymdoccbor output and pass pymdoccbor's own verifier.
+
+Usage: python bench_mdoc_builder.py [iterations]
+"""
+import datetime
+import sys
+import tempfile
+import time
+
+import cbor2
+from cryptography.hazmat.primitives.asymmetric import ec
+from pymdoccbor.mdoc.issuer import MdocCborIssuer
+from pymdoccbor.mdoc.verifier import MdocCbor
+
+from ds_cert import DSCertificateManager
+from mdoc_builder import NativeMdocIssuer
+
+ISSUER_D_HEX = "11" * 32  # same demo key as app_with_db.py
+DOCTYPE = "org.issuance-vc.bank.account.mDL"
+DATA = {
+    "org.issuance-vc.bank.account": {
+        "given_name": "Erika",
+        "family_name": "Mustermann",
+        "birth_date": "1990-01-01",
+        "account_id": "ACC-123456",
+    }
+}
+
+
+def make_device_key():
+    pub = ec.generate_private_key(ec.SECP256R1()).public_key().public_numbers()
+    return {1: 2, -1: 1, -2: pub.x.to_bytes(32, "big"), -3: pub.y.to_bytes(32, "big")}
+
+
+def build_pymdoccbor(priv, ds_certs, device_key, validity):
+    d = priv.private_numbers().private_value.to_bytes(32, "big")
+    issuer = MdocCborIssuer(
+        private_key={"KTY": "EC2", "CURVE": "P_256", "ALG": "ES256", "D": d, "KID": b"issuer-demo-kid"},
+        alg="ES256"
+    )
+    issuer.new(doctype=DOCTYPE, data=DATA, devicekeyinfo=device_key,
+               validity=validity, cert_path=ds_certs.current().path)
+    return issuer.dump()
+
+
+def shape(obj):
+    """Structure of a decoded mdoc with values stripped (types, keys, tags)."""
+    if isinstance(obj, cbor2.CBORTag):
+        inner = cbor2.loads(obj.value) if obj.tag == 24 else obj.value
+        return ("tag", obj.tag, shape(inner))
+    if isinstance(obj, dict):
+        return {k: shape(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [shape(x) for x in obj]
+    return type(obj).__name__
+
+
+def check_compatibility(ref_bytes, native_bytes):
+    ref, native = cbor2.loads(ref_bytes), cbor2.loads(native_bytes)
+    ref_auth = ref["documents"][0]["issuerSigned"]["issuerAuth"]
+    native_auth = native["documents"][0]["issuerSigned"]["issuerAuth"]
+    assert ref_auth[0] == native_auth[0], "protected header differs"
+    assert ref_auth[1] == native_auth[1], "x5chain header differs"
+    assert list(ref) == list(native), "top-level key order differs"
+
+    ref_mso = cbor2.loads(cbor2.loads(ref_auth[2]).value)
+    native_mso = cbor2.loads(cbor2.loads(native_auth[2]).value)
+    assert list(ref_mso) == list(native_mso), "MSO key order differs"
+    assert shape(ref_mso) == shape(native_mso), "MSO structure differs"
+
+    verifier = MdocCbor()
+    verifier.loads(native_bytes)
+    assert verifier.verify(), "pymdoccbor rejected native output"
+
+
+def run(name, fn, iterations):
+    fn()  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    elapsed = time.perf_counter() - start
+    print(f"{name:<12} {iterations / elapsed:10.1f} ops/s   {elapsed / iterations * 1000:8.3f} ms/op")
+    return elapsed
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    priv = ec.derive_private_key(int(ISSUER_D_HEX, 16), ec.SECP256R1())
+    ds_certs = DSCertificateManager(priv, cert_dir=tempfile.mkdtemp(prefix="bench_ds_"))
+    native = NativeMdocIssuer(priv, ds_certs)
+    device_key = make_device_key()
+    today = datetime.date.today()
+    validity = {
+        "issuance_date": today.isoformat(),
+        "expiry_date": today.replace(year=today.year + 1).isoformat()
+    }
+
+    check_compatibility(
+        build_pymdoccbor(priv, ds_certs, device_key, validity),
+        native.build(DOCTYPE, DATA, device_key, validity)
+    )
+    print("✅ native output is layout-compatible and passes pymdoccbor verification")
+
+    print(f"\n{iterations} issuances each")
+    ref = run("pymdoccbor", lambda: build_pymdoccbor(priv, ds_certs, device_key, validity), iterations)
+    new = run("native", lambda: native.build(DOCTYPE, DATA, device_key, validity), iterations)
+    print(f"\nspeed-up: {ref / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Benchmark the single-pass verification decoder (mdoc_decoder.py) against the
+previous multi-pass decoding in verify_credential_api.
+
+The multi-pass reference reproduces what the endpoints used to do: deep-untag
+the whole document (again while locating IssuerSigned and normalising the
+namespace maps), then cbor2.loads every IssuerSignedItem twice, once for the
+digest check and once to list the element identifiers. Both paths stop short
+of the signature check, which is the same for both.
+
+Usage: python bench_verify_decoder.py [iterations]
+"""
+import datetime
+import hashlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cbor2
+from cbor2 import CBORTag
+from cryptography.hazmat.primitives.asymmetric import ec
+
+from ds_cert import DSCertificateManager
+from mdoc_builder import NativeMdocIssuer
+from mdoc_decoder import decode_mdoc, verify_digests
+
+ISSUER_D_HEX = "11" * 32  # same demo key as app_with_db.py
+DOCTYPE = "org.issuance-vc.bank.account.mDL"
+DATA = {
+    "org.issuance-vc.bank.account": {
+        "given_name": "Erika",
+        "family_name": "Mustermann",
+        "birth_date": "1990-01-01",
+        "account_id": "ACC-123456",
+        **{f"custom_{i}": f"value {i}" for i in range(12)},
+    }
+}
+
+
+def untag_deep(obj):
+    if isinstance(obj, CBORTag):
+        return untag_deep(obj.value)
+    if isinstance(obj, dict):
+        return {untag_deep(k): untag_deep(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [untag_deep(x) for x in obj]
+    return obj
+
+
+def multi_pass(raw):
+    """Previous decoding steps (adapted to the #6.24 MSO/digest layout)."""
+    d = untag_deep(cbor2.loads(raw))
+    doc0 = untag_deep(d["documents"][0])
+    issuer_signed = untag_deep(untag_deep(doc0["issuerSigned"]))
+    issuer_auth = untag_deep(issuer_signed["issuerAuth"])
+    mso = untag_deep(cbor2.loads(untag_deep(cbor2.loads(issuer_auth[2]))))
+    ns_map = {k: v for k, v in untag_deep(issuer_signed["nameSpaces"]).items()}
+    vd_all = {k: v for k, v in untag_deep(mso["valueDigests"]).items()}
+    ok = True
+    for ns, items in ns_map.items():
+        for item_b in items:
+            b = untag_deep(item_b)
+            item = cbor2.loads(b)
+            tagged = cbor2.dumps(CBORTag(24, b))
+            ok &= vd_all[ns][item["digestID"]] == hashlib.sha256(tagged).digest()
+    names = {ns: [cbor2.loads(untag_deep(b))["elementIdentifier"] for b in items] for ns, items in ns_map.items()}
+    return ok, names
+
+
+def single_pass(raw):
+    doc = decode_mdoc(raw)[0]
+    names = {ns: [item.element_identifier for item in items] for ns, items in doc.name_spaces.items()}
+    return verify_digests(doc), names
+
+
+def peak_memory(fn, raw, iterations=50):
+    """Average peak traced memory per call, in bytes."""
+    fn(raw)
+    tracemalloc.start(1)
+    total = 0
+    for _ in range(iterations):
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        fn(raw)
+        total += tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return total / iterations
+
+
+def run(name, fn, raw, iterations):
+    fn(raw)  # warm-up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(raw)
+    elapsed = time.perf_counter() - start
+    peak = peak_memory(fn, raw)
+    print(f"{name:<12} {iterations / elapsed:10.1f} ops/s   {elapsed / iterations * 1e6:8.1f} us/op   "
+          f"peak {peak / 1024:7.1f} KiB/op")
+    return elapsed, peak
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    priv = ec.derive_private_key(int(ISSUER_D_HEX, 16), ec.SECP256R1())
+    issuer = NativeMdocIssuer(priv, DSCertificateManager(priv, cert_dir=tempfile.mkdtemp(prefix="bench_ds_")))
+    pub = ec.generate_private_key(ec.SECP256R1()).public_key().public_numbers()
+    device_key = {1: 2, -1: 1, -2: pub.x.to_bytes(32, "big"), -3: pub.y.to_bytes(32, "big")}
+    today = datetime.date.today()
+    raw = issuer.build(DOCTYPE, DATA, device_key, {
+        "issuance_date": today.isoformat(),
+        "expiry_date": today.replace(year=today.year + 1).isoformat()
+    })
+
+    assert multi_pass(raw) == single_pass(raw), "decoders disagree"
+    assert single_pass(raw)[0], "digest check failed"
+    print(f"✅ both decoders verify the digests ({len(raw)} bytes, {len(DATA[next(iter(DATA))])} items)")
+
+    print(f"\n{iterations} decodes each")
+    ref_t, ref_m = run("multi-pass", multi_pass, raw, iterations)
+    new_t, new_m = run("single-pass", single_pass, raw, iterations)
+    print(f"\nspeed-up: {ref_t / new_t:.2f}x   peak memory: {new_m / 1024:.1f} KiB vs {ref_m / 1024:.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
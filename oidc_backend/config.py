@@ -17,6 +17,123 @@ class Config:
     CONFIG_ID = "org.iso.18013.5.1.mDL"
     ALG_COSE = -7
     ALG_JOSE = "ES256"
+    # Max proofs (and so credentials) per /credential request
+    BATCH_CREDENTIAL_ISSUANCE_SIZE = int(os.environ.get('BATCH_CREDENTIAL_ISSUANCE_SIZE', 10))
+
+    # OID4VCI token store: 'postgres' (UNLOGGED token_store table in the app
+    # database, shared by every worker), 'redis' (any Redis-protocol server at
+    # TOKEN_STORE_URL) or 'memory' (single worker only)
+    TOKEN_STORE_BACKEND = os.environ.get('TOKEN_STORE_BACKEND', 'postgres')
+    TOKEN_STORE_URL = os.environ.get('TOKEN_STORE_URL')  # e.g. redis://localhost:6379/0
+    TOKEN_STORE_PREFIX = os.environ.get('TOKEN_STORE_PREFIX', 'oid4vci:')
+    # memory backend: size cap (oldest entries are evicted past it) and lock stripes
+    TOKEN_STORE_MAX_ENTRIES = int(os.environ.get('TOKEN_STORE_MAX_ENTRIES', 100000))
+    TOKEN_STORE_SHARDS = int(os.environ.get('TOKEN_STORE_SHARDS', 16))
+    PRE_AUTH_CODE_TTL = int(os.environ.get('PRE_AUTH_CODE_TTL', 600))
+    ACCESS_TOKEN_TTL = int(os.environ.get('ACCESS_TOKEN_TTL', 600))
+    C_NONCE_TTL = int(os.environ.get('C_NONCE_TTL', 180))
+    # Access tokens: 'opaque' (random, kept in the token store) or 'jwt' (signed,
+    # stateless). ACCESS_TOKEN_KEYS is "kid=secret,..." for HS256 or
+    # "kid=/path/key.pem,..." for ES256; the first key signs, the others only
+    # verify (rotation). HS256 without keys derives one from SECRET_KEY.
+    ACCESS_TOKEN_FORMAT = os.environ.get('ACCESS_TOKEN_FORMAT', 'opaque')
+    ACCESS_TOKEN_ALG = os.environ.get('ACCESS_TOKEN_ALG', 'HS256')
+    ACCESS_TOKEN_KEYS = os.environ.get('ACCESS_TOKEN_KEYS')
+    # Stateless c_nonces: HMAC secrets "current,previous" (default derived from
+    # SECRET_KEY); replay filter 'store' (token store, shared by every worker
+    # using the same backend) or 'local' (this process only: single worker only,
+    # any worker accepts any nonce, so with 'local' each worker would accept it once)
+    NONCE_SECRETS = os.environ.get('NONCE_SECRETS')
+    NONCE_REPLAY_FILTER = os.environ.get('NONCE_REPLAY_FILTER', 'store')
+    # Per-client token buckets: "endpoint=requests/seconds[:burst],..." for
+    # offer, token, nonce and credential, keyed by client address
+    RATE_LIMITS = os.environ.get('RATE_LIMITS', 'offer=60/60:20,token=60/60:20,nonce=300/60:50')
+    # Reverse proxies in front of the app that append X-Forwarded-For (1 for the
+    # bundled nginx; 0 when clients connect directly, or they could spoof it)
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+    # Admission control: /credential requests in flight at once (0 disables);
+    # others wait up to CREDENTIAL_ADMISSION_WAIT seconds, then get a 503
+    CREDENTIAL_MAX_CONCURRENCY = int(os.environ.get('CREDENTIAL_MAX_CONCURRENCY', 16))
+    CREDENTIAL_ADMISSION_WAIT = float(os.environ.get('CREDENTIAL_ADMISSION_WAIT', 0.25))
+    CREDENTIAL_SLOT_LEASE_SECONDS = int(os.environ.get('CREDENTIAL_SLOT_LEASE_SECONDS', 120))
+    CREDENTIAL_RETRY_AFTER = int(os.environ.get('CREDENTIAL_RETRY_AFTER', 1))
+
+    # Document-signer certificate (cached per issuer key, rotated on a schedule)
+    DS_CERT_DIR = os.environ.get('DS_CERT_DIR')  # defaults to <tmp>/oidc_ds_certs
+    DS_CERT_VALIDITY_DAYS = int(os.environ.get('DS_CERT_VALIDITY_DAYS', 365))
+    DS_CERT_ROTATE_DAYS = int(os.environ.get('DS_CERT_ROTATE_DAYS', 30))
+
+    # mdoc builder: 'pymdoccbor' (MdocCborIssuer) or 'native' (mdoc_builder.py)
+    MDOC_BUILDER = os.environ.get('MDOC_BUILDER', 'pymdoccbor')
+
+    # Listings (/api/credentials, /api/verification-logs): page size for ?limit=
+    PAGE_SIZE_DEFAULT = int(os.environ.get('PAGE_SIZE_DEFAULT', 100))
+    PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', 1000))
+
+    # Thread pools: ISSUANCE_WORKERS for interactive /credential work, and a
+    # separate BATCH_ISSUANCE_WORKERS pool for /api/issue_credentials/batch
+    ISSUANCE_WORKERS = int(os.environ.get('ISSUANCE_WORKERS', 4))
+    BATCH_ISSUANCE_WORKERS = int(os.environ.get('BATCH_ISSUANCE_WORKERS', 2))
+    # Batch issuance (/api/issue_credentials/batch)
+    BATCH_ISSUE_MAX_ITEMS = int(os.environ.get('BATCH_ISSUE_MAX_ITEMS', 50000))
+    BATCH_ISSUE_CHUNK_SIZE = int(os.environ.get('BATCH_ISSUE_CHUNK_SIZE', 500))
+    # A 'pending' credential_id reservation older than this is considered abandoned
+    CREDENTIAL_RESERVATION_TIMEOUT = int(os.environ.get('CREDENTIAL_RESERVATION_TIMEOUT', 300))
+
+    # Signing executor: 0 signs inline, N > 0 uses a pool of N processes.
+    # The pool starts after the app's threads do, so avoid 'fork' there.
+    SIGNING_POOL_WORKERS = int(os.environ.get('SIGNING_POOL_WORKERS', 0))
+    SIGNING_TIMEOUT = float(os.environ.get('SIGNING_TIMEOUT', 30))
+    SIGNING_POOL_START_METHOD = os.environ.get('SIGNING_POOL_START_METHOD', 'forkserver')
+
+    # Pre-generated holder key pool (high watermark 0 disables it)
+    HOLDER_KEY_POOL_LOW_WATERMARK = int(os.environ.get('HOLDER_KEY_POOL_LOW_WATERMARK', 32))
+    HOLDER_KEY_POOL_HIGH_WATERMARK = int(os.environ.get('HOLDER_KEY_POOL_HIGH_WATERMARK', 256))
+
+    # Deferred issuance: 'off', 'always', or 'auto' (defer while the signer
+    # has DEFERRED_ISSUANCE_AUTO_DEPTH or more requests in flight)
+    DEFERRED_ISSUANCE = os.environ.get('DEFERRED_ISSUANCE', 'off')
+    DEFERRED_ISSUANCE_AUTO_DEPTH = int(os.environ.get('DEFERRED_ISSUANCE_AUTO_DEPTH', 8))
+    DEFERRED_ISSUANCE_WORKERS = int(os.environ.get('DEFERRED_ISSUANCE_WORKERS', 2))
+    DEFERRED_QUEUE_MAX_PENDING = int(os.environ.get('DEFERRED_QUEUE_MAX_PENDING', 1000))
+    DEFERRED_POLL_INTERVAL = float(os.environ.get('DEFERRED_POLL_INTERVAL', 1.0))
+    DEFERRED_JOB_LEASE_SECONDS = int(os.environ.get('DEFERRED_JOB_LEASE_SECONDS', 120))
+    DEFERRED_RETRY_INTERVAL = int(os.environ.get('DEFERRED_RETRY_INTERVAL', 5))  # 'interval' returned to wallets
+
+    # Idempotency-Key handling for /api/issue_credential and /credential
+    IDEMPOTENCY_TTL_SECONDS = int(os.environ.get('IDEMPOTENCY_TTL_SECONDS', 86400))
+    IDEMPOTENCY_WAIT_TIMEOUT = float(os.environ.get('IDEMPOTENCY_WAIT_TIMEOUT', 30))  # duplicate waits this long
+    IDEMPOTENCY_LOCK_TIMEOUT = float(os.environ.get('IDEMPOTENCY_LOCK_TIMEOUT', 120))  # then a stuck key is taken over
+    IDEMPOTENCY_CACHE_SIZE = int(os.environ.get('IDEMPOTENCY_CACHE_SIZE', 10000))
+
+    # Batch verification (/api/verify_credentials/batch)
+    VERIFY_WORKERS = int(os.environ.get('VERIFY_WORKERS', 4))
+    VERIFY_BATCH_MAX_ITEMS = int(os.environ.get('VERIFY_BATCH_MAX_ITEMS', 50000))
+    VERIFY_BATCH_CHUNK_SIZE = int(os.environ.get('VERIFY_BATCH_CHUNK_SIZE', 500))
+
+    # Verification logs: queued and written in batches off the request path
+    VERIFY_LOG_ASYNC = os.environ.get('VERIFY_LOG_ASYNC', 'true').lower() in ('1', 'true', 'yes')
+    VERIFY_LOG_QUEUE_SIZE = int(os.environ.get('VERIFY_LOG_QUEUE_SIZE', 10000))
+    VERIFY_LOG_BATCH_SIZE = int(os.environ.get('VERIFY_LOG_BATCH_SIZE', 500))
+    VERIFY_LOG_FLUSH_INTERVAL = float(os.environ.get('VERIFY_LOG_FLUSH_INTERVAL', 0.5))
+    VERIFY_LOG_PUT_TIMEOUT = float(os.environ.get('VERIFY_LOG_PUT_TIMEOUT', 1.0))  # then written inline
+    KNOWN_CREDENTIAL_IDS_MAX = int(os.environ.get('KNOWN_CREDENTIAL_IDS_MAX', 100000))  # per-worker known-ID set
+
+    # Verification result cache (per worker; 0 disables). Revoke/extend clear it
+    # in the worker that handles them, the TTL bounds staleness in the others.
+    VERIFY_CACHE_SIZE = int(os.environ.get('VERIFY_CACHE_SIZE', 10000))
+    VERIFY_CACHE_TTL_SECONDS = int(os.environ.get('VERIFY_CACHE_TTL_SECONDS', 60))
+
+    # Issuer trust store: extra anchor certificates (*.der/*.pem/*.crt) and the
+    # per-worker cache of validated x5chains
+    TRUST_ANCHOR_DIR = os.environ.get('TRUST_ANCHOR_DIR')
+    TRUST_CHAIN_CACHE_SIZE = int(os.environ.get('TRUST_CHAIN_CACHE_SIZE', 1000))
+    TRUST_CHAIN_CACHE_TTL_SECONDS = int(os.environ.get('TRUST_CHAIN_CACHE_TTL_SECONDS', 3600))
+    # Verify credentials without kid/x5chain with the demo issuer key
+    TRUST_ALLOW_UNIDENTIFIED = os.environ.get('TRUST_ALLOW_UNIDENTIFIED', 'true').lower() in ('1', 'true', 'yes')
+
+    # Add a Server-Timing header with the per-stage timings to instrumented responses
+    SERVER_TIMING = os.environ.get('SERVER_TIMING', 'false').lower() in ('1', 'true', 'yes')
 
 class DevelopmentConfig(Config):
     """Development configuration"""
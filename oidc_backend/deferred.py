@@ -0,0 +1,218 @@
+import atexit
+import datetime
+import json
+import os
+import secrets
+import threading
+
+from sqlalchemy import func, or_, select, update
+
+from database import get_db_session
+from models import IssuanceJob
+
+# Job states; 'running' jobs whose lease expired are claimable again
+PENDING, RUNNING, DONE, FAILED, DELIVERED = 'pending', 'running', 'done', 'failed', 'delivered'
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the queue already holds max_pending open jobs."""
+
+
+class DeferredIssuanceQueue:
+    """
+    Database-backed job queue for OID4VCI deferred issuance.
+
+    submit() inserts a pending issuance_job row and returns its transaction_id;
+    worker threads claim jobs with a conditional UPDATE (so concurrent workers,
+    including those of other gunicorn processes, never run the same job), run
+    build_fn(request) and store the credentials. A job claimed by a process
+    that died is picked up again once its lease expires, so accepted requests
+    survive restarts. Worker threads are started per PID by start(), which
+    the app calls on every request while deferred issuance is enabled (so
+    each gunicorn worker starts its own after the fork); nothing else starts
+    them. Timestamps are naive UTC throughout.
+    """
+
+    def __init__(self, app, build_fn, workers=2, max_pending=1000, poll_interval=1.0,
+                 lease_seconds=120, max_attempts=3, retention_seconds=86400):
+        self.app = app
+        self.build_fn = build_fn
+        self.workers = workers
+        self.max_pending = max_pending
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._threads_pid = None
+        self._last_purge = 0.0
+        self.completed = 0
+        self.failed = 0
+        atexit.register(self.shutdown)
+
+    # ---------- producer side ----------------------------------------
+    def submit(self, request: dict, token_hash: str) -> str:
+        """Persist a job and return its transaction_id (raises QueueFull)."""
+        session = get_db_session()
+        try:
+            open_jobs = session.scalar(
+                select(func.count()).select_from(IssuanceJob).where(IssuanceJob.status.in_((PENDING, RUNNING)))
+            )
+            if open_jobs >= self.max_pending:
+                raise QueueFull(f"deferred issuance queue is full ({open_jobs} open jobs)")
+            transaction_id = secrets.token_urlsafe(24)
+            session.add(IssuanceJob(
+                transaction_id=transaction_id,
+                token_hash=token_hash,
+                status=PENDING,
+                request=json.dumps(request),
+                attempts=0,
+                created=datetime.datetime.utcnow()
+            ))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        self._wakeup.set()
+        return transaction_id
+
+    def fetch(self, transaction_id: str, token_hash: str):
+        """
+        Return (status, credentials_or_error) for a transaction.
+        Delivered credentials are cleared, so a transaction_id is single-use.
+        """
+        session = get_db_session()
+        try:
+            job = session.query(IssuanceJob).filter_by(transaction_id=transaction_id).first()
+            if job is None or job.token_hash != token_hash or job.status == DELIVERED:
+                return None, None
+            if job.status == DONE:
+                credentials = json.loads(job.result)
+                job.status = DELIVERED
+                job.result = None
+                session.commit()
+                return DONE, credentials
+            if job.status == FAILED:
+                return FAILED, job.error
+            return PENDING, None
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    # ---------- worker side ------------------------------------------
+    def start(self):
+        """Start this process's worker threads (no-op once running)."""
+        pid = os.getpid()
+        if self._threads_pid == pid or self.workers <= 0:
+            return
+        with self._lock:
+            if self._threads_pid != pid:
+                self._threads = [
+                    threading.Thread(target=self._worker_loop, name=f"deferred-issuance-{i}", daemon=True)
+                    for i in range(self.workers)
+                ]
+                self._threads_pid = pid
+                for thread in self._threads:
+                    thread.start()
+
+    def _claim(self, session):
+        """Atomically move one claimable job to 'running'; returns it or None."""
+        now = datetime.datetime.utcnow()
+        lease_cutoff = now - datetime.timedelta(seconds=self.lease_seconds)
+        claimable = or_(
+            IssuanceJob.status == PENDING,
+            (IssuanceJob.status == RUNNING) & (IssuanceJob.claimed_at < lease_cutoff)
+        )
+        candidates = session.scalars(
+            select(IssuanceJob.id).where(claimable).order_by(IssuanceJob.id).limit(self.workers * 2)
+        ).all()
+        for job_id in candidates:
+            claimed = session.execute(
+                update(IssuanceJob)
+                .where(IssuanceJob.id == job_id, claimable)
+                .values(status=RUNNING, claimed_at=now, attempts=IssuanceJob.attempts + 1)
+            ).rowcount
+            session.commit()
+            if claimed:
+                return session.get(IssuanceJob, job_id)
+        return None
+
+    def _run_job(self, session, job):
+        try:
+            credentials = self.build_fn(json.loads(job.request))
+            job.status, job.result, job.error = DONE, json.dumps(credentials), None
+            self.completed += 1
+        except Exception as e:
+            job.error = str(e)
+            if job.attempts >= self.max_attempts:
+                job.status = FAILED
+                self.failed += 1
+            else:
+                job.status = PENDING
+        job.finished_at = datetime.datetime.utcnow()
+        session.commit()
+
+    def _purge(self, session):
+        """Drop delivered/failed jobs older than the retention period (at most once a minute)."""
+        now = datetime.datetime.utcnow()
+        if (now.timestamp() - self._last_purge) < 60:
+            return
+        self._last_purge = now.timestamp()
+        cutoff = now - datetime.timedelta(seconds=self.retention_seconds)
+        session.query(IssuanceJob).filter(
+            IssuanceJob.status.in_((DELIVERED, FAILED, DONE)),
+            IssuanceJob.created < cutoff
+        ).delete(synchronize_session=False)
+        session.commit()
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            job = None
+            with self.app.app_context():
+                session = get_db_session()
+                try:
+                    job = self._claim(session)
+                    if job is not None:
+                        self._run_job(session, job)
+                    else:
+                        self._purge(session)
+                except Exception as e:
+                    session.rollback()
+                    print(f"Deferred issuance worker error: {e}")
+                finally:
+                    session.close()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def metrics(self) -> dict:
+        session = get_db_session()
+        try:
+            counts = dict(session.execute(
+                select(IssuanceJob.status, func.count()).group_by(IssuanceJob.status)
+            ).all())
+        finally:
+            session.close()
+        return {
+            'workers': self.workers,
+            'workers_alive': sum(t.is_alive() for t in self._threads) if self._threads_pid == os.getpid() else 0,
+            'max_pending': self.max_pending,
+            'queue_depth': counts.get(PENDING, 0),
+            'running': counts.get(RUNNING, 0),
+            'ready': counts.get(DONE, 0),
+            'failed_jobs': counts.get(FAILED, 0),
+            'completed': self.completed,
+            'failed': self.failed
+        }
+
+    def shutdown(self):
+        # Jobs still running are re-claimed by any process once their lease expires
+        self._stopping.set()
+        self._wakeup.set()
@@ -0,0 +1,164 @@
+import datetime
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+from cryptography import x509
+from cryptography.x509 import NameOID
+from cryptography.hazmat.primitives import hashes, serialization
+
+# Files older than this that look like leftovers (partial writes, per-issuance
+# temp certs written by earlier versions) are removed by cleanup().
+STALE_FILE_SECONDS = 3600
+LEGACY_TEMP_PREFIX = "issuer_ds_"
+
+
+def _selfsigned_cert_der_ec(priv_key, cn="Demo DS (not for prod)", days=365) -> bytes:
+    now = datetime.datetime.utcnow()
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, cn)])
+    builder = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(priv_key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - datetime.timedelta(minutes=1))
+        .not_valid_after(now + datetime.timedelta(days=days))
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+    )
+    cert = builder.sign(private_key=priv_key, algorithm=hashes.SHA256())
+    return cert.public_bytes(serialization.Encoding.DER)
+
+
+def _public_key_id(priv_key) -> str:
+    spki = priv_key.public_key().public_bytes(
+        encoding=serialization.Encoding.DER,
+        format=serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+    return hashlib.sha256(spki).hexdigest()[:16]
+
+
+class DSCertificate:
+    """A loaded document-signer certificate kept in memory."""
+
+    def __init__(self, der: bytes, path: str, rotate_after: int):
+        self.der = der
+        self.path = path
+        self.cert = x509.load_der_x509_certificate(der)
+        # COSE header 33 (x5chain): a single certificate is a bare bstr
+        self.x5chain = der
+        self.fingerprint = hashlib.sha256(der).hexdigest()
+        self.not_before = self.cert.not_valid_before
+        self.not_after = self.cert.not_valid_after
+
+        # Epoch seconds after which the manager mints a replacement; checked
+        # on every issuance, so keep it a plain float comparison.
+        not_before_ts = self.not_before.replace(tzinfo=datetime.timezone.utc).timestamp()
+        not_after_ts = self.not_after.replace(tzinfo=datetime.timezone.utc).timestamp()
+        self.rotate_at = min(not_before_ts + rotate_after, not_after_ts - 86400)
+
+    def due_for_rotation(self, now=None) -> bool:
+        return (now or time.time()) >= self.rotate_at
+
+    def __repr__(self):
+        return f"<DSCertificate(fingerprint='{self.fingerprint[:16]}', not_after='{self.not_after.isoformat()}')>"
+
+
+class DSCertificateManager:
+    """
+    Load-or-create the self-signed DS certificate for one issuer key.
+
+    The certificate is written once to ``<cert_dir>/ds_<key id>.der`` so every
+    worker sharing the directory reuses it, and is held in memory (DER and
+    x5chain) so issuance never builds or signs a certificate on the hot path.
+    Rotation rewrites the same file atomically, so the directory does not grow.
+    """
+
+    def __init__(self, private_key, cert_dir=None, validity_days=365, rotate_days=30,
+                 cn="Demo DS (not for prod)"):
+        self.private_key = private_key
+        self.cert_dir = cert_dir or os.path.join(tempfile.gettempdir(), "oidc_ds_certs")
+        self.validity_days = validity_days
+        self.rotate_after = rotate_days * 86400
+        self.cn = cn
+        self.key_id = _public_key_id(private_key)
+        self.path = os.path.join(self.cert_dir, f"ds_{self.key_id}.der")
+        self._lock = threading.Lock()
+        self._current = None
+
+    def current(self) -> DSCertificate:
+        """Return the active certificate, loading or rotating it if needed."""
+        cert = self._current
+        if cert is not None and not cert.due_for_rotation():
+            return cert
+        with self._lock:
+            if self._current is None or self._current.due_for_rotation():
+                self._current = self._load_or_create()
+            return self._current
+
+    def rotate(self) -> DSCertificate:
+        """Force a new certificate regardless of the schedule."""
+        with self._lock:
+            self._current = self._create()
+            return self._current
+
+    def _load_or_create(self) -> DSCertificate:
+        try:
+            with open(self.path, "rb") as f:
+                cert = DSCertificate(f.read(), self.path, self.rotate_after)
+            if self._matches_key(cert) and not cert.due_for_rotation():
+                return cert
+        except (OSError, ValueError):
+            pass
+        return self._create()
+
+    def _matches_key(self, cert: DSCertificate) -> bool:
+        fmt = (serialization.Encoding.DER, serialization.PublicFormat.SubjectPublicKeyInfo)
+        return cert.cert.public_key().public_bytes(*fmt) == self.private_key.public_key().public_bytes(*fmt)
+
+    def _create(self) -> DSCertificate:
+        der = _selfsigned_cert_der_ec(self.private_key, cn=self.cn, days=self.validity_days)
+        os.makedirs(self.cert_dir, exist_ok=True)
+        # Write to a temp file in the same directory then rename, so other
+        # workers never read a half-written certificate.
+        fd, tmp_path = tempfile.mkstemp(prefix=f"ds_{self.key_id}_", suffix=".tmp", dir=self.cert_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(der)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        self.cleanup()
+        return DSCertificate(der, self.path, self.rotate_after)
+
+    def cleanup(self) -> int:
+        """Remove expired certificates, stale partial writes and legacy per-issuance temp files."""
+        removed = 0
+        now = time.time()
+        candidates = glob.glob(os.path.join(self.cert_dir, "*.tmp"))
+        candidates += glob.glob(os.path.join(tempfile.gettempdir(), f"{LEGACY_TEMP_PREFIX}*.der"))
+        for path in candidates:
+            try:
+                if now - os.path.getmtime(path) > STALE_FILE_SECONDS:
+                    os.unlink(path)
+                    removed += 1
+            except OSError:
+                pass
+
+        for path in glob.glob(os.path.join(self.cert_dir, "ds_*.der")):
+            if path == self.path:
+                continue
+            try:
+                with open(path, "rb") as f:
+                    cert = x509.load_der_x509_certificate(f.read())
+                if cert.not_valid_after < datetime.datetime.utcnow():
+                    os.unlink(path)
+                    removed += 1
+            except (OSError, ValueError):
+                pass
+        return removed
@@ -0,0 +1,261 @@
+import collections
+import datetime
+import functools
+import hashlib
+import threading
+import time
+
+from flask import Response, current_app, jsonify, request
+from sqlalchemy import delete, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import IdempotencyKey
+
+IN_PROGRESS, COMPLETED = 'in_progress', 'completed'
+
+StoredResponse = collections.namedtuple('StoredResponse', 'request_hash status body mimetype')
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used with a different request body."""
+
+
+class IdempotencyInProgress(Exception):
+    """The original request is still running after the wait timeout."""
+
+
+class IdempotencyStore:
+    """
+    Idempotency-Key bookkeeping: a process-local TTL cache in front of the
+    idempotency_key table.
+
+    begin() claims a key by inserting an in_progress row (the unique
+    constraint is the cross-process lock) and returns None, or returns the
+    stored response of an earlier request. A duplicate arriving while the
+    first request runs waits for it: on a local event when both are in this
+    process, by polling the row otherwise. An in_progress row older than
+    lock_timeout is treated as abandoned by a crashed worker and taken over.
+    """
+
+    def __init__(self, session_factory, ttl_seconds=86400, wait_timeout=30.0, lock_timeout=120.0,
+                 cache_size=10000, poll_interval=0.05):
+        self.session_factory = session_factory
+        self.ttl_seconds = ttl_seconds
+        self.wait_timeout = wait_timeout
+        self.lock_timeout = lock_timeout
+        self.cache_size = cache_size
+        self.poll_interval = poll_interval
+        self._cache = collections.OrderedDict()  # (endpoint, key) -> (expires_ts, StoredResponse)
+        self._inflight = {}                      # (endpoint, key) -> threading.Event
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+        self.replays = 0
+
+    # ---------- local cache ------------------------------------------
+    def _cache_get(self, ck):
+        with self._lock:
+            entry = self._cache.get(ck)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._cache[ck]
+                return None
+            self._cache.move_to_end(ck)
+            return entry[1]
+
+    def _cache_put(self, ck, stored, expires_ts):
+        with self._lock:
+            self._cache[ck] = (expires_ts, stored)
+            self._cache.move_to_end(ck)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _release_local(self, ck):
+        with self._lock:
+            event = self._inflight.pop(ck, None)
+        if event is not None:
+            event.set()
+
+    # ---------- protocol ---------------------------------------------
+    def _replay(self, stored, request_hash):
+        if stored.request_hash != request_hash:
+            raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+        self.replays += 1
+        return stored
+
+    def begin(self, endpoint, key, request_hash):
+        """Return a StoredResponse to replay, or None once the caller owns the key."""
+        ck = (endpoint, key)
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            stored = self._cache_get(ck)
+            if stored is not None:
+                return self._replay(stored, request_hash)
+            with self._lock:
+                event = self._inflight.get(ck)
+                if event is None:
+                    self._inflight[ck] = threading.Event()
+            if event is None:
+                break
+            # Same key already running in this process: wait for it, then re-check the cache
+            if not event.wait(max(0.0, deadline - time.monotonic())):
+                raise IdempotencyInProgress("original request is still in progress")
+
+        try:
+            stored = self._claim(endpoint, key, request_hash, deadline)
+        except Exception:
+            self._release_local(ck)
+            raise
+        if stored is not None:
+            self._release_local(ck)
+            return self._replay(stored, request_hash)
+        return None
+
+    def _claim(self, endpoint, key, request_hash, deadline):
+        with self.session_factory() as session:
+            self._purge(session)
+            while True:
+                now = datetime.datetime.utcnow()
+                session.add(IdempotencyKey(
+                    endpoint=endpoint, key=key, request_hash=request_hash, status=IN_PROGRESS,
+                    created=now, expires=now + datetime.timedelta(seconds=self.ttl_seconds)
+                ))
+                try:
+                    session.commit()
+                    return None
+                except IntegrityError:
+                    session.rollback()
+
+                row = session.scalars(
+                    select(IdempotencyKey).where(IdempotencyKey.endpoint == endpoint, IdempotencyKey.key == key)
+                ).first()
+                if row is None or row.expires < now:
+                    # expired (or deleted meanwhile): clear it and claim again
+                    session.execute(delete(IdempotencyKey).where(
+                        IdempotencyKey.endpoint == endpoint, IdempotencyKey.key == key, IdempotencyKey.expires < now))
+                    session.commit()
+                    continue
+                if row.request_hash != request_hash:
+                    raise IdempotencyConflict("Idempotency-Key was already used with a different request")
+                if row.status == COMPLETED:
+                    stored = StoredResponse(row.request_hash, row.response_status, row.response_body,
+                                            row.response_mimetype)
+                    self._cache_put((endpoint, key), stored, row.expires.replace(
+                        tzinfo=datetime.timezone.utc).timestamp())
+                    return stored
+                if row.created < now - datetime.timedelta(seconds=self.lock_timeout):
+                    # owner died without completing: take the key over
+                    taken = session.execute(
+                        update(IdempotencyKey)
+                        .where(IdempotencyKey.id == row.id, IdempotencyKey.status == IN_PROGRESS,
+                               IdempotencyKey.created == row.created)
+                        .values(created=now)
+                    ).rowcount
+                    session.commit()
+                    if taken:
+                        return None
+                    continue
+                if time.monotonic() >= deadline:
+                    raise IdempotencyInProgress("original request is still in progress")
+                session.expire_all()
+                time.sleep(self.poll_interval)
+
+    def complete(self, endpoint, key, status, body, mimetype):
+        """Store the response of the request that owns the key and wake up waiters."""
+        ck = (endpoint, key)
+        try:
+            with self.session_factory() as session:
+                row = session.scalars(
+                    select(IdempotencyKey).where(IdempotencyKey.endpoint == endpoint, IdempotencyKey.key == key)
+                ).first()
+                if row is not None:
+                    row.status = COMPLETED
+                    row.response_status = status
+                    row.response_body = body
+                    row.response_mimetype = mimetype
+                    session.commit()
+                    self._cache_put(ck, StoredResponse(row.request_hash, status, body, mimetype),
+                                    row.expires.replace(tzinfo=datetime.timezone.utc).timestamp())
+        finally:
+            self._release_local(ck)
+
+    def release(self, endpoint, key):
+        """Give the key up (server error) so a retry runs the request again."""
+        ck = (endpoint, key)
+        try:
+            with self.session_factory() as session:
+                session.execute(delete(IdempotencyKey).where(
+                    IdempotencyKey.endpoint == endpoint, IdempotencyKey.key == key,
+                    IdempotencyKey.status == IN_PROGRESS))
+                session.commit()
+        finally:
+            self._release_local(ck)
+
+    def _purge(self, session):
+        """Delete expired rows, at most once a minute per process."""
+        if time.time() - self._last_purge < 60:
+            return
+        self._last_purge = time.time()
+        session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires < datetime.datetime.utcnow()))
+        session.commit()
+
+    def metrics(self) -> dict:
+        return {
+            'cached': len(self._cache),
+            'in_flight': len(self._inflight),
+            'replays': self.replays
+        }
+
+
+def idempotent(store, header='Idempotency-Key', caller=None):
+    """
+    Route decorator: POSTs carrying the header run once per key; retries get
+    the stored response (marked with Idempotent-Replayed: true). 5xx responses
+    are not stored, so the client can retry them.
+
+    caller, if given, returns an id for the authenticated client (None when
+    the request is not authenticated). Keys are then kept per caller, and an
+    unauthenticated request skips the store entirely, so the view rejects it
+    instead of it getting someone else's stored response.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            key = request.headers.get(header)
+            if request.method != 'POST' or not key:
+                return view(*args, **kwargs)
+            if len(key) > 255:
+                return jsonify({'success': False, 'error': f'{header} is too long (max 255 characters)'}), 400
+
+            if caller is not None:
+                client = caller()
+                if client is None:
+                    return view(*args, **kwargs)
+                key = hashlib.sha256(f"{client}\n{key}".encode()).hexdigest()
+
+            endpoint = request.endpoint
+            request_hash = hashlib.sha256(request.get_data()).hexdigest()
+            try:
+                stored = store.begin(endpoint, key, request_hash)
+            except IdempotencyConflict as e:
+                return jsonify({'success': False, 'error': str(e)}), 422
+            except IdempotencyInProgress as e:
+                return jsonify({'success': False, 'error': str(e)}), 409, {'Retry-After': '1'}
+            if stored is not None:
+                response = Response(stored.body, status=stored.status, mimetype=stored.mimetype)
+                response.headers['Idempotent-Replayed'] = 'true'
+                return response
+
+            try:
+                response = current_app.make_response(view(*args, **kwargs))
+            except Exception:
+                store.release(endpoint, key)
+                raise
+            if response.status_code >= 500 or response.is_streamed:
+                store.release(endpoint, key)
+            else:
+                store.complete(endpoint, key, response.status_code,
+                               response.get_data(as_text=True), response.mimetype)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,116 @@
+import base64
+import collections
+import os
+import threading
+
+from cryptography.hazmat.primitives.asymmetric import ec
+
+
+def _b64url(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+class HolderKey:
+    """A P-256 holder key pair with its JWK and COSE_Key encodings precomputed."""
+
+    __slots__ = ("private_key", "_jwk", "_cose_key")
+
+    def __init__(self, private_key):
+        self.private_key = private_key
+        pub = private_key.public_key().public_numbers()
+        x = pub.x.to_bytes(32, "big")
+        y = pub.y.to_bytes(32, "big")
+        self._jwk = {"kty": "EC", "crv": "P-256", "x": _b64url(x), "y": _b64url(y)}
+        self._cose_key = {1: 2, -1: 1, -2: x, -3: y}
+
+    @classmethod
+    def generate(cls):
+        return cls(ec.generate_private_key(ec.SECP256R1()))
+
+    def jwk(self, kid=None) -> dict:
+        jwk = dict(self._jwk)
+        if kid:
+            jwk["kid"] = kid
+        return jwk
+
+    def cose_key(self, kid=None) -> dict:
+        """COSE_Key with integer labels, as jwk_to_cose_ec2_map() would return."""
+        cose_key = dict(self._cose_key)
+        if kid:
+            cose_key[2] = kid.encode()
+        return cose_key
+
+
+class HolderKeyPool:
+    """
+    Background-refilled pool of pre-generated holder keys.
+
+    acquire() pops a ready key in O(1); when the pool drops below the low
+    watermark a refill thread tops it up to the high watermark. An empty pool
+    is a miss and the key is generated inline, so issuance never waits on the
+    refill thread. The thread is started lazily per PID (threads do not
+    survive a gunicorn fork).
+    """
+
+    def __init__(self, low_watermark=32, high_watermark=256):
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self._keys = collections.deque()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.high_watermark > 0
+
+    def _ensure_refill_thread(self):
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread_pid != pid:
+                if self._thread_pid is not None:
+                    self._keys.clear()  # never hand the same key to two processes
+                self._thread = threading.Thread(target=self._refill_loop, name="holder-key-pool", daemon=True)
+                self._thread_pid = pid
+                self._thread.start()
+
+    def _refill_loop(self):
+        while True:
+            while len(self._keys) < self.high_watermark:
+                self._keys.append(HolderKey.generate())
+                self.generated += 1
+            self._wakeup.wait()
+            self._wakeup.clear()
+
+    def acquire(self) -> HolderKey:
+        if not self.enabled:
+            self.misses += 1
+            return HolderKey.generate()
+        self._ensure_refill_thread()
+        try:
+            key = self._keys.popleft()
+            self.hits += 1
+        except IndexError:
+            key = HolderKey.generate()
+            self.misses += 1
+        if len(self._keys) < self.low_watermark:
+            self._wakeup.set()
+        return key
+
+    def metrics(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._keys),
+            'low_watermark': self.low_watermark,
+            'high_watermark': self.high_watermark,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'generated': self.generated
+        }
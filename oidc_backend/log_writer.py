@@ -0,0 +1,160 @@
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+
+class BatchLogWriter:
+    """
+    Buffered, batched writer for log rows (dicts).
+
+    submit() puts a row (submit_many() a group of rows) on a bounded queue and
+    returns immediately; a background thread hands rows to flush_fn(rows) in
+    batches of about batch_size, or whatever has arrived after flush_interval
+    seconds. When the queue is full, submit() blocks for up to put_timeout
+    (backpressure) and then writes the rows inline rather than dropping them.
+    A batch that fails with an error is_row_error() blames on its rows (a bad
+    value rather than an unreachable database) is split in halves and retried,
+    so one bad row costs only itself. Pending rows are drained at interpreter
+    exit. The thread is started lazily per PID.
+    """
+
+    def __init__(self, flush_fn, max_queue=10000, batch_size=500, flush_interval=0.5,
+                 put_timeout=1.0, name="log-writer", logger=None, is_row_error=None):
+        self.flush_fn = flush_fn
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+        self.name = name
+        self.logger = logger or logging.getLogger(__name__)
+        self.is_row_error = is_row_error or (lambda error: True)
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._thread_pid = None
+        self.written = 0
+        self.failed = 0
+        self.flushes = 0
+        self.blocked = 0
+        self.inline_writes = 0
+        self.split_retries = 0
+        self.last_flush_ms = 0.0
+        atexit.register(self.shutdown)
+
+    def _ensure_thread(self):
+        pid = os.getpid()
+        if self._thread_pid == pid:
+            return
+        with self._lock:
+            if self._thread_pid != pid:
+                if self._thread_pid is not None:
+                    self._queue = queue.Queue(maxsize=self.max_queue)  # rows belong to the parent
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread_pid = pid
+                self._thread.start()
+
+    def submit(self, row: dict):
+        self.submit_many([row])
+
+    def submit_many(self, rows):
+        """Queue rows as one unit: they are always written in the same batch."""
+        rows = list(rows)
+        if not rows:
+            return
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(rows)
+            return
+        except queue.Full:
+            self.blocked += 1
+        try:
+            self._queue.put(rows, timeout=self.put_timeout)
+        except queue.Full:
+            self.inline_writes += 1
+            self.write(rows)
+
+    def write(self, rows):
+        """Write rows synchronously on the calling thread."""
+        started = time.perf_counter()
+        self._write_or_split(rows)
+        self.flushes += 1
+        self.last_flush_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    def _write_or_split(self, rows):
+        try:
+            self.flush_fn(rows)
+            self.written += len(rows)
+            return
+        except Exception as e:
+            if len(rows) > 1 and self.is_row_error(e):
+                self.split_retries += 1
+                middle = len(rows) // 2
+                self._write_or_split(rows[:middle])
+                self._write_or_split(rows[middle:])
+                return
+            self.failed += len(rows)
+            if len(rows) == 1:
+                self.logger.error("%s: dropped row %r: %s", self.name, rows[0], e)
+            else:
+                self.logger.error("%s: failed to write %d rows: %s", self.name, len(rows), e)
+
+    def _take_batch(self):
+        """Block for the first row, then collect until batch_size or flush_interval."""
+        try:
+            rows = list(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(rows) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                rows.extend(self._queue.get_nowait() if remaining <= 0 else self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return rows
+
+    def _run(self):
+        while not self._stopping.is_set():
+            rows = self._take_batch()
+            if rows:
+                self.write(rows)
+
+    def drain(self):
+        """Write everything still queued on the calling thread."""
+        while True:
+            rows = []
+            try:
+                while len(rows) < self.batch_size:
+                    rows.extend(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not rows:
+                return
+            self.write(rows)
+
+    def shutdown(self, timeout=5.0):
+        if self._thread_pid != os.getpid():
+            return
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.drain()
+
+    def metrics(self) -> dict:
+        return {
+            'queued': self._queue.qsize(),
+            'max_queue': self.max_queue,
+            'batch_size': self.batch_size,
+            'flush_interval': self.flush_interval,
+            'written': self.written,
+            'failed': self.failed,
+            'flushes': self.flushes,
+            'blocked': self.blocked,
+            'inline_writes': self.inline_writes,
+            'split_retries': self.split_retries,
+            'last_flush_ms': self.last_flush_ms
+        }
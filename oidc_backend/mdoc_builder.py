@@ -0,0 +1,187 @@
+import datetime
+import hashlib
+import random
+import secrets
+
+import cbor2
+from cbor2 import CBORTag
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+
+# Same conventions as pymdoccbor's MsoIssuer so the output is interchangeable
+DIGEST_SALT_LENGTH = 32
+CBORTAGS_ATTR_MAP = {
+    "birth_date": 1004,
+    "expiry_date": 1004,
+    "issue_date": 1004,
+    "issuance_date": 1004,
+}
+COSE_ALGS = {
+    "ES256": (-7, hashes.SHA256, "SHA-256", hashlib.sha256, 32),
+}
+COSE_HEADER_ALG = 1
+COSE_HEADER_X5CHAIN = 33
+
+
+def _cbor_head(major: int, length: int) -> bytes:
+    """Encode a CBOR initial byte + length for the given major type."""
+    mt = major << 5
+    if length < 24:
+        return bytes([mt | length])
+    if length < 0x100:
+        return bytes([mt | 24, length])
+    if length < 0x10000:
+        return bytes([mt | 25]) + length.to_bytes(2, "big")
+    if length < 0x100000000:
+        return bytes([mt | 26]) + length.to_bytes(4, "big")
+    return bytes([mt | 27]) + length.to_bytes(8, "big")
+
+
+def _bstr(data: bytes) -> bytes:
+    return _cbor_head(2, len(data)) + data
+
+
+# #6.24(bstr): tag head is fixed, only the bstr length varies
+_TAG24_HEAD = b"\xd8\x18"
+
+
+def _format_datetime(dt: datetime.datetime) -> str:
+    return dt.isoformat().split(".")[0] + "Z"
+
+
+def _tag_one(identifier, value):
+    tag = CBORTAGS_ATTR_MAP.get(identifier)
+    return CBORTag(tag, value) if tag else value
+
+
+def _tag_value(identifier, value):
+    """Apply the full-date tag (1004) to known date elements, as pymdoccbor does."""
+    if identifier in CBORTAGS_ATTR_MAP:
+        return _tag_one(identifier, value)
+    if isinstance(value, dict):
+        return {k: _tag_one(k, v) for k, v in value.items()}
+    if isinstance(value, list) and identifier != "nationality":
+        return [
+            {k: _tag_one(k, v) for k, v in item.items()} if isinstance(item, dict) else item
+            for item in value
+        ]
+    return value
+
+
+def _device_key(cose_key: dict) -> dict:
+    """Strip a COSE_Key to the public EC2 parameters (pymdoccbor drops kid too)."""
+    return {1: cose_key[1], -1: cose_key[-1], -2: cose_key[-2], -3: cose_key[-3]}
+
+
+class NativeMdocIssuer:
+    """
+    In-process IssuerSigned builder.
+
+    Encodes IssuerSignedItems, the MSO and the COSE_Sign1 directly with cbor2
+    and cryptography, producing the same document layout as
+    ``MdocCborIssuer.new()`` + ``dump()`` without a certificate file or
+    pycose/pymdoccbor object model. The protected header and the
+    Sig_structure prefix are encoded once; the x5chain header is reused for as
+    long as the DS certificate manager returns the same certificate.
+    """
+
+    def __init__(self, private_key, ds_certs, alg="ES256", signer=None):
+        if alg not in COSE_ALGS:
+            raise ValueError(f"Unsupported algorithm: {alg}")
+        cose_alg, hash_cls, digest_name, digest_fn, coord_len = COSE_ALGS[alg]
+        self.private_key = private_key
+        self.ds_certs = ds_certs
+        self.alg = alg
+        self._hash_cls = hash_cls
+        self._digest_name = digest_name
+        self._digest_fn = digest_fn
+        self._coord_len = coord_len
+        # signer(tbs_bytes) -> raw r||s signature; defaults to the local key
+        self._signer = signer or self._sign_local
+
+        self.protected = cbor2.dumps({COSE_HEADER_ALG: cose_alg})
+        # Sig_structure = ["Signature1", protected, external_aad, payload]
+        self._sig_structure_prefix = (
+            _cbor_head(4, 4) + cbor2.dumps("Signature1") + _bstr(self.protected) + _bstr(b"")
+        )
+        self._unprotected = None
+        self._unprotected_fp = None
+
+    def _sign_local(self, tbs: bytes) -> bytes:
+        der_sig = self.private_key.sign(tbs, ec.ECDSA(self._hash_cls()))
+        r, s = decode_dss_signature(der_sig)
+        return r.to_bytes(self._coord_len, "big") + s.to_bytes(self._coord_len, "big")
+
+    def _unprotected_header(self) -> dict:
+        ds_cert = self.ds_certs.current()
+        if self._unprotected_fp != ds_cert.fingerprint:
+            self._unprotected = {COSE_HEADER_X5CHAIN: ds_cert.x5chain}
+            self._unprotected_fp = ds_cert.fingerprint
+        return self._unprotected
+
+    def _issuer_signed_items(self, data: dict):
+        """Return ({ns: [Tag24 items]}, {ns: {digestID: digest}})."""
+        name_spaces, value_digests = {}, {}
+        digest_id = 0
+        for ns, values in data.items():
+            items, digests = [], {}
+            identifiers = list(values.keys())
+            random.shuffle(identifiers)  # nosec: B311 - order only hides attribute positions
+            for identifier in identifiers:
+                item_bytes = cbor2.dumps({
+                    "digestID": digest_id,
+                    "random": secrets.token_bytes(DIGEST_SALT_LENGTH),
+                    "elementIdentifier": identifier,
+                    "elementValue": _tag_value(identifier, values[identifier]),
+                }, canonical=True)
+                items.append(CBORTag(24, item_bytes))
+                # digest over IssuerSignedItemBytes = #6.24(bstr .cbor item)
+                h = self._digest_fn(_TAG24_HEAD)
+                h.update(_cbor_head(2, len(item_bytes)))
+                h.update(item_bytes)
+                digests[digest_id] = h.digest()
+                digest_id += 1
+            name_spaces[ns] = items
+            value_digests[ns] = digests
+        return name_spaces, value_digests
+
+    def build(self, doctype: str, data: dict, device_cose_key: dict, validity: dict) -> bytes:
+        """Return CBOR(mdoc) with one document, as MdocCborIssuer.dump() would."""
+        name_spaces, value_digests = self._issuer_signed_items(data)
+
+        utcnow = datetime.datetime.utcnow()
+        valid_from = datetime.datetime.strptime(validity["issuance_date"], "%Y-%m-%d")
+        valid_until = datetime.datetime.strptime(validity["expiry_date"], "%Y-%m-%d").replace(
+            hour=23, minute=59, second=59)
+        if utcnow > valid_from:
+            valid_from = utcnow
+
+        mso = cbor2.dumps({
+            "docType": doctype,
+            "version": "1.0",
+            "validityInfo": {
+                "signed": CBORTag(0, _format_datetime(utcnow)),
+                "validFrom": CBORTag(0, _format_datetime(valid_from)),
+                "validUntil": CBORTag(0, _format_datetime(valid_until)),
+            },
+            "valueDigests": value_digests,
+            "deviceKeyInfo": {"deviceKey": _device_key(device_cose_key)},
+            "digestAlgorithm": self._digest_name,
+        }, canonical=True)
+        payload = _TAG24_HEAD + _bstr(mso)
+
+        signature = self._signer(self._sig_structure_prefix + _bstr(payload))
+        issuer_auth = [self.protected, self._unprotected_header(), payload, signature]
+
+        return cbor2.dumps({
+            "version": "1.0",
+            "documents": [{
+                "docType": doctype,
+                "issuerSigned": {
+                    "nameSpaces": name_spaces,
+                    "issuerAuth": issuer_auth,
+                },
+            }],
+            "status": 0,
+        }, canonical=True)
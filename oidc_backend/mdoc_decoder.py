@@ -0,0 +1,244 @@
+import collections
+import hashlib
+
+import cbor2
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import encode_dss_signature
+
+# #6.24(bstr): fixed tag head, the bstr length head is rebuilt when hashing
+_TAG24_HEAD = b"\xd8\x18"
+
+DIGEST_ALGORITHMS = {
+    "SHA-256": hashlib.sha256,
+    "SHA-384": hashlib.sha384,
+    "SHA-512": hashlib.sha512,
+}
+
+# COSE alg -> (hash, curve name, coordinate length) for the ECDSA fast path
+COSE_ECDSA_ALGS = {
+    -7: (hashes.SHA256, "secp256r1", 32),   # ES256
+    -35: (hashes.SHA384, "secp384r1", 48),  # ES384
+    -36: (hashes.SHA512, "secp521r1", 66),  # ES512
+}
+COSE_HEADER_ALG = 1
+COSE_HEADER_CRIT = 2
+
+# Sig_structure = ["Signature1", protected, external_aad, payload]: the array
+# head, context string and (empty) external_aad never change
+_SIG1_CONTEXT = b"\x84" + cbor2.dumps("Signature1")
+_EMPTY_BSTR = b"\x40"
+
+# raw: the item's CBOR bytes (the bstr inside #6.24), hashed in place
+IssuerSignedItem = collections.namedtuple(
+    "IssuerSignedItem", "digest_id element_identifier element_value raw")
+
+# issuer_auth: COSE_Sign1 as a 4-element list; mso: decoded MobileSecurityObject;
+# name_spaces: {namespace: [IssuerSignedItem]}
+DecodedDocument = collections.namedtuple("DecodedDocument", "doctype issuer_auth mso name_spaces")
+
+
+class _Embedded:
+    """Decoded #6.24 (embedded CBOR) value that keeps its raw bytes."""
+
+    __slots__ = ("raw", "value")
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.value = cbor2.loads(raw, tag_hook=_tag_hook)
+
+
+def _tag_hook(decoder, tag):
+    # Embedded CBOR is decoded right here, while its bytes are at hand;
+    # any other unknown tag is dropped (the old _untag_deep behaviour)
+    if tag.tag == 24 and isinstance(tag.value, (bytes, bytearray)):
+        return _Embedded(tag.value)
+    return tag.value
+
+
+def _str_key(k):
+    return k.decode() if isinstance(k, (bytes, bytearray)) else k
+
+
+def _issuer_signed_of(decoded):
+    """Yield (doctype or None, IssuerSigned map) for every document found."""
+    if isinstance(decoded, _Embedded):
+        decoded = decoded.value
+    if isinstance(decoded, dict):
+        if "issuerAuth" in decoded and "nameSpaces" in decoded:
+            yield None, decoded
+            return
+        for doc in decoded.get("documents") or ():
+            if isinstance(doc, _Embedded):
+                doc = doc.value
+            issuer_signed = doc.get("issuerSigned") if isinstance(doc, dict) else None
+            if isinstance(issuer_signed, (list, tuple)) and issuer_signed:
+                issuer_signed = issuer_signed[0]
+            if isinstance(issuer_signed, _Embedded):
+                issuer_signed = issuer_signed.value
+            if isinstance(issuer_signed, dict) and "issuerAuth" in issuer_signed and "nameSpaces" in issuer_signed:
+                yield doc.get("docType"), issuer_signed
+        return
+    # Array form: [IssuerSigned, DeviceSigned?]
+    if isinstance(decoded, (list, tuple)) and decoded:
+        first = decoded[0].value if isinstance(decoded[0], _Embedded) else decoded[0]
+        if isinstance(first, dict) and "issuerAuth" in first and "nameSpaces" in first:
+            yield None, first
+
+
+def _decode_items(name_spaces):
+    result = {}
+    for ns, items in name_spaces.items():
+        decoded_items = []
+        for item in items:
+            # IssuerSignedItemBytes must be #6.24(bstr); a bare bstr is rejected
+            if not isinstance(item, _Embedded):
+                raise ValueError("IssuerSignedItem is not embedded CBOR")
+            value = item.value
+            decoded_items.append(IssuerSignedItem(
+                value["digestID"], value.get("elementIdentifier"), value.get("elementValue"), item.raw
+            ))
+        result[_str_key(ns)] = decoded_items
+    return result
+
+
+def _issuer_auth_parts(issuer_auth):
+    """Return issuerAuth as a 4-element list, decoding it if it came as bytes."""
+    if isinstance(issuer_auth, (bytes, bytearray)):
+        issuer_auth = cbor2.loads(issuer_auth, tag_hook=_tag_hook)
+    if isinstance(issuer_auth, (list, tuple)) and len(issuer_auth) == 4:
+        return list(issuer_auth)
+    raise ValueError(f"Unsupported issuerAuth type: {type(issuer_auth)}")
+
+
+def _decode_mso(payload):
+    """MSO from the COSE payload: #6.24-wrapped (ISO 18013-5) or a plain map."""
+    mso = cbor2.loads(payload, tag_hook=_tag_hook)
+    if isinstance(mso, _Embedded):
+        mso = mso.value
+    if not isinstance(mso, dict):
+        raise ValueError("MSO payload is not a map")
+    return mso
+
+
+def decode_mdoc(raw: bytes):
+    """
+    Decode a credential (DeviceResponse-style document list, IssuerSigned map
+    or [IssuerSigned, ...] array) in a single cbor2 pass and return a
+    DecodedDocument per document. Embedded IssuerSignedItems and the MSO are
+    decoded exactly once; item bytes are kept as decoded and hashed in place.
+    """
+    documents = []
+    for doctype, issuer_signed in _issuer_signed_of(cbor2.loads(raw, tag_hook=_tag_hook)):
+        issuer_auth = _issuer_auth_parts(issuer_signed["issuerAuth"])
+        mso = _decode_mso(issuer_auth[2])
+        documents.append(DecodedDocument(
+            doctype or mso.get("docType"),
+            issuer_auth,
+            mso,
+            _decode_items(issuer_signed["nameSpaces"])
+        ))
+    if not documents:
+        raise ValueError("Could not locate IssuerSigned in decoded structure")
+    return documents
+
+
+def value_digests(mso: dict) -> dict:
+    """{namespace: {digestID: digest}}, for both valueDigests layouts."""
+    digests = mso["valueDigests"]
+    if "nameSpaces" in digests and isinstance(digests["nameSpaces"], dict):
+        digests = digests["nameSpaces"]
+    return {_str_key(ns): ids for ns, ids in digests.items()}
+
+
+def _cbor_bstr_head(length: int) -> bytes:
+    if length < 24:
+        return bytes([0x40 | length])
+    if length < 0x100:
+        return bytes([0x58, length])
+    if length < 0x10000:
+        return b"\x59" + length.to_bytes(2, "big")
+    if length < 0x100000000:
+        return b"\x5a" + length.to_bytes(4, "big")
+    return b"\x5b" + length.to_bytes(8, "big")
+
+
+def item_digest_matches(item: IssuerSignedItem, want: bytes, digest_fn) -> bool:
+    """
+    Check an item against its MSO digest, which ISO 18013-5 takes over the
+    tagged IssuerSignedItemBytes (#6.24(bstr)). A digest over the bare item
+    bytes does not match.
+    """
+    h = digest_fn(_TAG24_HEAD)
+    h.update(_cbor_bstr_head(len(item.raw)))
+    h.update(item.raw)
+    return h.digest() == want
+
+
+def verify_digests(doc: DecodedDocument) -> bool:
+    digest_fn = DIGEST_ALGORITHMS.get(doc.mso.get("digestAlgorithm", "SHA-256"))
+    if digest_fn is None:
+        return False
+    digests = value_digests(doc.mso)
+    for ns, items in doc.name_spaces.items():
+        ns_digests = digests.get(ns)
+        if ns_digests is None:
+            return False
+        for item in items:
+            want = ns_digests.get(item.digest_id)
+            if want is None or not item_digest_matches(item, want, digest_fn):
+                return False
+    return True
+
+
+class UnsupportedSign1(ValueError):
+    """COSE_Sign1 the fast path does not handle; verify it with pycose instead."""
+
+
+_protected_alg_cache = {}  # protected header bytes -> COSE_ECDSA_ALGS entry
+
+
+def _sign1_alg(protected: bytes):
+    params = _protected_alg_cache.get(protected)
+    if params is None:
+        header = cbor2.loads(protected) if protected else {}
+        if not isinstance(header, dict) or COSE_HEADER_CRIT in header:
+            raise UnsupportedSign1("protected header with crit or of unexpected type")
+        params = COSE_ECDSA_ALGS.get(header.get(COSE_HEADER_ALG))
+        if params is None:
+            raise UnsupportedSign1(f"unsupported COSE alg {header.get(COSE_HEADER_ALG)!r}")
+        if len(_protected_alg_cache) < 256:
+            _protected_alg_cache[protected] = params
+    return params
+
+
+def sig_structure(protected: bytes, payload: bytes) -> bytes:
+    """ToBeSigned bytes of a COSE_Sign1 with empty external_aad."""
+    return (_SIG1_CONTEXT + _cbor_bstr_head(len(protected)) + protected + _EMPTY_BSTR
+            + _cbor_bstr_head(len(payload)) + payload)
+
+
+def verify_issuer_auth(issuer_auth, public_key) -> bool:
+    """
+    Verify a decoded COSE_Sign1 ([protected, unprotected, payload, signature])
+    with a cryptography EC public key: the Sig_structure is assembled from the
+    raw protected header and payload bytes, no re-encoding. Raises
+    UnsupportedSign1 for anything other than a plain ECDSA Sign1 (detached
+    payload, crit headers, other algorithms) so the caller can fall back.
+    """
+    protected, _, payload, signature = issuer_auth
+    if not all(isinstance(part, (bytes, bytearray)) for part in (protected, payload, signature)):
+        raise UnsupportedSign1("detached payload or non-bstr COSE_Sign1 field")
+    hash_cls, curve_name, coord_len = _sign1_alg(bytes(protected))
+    if not isinstance(public_key, ec.EllipticCurvePublicKey) or public_key.curve.name != curve_name:
+        raise UnsupportedSign1("key does not match the COSE alg")
+    if len(signature) != 2 * coord_len:
+        return False
+    der = encode_dss_signature(int.from_bytes(signature[:coord_len], "big"),
+                               int.from_bytes(signature[coord_len:], "big"))
+    try:
+        public_key.verify(der, sig_structure(protected, payload), ec.ECDSA(hash_cls()))
+        return True
+    except InvalidSignature:
+        return False
@@ -9,7 +9,7 @@ import sys
 sys.path.append(os.path.dirname(os.path.dirname(__file__)))
 
 # Import your models
-from models import Base, Credential, VerificationLog
+from models import Base, Credential, VerificationLog, IssuanceJob, IdempotencyKey, TokenStoreEntry
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -0,0 +1,36 @@
+"""Add token_store table
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Tokens live for minutes: skip the WAL on PostgreSQL (contents are
+    # dropped after a crash, clients simply start a new flow)
+    prefixes = ['UNLOGGED'] if op.get_bind().dialect.name == 'postgresql' else []
+    op.create_table('token_store',
+        sa.Column('namespace', sa.String(length=32), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False),
+        sa.Column('value', sa.Text(), nullable=False),
+        sa.Column('expires', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('namespace', 'key'),
+        prefixes=prefixes
+    )
+    op.create_index(op.f('ix_token_store_expires'), 'token_store', ['expires'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_token_store_expires'), table_name='token_store')
+    op.drop_table('token_store')
@@ -0,0 +1,28 @@
+"""Add keyset pagination indexes to verification_log
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Cover ORDER BY checked_at DESC, id DESC with the (checked_at, id) cursor
+    # predicate, overall and per credential
+    op.create_index('ix_verification_log_checked_at_id', 'verification_log', ['checked_at', 'id'], unique=False)
+    op.create_index('ix_verification_log_credential_id_checked_at_id', 'verification_log',
+                    ['credential_id', 'checked_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_verification_log_credential_id_checked_at_id', table_name='verification_log')
+    op.drop_index('ix_verification_log_checked_at_id', table_name='verification_log')
@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, UniqueConstraint, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -15,7 +15,7 @@ class Credential(Base):
     subject_id = Column(String(255), nullable=True)  # can be null as shown in image
     type = Column(String(50), nullable=False)  # Account, Custom, Membership, Identity
     format = Column(String(50), nullable=False, default='ISO mdoc')
-    status = Column(String(20), nullable=False, default='active')  # active, revoked
+    status = Column(String(20), nullable=False, default='active')  # active, revoked, pending (reserved, being issued)
     issued = Column(DateTime, nullable=False, default=func.now())
     expires = Column(DateTime, nullable=True)  # can be null for "Never" expiry
     
@@ -41,6 +41,11 @@ class Credential(Base):
 class VerificationLog(Base):
     """Verification log model representing the verification_log table"""
     __tablename__ = 'verification_log'
+    # Keyset pagination: newest first overall and per credential
+    __table_args__ = (
+        Index('ix_verification_log_checked_at_id', 'checked_at', 'id'),
+        Index('ix_verification_log_credential_id_checked_at_id', 'credential_id', 'checked_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True, autoincrement=True)
     checked_at = Column(DateTime, nullable=False, default=func.now(), index=True)
@@ -64,4 +69,55 @@ class VerificationLog(Base):
             'result': self.result,
             'response_time': self.response_time,
             'verifier': self.verifier
-        } 
\ No newline at end of file
+        } 
+
+class IssuanceJob(Base):
+    """Deferred OID4VCI issuance job (queue row, claimed by the issuance workers)"""
+    __tablename__ = 'issuance_job'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    transaction_id = Column(String(64), unique=True, nullable=False, index=True)
+    token_hash = Column(String(64), nullable=False)  # sha256 of the access token that requested it
+    status = Column(String(20), nullable=False, default='pending', index=True)  # pending, running, done, failed, delivered
+    request = Column(Text, nullable=False)  # JSON: doctype, data, holder_jwks
+    result = Column(Text, nullable=True)    # JSON list of base64url credentials
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created = Column(DateTime, nullable=False, default=datetime.utcnow)  # UTC, compared with utcnow() by the queue
+    claimed_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<IssuanceJob(id={self.id}, transaction_id='{self.transaction_id}', status='{self.status}')>"
+
+
+class IdempotencyKey(Base):
+    """Stored response for an Idempotency-Key, replayed on client retries"""
+    __tablename__ = 'idempotency_key'
+    __table_args__ = (UniqueConstraint('endpoint', 'key', name='uq_idempotency_key_endpoint_key'),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    endpoint = Column(String(100), nullable=False)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # sha256 of the request body
+    status = Column(String(20), nullable=False, default='in_progress')  # in_progress, completed
+    response_status = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    response_mimetype = Column(String(100), nullable=True)
+    created = Column(DateTime, nullable=False, default=func.now())
+    expires = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(endpoint='{self.endpoint}', key='{self.key}', status='{self.status}')>"
+
+class TokenStoreEntry(Base):
+    """Short-lived OID4VCI state (codes, access tokens, nonces); UNLOGGED on PostgreSQL"""
+    __tablename__ = 'token_store'
+
+    namespace = Column(String(32), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    value = Column(Text, nullable=False)  # JSON
+    expires = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<TokenStoreEntry(namespace='{self.namespace}', key='{self.key[:8]}...')>"
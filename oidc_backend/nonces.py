@@ -0,0 +1,118 @@
+import base64
+import hashlib
+import hmac
+import os
+import struct
+import threading
+import time
+
+# c_nonce = base64url(issued_at (uint32 seconds) || 12 random bytes || 16-byte HMAC tag)
+_RANDOM_LEN = 12
+_TAG_LEN = 16
+_RAW_LEN = 4 + _RANDOM_LEN + _TAG_LEN
+
+
+class TimeBucketedReplayFilter:
+    """
+    Process-local record of consumed nonces, partitioned by expiry window.
+    A nonce is filed in the bucket of its expiry time and whole buckets are
+    dropped once every nonce in them has expired, so memory is bounded by
+    the nonces consumed within one TTL, never by how many were issued.
+    """
+
+    def __init__(self, ttl, buckets=6):
+        self.width = max(1.0, ttl / buckets)
+        self._buckets = {}  # expiry bucket -> set of nonce tags
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def add(self, tag: bytes, expires_at: float) -> bool:
+        """Record a first use; False when the nonce was seen before."""
+        bucket = int(expires_at // self.width)
+        now_bucket = int(time.time() // self.width)
+        with self._lock:
+            for old in [b for b in self._buckets if b < now_bucket]:
+                del self._buckets[old]
+            seen = self._buckets.setdefault(bucket, set())
+            if tag in seen:
+                self.rejected += 1
+                return False
+            seen.add(tag)
+            return True
+
+    def metrics(self) -> dict:
+        return {
+            'kind': 'local',
+            'buckets': len(self._buckets),
+            'tracked': sum(len(tags) for tags in self._buckets.values()),
+            'replays_rejected': self.rejected
+        }
+
+
+class StoreReplayFilter:
+    """Replay filter in a shared TokenStore, for several workers or nodes."""
+
+    def __init__(self, store, namespace='used_nonce'):
+        self.store = store
+        self.namespace = namespace
+        self.rejected = 0
+
+    def add(self, tag: bytes, expires_at: float) -> bool:
+        if self.store.add(self.namespace, tag.hex(), 1, max(1.0, expires_at - time.time())):
+            return True
+        self.rejected += 1
+        return False
+
+    def metrics(self) -> dict:
+        return {'kind': 'store', 'backend': self.store.backend, 'replays_rejected': self.rejected}
+
+
+class StatelessNonces:
+    """
+    c_nonces that carry their issue time and an HMAC tag, so validity is
+    checked without any lookup; only single use needs the replay filter.
+    The first secret signs, all of them verify (rotation).
+    """
+
+    def __init__(self, secrets, ttl, replay_filter):
+        if not secrets:
+            raise ValueError("at least one nonce secret is required")
+        self.secrets = [s.encode() if isinstance(s, str) else s for s in secrets]
+        self.ttl = ttl
+        self.replay_filter = replay_filter
+        self.issued = 0
+
+    def _tag(self, secret, body) -> bytes:
+        return hmac.new(secret, body, hashlib.sha256).digest()[:_TAG_LEN]
+
+    def issue(self) -> str:
+        body = struct.pack(">I", int(time.time())) + os.urandom(_RANDOM_LEN)
+        self.issued += 1
+        return base64.urlsafe_b64encode(body + self._tag(self.secrets[0], body)).rstrip(b"=").decode()
+
+    def check(self, nonce: str):
+        """Return (tag, expires_at) for an authentic, unexpired nonce; raise ValueError otherwise."""
+        try:
+            raw = base64.urlsafe_b64decode(nonce + "=" * (-len(nonce) % 4))
+        except (ValueError, TypeError):
+            raw = b""
+        if len(raw) != _RAW_LEN:
+            raise ValueError("nonce invalid/expired")
+        body, tag = raw[:-_TAG_LEN], raw[-_TAG_LEN:]
+        if not any(hmac.compare_digest(tag, self._tag(secret, body)) for secret in self.secrets):
+            raise ValueError("nonce invalid/expired")
+        issued_at = struct.unpack(">I", body[:4])[0]
+        now = time.time()
+        if issued_at > now + 5 or issued_at + self.ttl < now:
+            raise ValueError("nonce invalid/expired")
+        return tag, issued_at + self.ttl
+
+    def consume(self, nonce: str):
+        """check() plus single use: a second presentation raises ValueError."""
+        tag, expires_at = self.check(nonce)
+        if not self.replay_filter.add(tag, expires_at):
+            raise ValueError("nonce invalid/expired")
+        return expires_at
+
+    def metrics(self) -> dict:
+        return {'ttl': self.ttl, 'issued': self.issued, 'replay_filter': self.replay_filter.metrics()}
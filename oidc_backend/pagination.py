@@ -0,0 +1,59 @@
+import base64
+import datetime
+import json
+
+from sqlalchemy import func, select, tuple_
+
+
+class InvalidCursor(ValueError):
+    """The cursor was not issued for this listing (or was tampered with)."""
+
+
+def encode_cursor(values) -> str:
+    """Opaque cursor for the sort key of the last row of a page."""
+    payload = [v.isoformat() if isinstance(v, datetime.datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str, columns) -> tuple:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        decoded = []
+        for value, column in zip(values, columns):
+            if column.type.python_type is datetime.datetime:
+                decoded.append(datetime.datetime.fromisoformat(value))
+            elif column.type.python_type is int and isinstance(value, int) and not isinstance(value, bool):
+                decoded.append(value)
+            else:
+                raise ValueError
+        return tuple(decoded)
+    except (ValueError, TypeError):
+        raise InvalidCursor("invalid cursor")
+
+
+def keyset_page(session, stmt, columns, cursor=None, limit=100, descending=False):
+    """
+    One page of stmt ordered by columns (a unique sort key, e.g. (checked_at,
+    id)): rows after the cursor are selected with a row-value comparison, so
+    each page is an index range scan however deep the client has paged,
+    instead of an OFFSET that re-reads every earlier row. Returns (rows,
+    next_cursor); next_cursor is None on the last page.
+    """
+    key = tuple_(*columns) if len(columns) > 1 else columns[0]
+    if cursor:
+        after = decode_cursor(cursor, columns)
+        after = tuple_(*after) if len(columns) > 1 else after[0]
+        stmt = stmt.where(key < after if descending else key > after)
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = session.scalars(stmt.order_by(*order).limit(limit + 1)).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor([getattr(rows[-1], c.key) for c in columns])
+
+
+def count_rows(session, stmt) -> int:
+    """Total for the listing; a separate COUNT query, only run when asked for."""
+    return session.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
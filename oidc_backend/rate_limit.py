@@ -0,0 +1,197 @@
+import collections
+import functools
+import math
+import secrets
+import threading
+import time
+
+from flask import jsonify
+
+from token_store import TokenStoreContention
+
+# requests per period seconds, at most burst of them back to back
+RateLimit = collections.namedtuple("RateLimit", "requests period burst")
+
+
+def parse_rate_limits(spec: str) -> dict:
+    """
+    "offer=30/60:10,nonce=120/60" -> {endpoint: RateLimit}. Each entry is
+    endpoint=requests/seconds with an optional :burst (defaults to requests).
+    """
+    limits = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        try:
+            endpoint, rest = part.split("=", 1)
+            rate, _, burst = rest.partition(":")
+            requests, period = rate.split("/", 1)
+            limit = RateLimit(int(requests), float(period), int(burst) if burst else int(requests))
+        except ValueError:
+            raise ValueError(f"rate limit entry must be endpoint=requests/seconds[:burst]: {part!r}")
+        if limit.requests <= 0 or limit.period <= 0 or limit.burst <= 0:
+            raise ValueError(f"rate limit values must be positive: {part!r}")
+        limits[endpoint.strip()] = limit
+    return limits
+
+
+class RateLimiter:
+    """
+    Token bucket per (endpoint, client), kept in a TokenStore so every worker
+    sharing the backend enforces the same budget. The bucket is stored as a
+    single timestamp (GCRA, the "virtual scheduling" form of a token bucket):
+    the time at which the bucket would be full again. A request is admitted
+    when that time is at most burst intervals ahead of now. Idle buckets
+    expire on their own after one full refill.
+    """
+
+    def __init__(self, store, limits, namespace='rate'):
+        self.store = store
+        self.limits = limits
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self.allowed = collections.Counter()
+        self.limited = collections.Counter()
+
+    def hit(self, endpoint: str, client: str) -> float:
+        """Count one request; 0 when admitted, else seconds until one would be."""
+        limit = self.limits.get(endpoint)
+        if limit is None:
+            return 0.0
+        interval = limit.period / limit.requests
+        window = limit.burst * interval
+
+        def step(tat):
+            now = time.time()
+            tat = max(tat or now, now) + interval
+            if tat - now > window:
+                return tat - interval, tat - now - window  # unchanged bucket, wait
+            return tat, 0.0
+
+        try:
+            retry_after = self.store.update(self.namespace, f"{endpoint}:{client}", step, window + interval)
+        except TokenStoreContention:
+            retry_after = interval  # the same client is racing itself
+        with self._lock:
+            (self.limited if retry_after else self.allowed)[endpoint] += 1
+        return retry_after
+
+    def metrics(self) -> dict:
+        return {
+            'limits': {name: dict(limit._asdict()) for name, limit in self.limits.items()},
+            'allowed': dict(self.allowed),
+            'limited': dict(self.limited)
+        }
+
+
+def rate_limited(limiter, endpoint, client_key):
+    """Route decorator: 429 with Retry-After once client_key() exceeds the endpoint's limit."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            retry_after = limiter.hit(endpoint, client_key())
+            if retry_after:
+                return jsonify({"error": "too_many_requests",
+                                "error_description": f"rate limit for {endpoint} exceeded"}), 429, \
+                    {"Retry-After": str(max(1, math.ceil(retry_after)))}
+            return view(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class ConcurrencyLimiter:
+    """
+    Admission control: at most `limit` requests in flight at once across
+    every worker sharing the store (per process with the memory store). The
+    holders live in one store entry, {holder token: lease expiry}, changed
+    with a single atomic TokenStore.update() per attempt; expired leases
+    (a worker killed mid-request) are dropped by the next update, so a lease
+    must outlast the slowest request. A request that gets no place within
+    `wait` seconds is rejected rather than queued.
+    """
+
+    def __init__(self, store, limit, lease=120, wait=0.0, poll_interval=0.05,
+                 namespace='slot', name='credential'):
+        self.store = store
+        self.limit = limit
+        self.lease = lease
+        self.wait = wait
+        self.poll_interval = poll_interval
+        self.namespace = namespace
+        self.name = name
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    def _try_acquire(self, token) -> bool:
+        def take(holders):
+            now = time.time()
+            holders = {h: expires for h, expires in (holders or {}).items() if expires > now}
+            if len(holders) >= self.limit:
+                return holders, False
+            holders[token] = now + self.lease
+            return holders, True
+
+        try:
+            return self.store.update(self.namespace, self.name, take, self.lease)
+        except TokenStoreContention:
+            return False
+
+    def acquire(self):
+        """Return a holder token, or None when no place freed up within `wait` seconds."""
+        token = secrets.token_urlsafe(12)
+        deadline = time.monotonic() + self.wait
+        while not self._try_acquire(token):
+            if time.monotonic() >= deadline:
+                with self._lock:
+                    self.rejected += 1
+                return None
+            time.sleep(self.poll_interval)
+        with self._lock:
+            self.in_flight += 1
+            self.admitted += 1
+        return token
+
+    def release(self, token):
+        """Give back this holder's place only; a lease that already expired is not touched."""
+        def drop(holders):
+            holders = dict(holders or {})
+            holders.pop(token, None)
+            return holders, None
+
+        try:
+            self.store.update(self.namespace, self.name, drop, self.lease)
+        except TokenStoreContention:
+            pass  # the lease expires on its own
+        with self._lock:
+            self.in_flight -= 1
+
+    def metrics(self) -> dict:
+        return {
+            'limit': self.limit,
+            'in_flight': self.in_flight,
+            'admitted': self.admitted,
+            'rejected': self.rejected
+        }
+
+
+def admission_controlled(limiter, retry_after=1):
+    """Route decorator: 503 with Retry-After when the limiter has no free slot."""
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if limiter is None or limiter.limit <= 0:
+                return view(*args, **kwargs)
+            token = limiter.acquire()
+            if token is None:
+                return jsonify({"error": "temporarily_unavailable",
+                                "error_description": "too many concurrent requests"}), 503, \
+                    {"Retry-After": str(retry_after)}
+            try:
+                return view(*args, **kwargs)
+            finally:
+                limiter.release(token)
+        return wrapper
+    return decorator
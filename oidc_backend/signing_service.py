@@ -0,0 +1,177 @@
+import atexit
+import collections
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import jwt  # PyJWT
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.utils import decode_dss_signature
+
+# Recent latencies kept for percentile reporting
+LATENCY_WINDOW = 1024
+
+# ---------------------------------------------------------------------
+# Worker side: the issuer key is derived once per worker process
+# ---------------------------------------------------------------------
+_worker_key = None
+
+def _init_worker(issuer_d_hex: str):
+    global _worker_key
+    _worker_key = ec.derive_private_key(int(issuer_d_hex, 16), ec.SECP256R1())
+
+def _sign_es256_raw(tbs: bytes) -> bytes:
+    """ECDSA P-256/SHA-256 over tbs with the issuer key; COSE raw r||s form."""
+    r, s = decode_dss_signature(_worker_key.sign(tbs, ec.ECDSA(hashes.SHA256())))
+    return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+
+def _sign_jwt(payload: dict, headers: dict, key=None) -> str:
+    """Sign a JWT with key, or with the issuer key if None."""
+    key = _worker_key if key is None else key
+    return jwt.encode(payload, key, algorithm=headers.get("alg", "ES256"), headers=headers)
+
+def _build_mdoc_pymdoccbor(doctype: str, data: dict, device_cose_key: dict, validity: dict, cert_path: str) -> bytes:
+    """Run the pymdoccbor build (which signs the MSO internally) with the issuer key."""
+    from pymdoccbor.mdoc.issuer import MdocCborIssuer
+
+    d = _worker_key.private_numbers().private_value.to_bytes(32, "big")
+    issuer = MdocCborIssuer(
+        private_key={"KTY": "EC2", "CURVE": "P_256", "ALG": "ES256", "D": d, "KID": b"issuer-demo-kid"},
+        alg="ES256"
+    )
+    issuer.new(doctype=doctype, data=data, devicekeyinfo=device_cose_key,
+               validity=validity, cert_path=cert_path)
+    dump_issuersigned = getattr(issuer, "dump_issuersigned", None)
+    return dump_issuersigned() if callable(dump_issuersigned) else issuer.dump()
+
+
+# ---------------------------------------------------------------------
+# Caller side
+# ---------------------------------------------------------------------
+class SigningService:
+    """
+    Signing executor backed by a process pool holding the issuer key.
+
+    With ``workers=0`` requests run inline on the calling thread (same code
+    path, same metrics), which keeps development setups single-process. The
+    pool is created lazily and per PID, so it is never inherited across a
+    gunicorn fork. By then the app has background threads running, so the
+    default "forkserver" start method starts workers from a clean server
+    process that preloads only this module (the issuer key is derived in the
+    initializer; workers still re-import ``__main__``, which under gunicorn
+    is its launcher). "fork" would copy locks held by those threads into the
+    child and can deadlock it.
+    """
+
+    def __init__(self, issuer_d_hex: str, workers: int = 0, timeout: float = 30.0,
+                 start_method: str = "forkserver"):
+        self.issuer_d_hex = issuer_d_hex
+        self.workers = workers
+        self.timeout = timeout
+        self.start_method = start_method
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self._inline_ready = False
+
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._latency_total = 0.0
+        self._latency_max = 0.0
+        self._latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        atexit.register(self.shutdown)
+
+    def _get_pool(self):
+        pid = os.getpid()
+        if self._pool is None or self._pool_pid != pid:
+            with self._lock:
+                if self._pool is None or self._pool_pid != pid:
+                    context = multiprocessing.get_context(self.start_method)
+                    if self.start_method == "forkserver":
+                        context.set_forkserver_preload([__name__])
+                    self._pool = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=context,
+                        initializer=_init_worker,
+                        initargs=(self.issuer_d_hex,)
+                    )
+                    self._pool_pid = pid
+        return self._pool
+
+    def _record(self, started: float, ok: bool):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._pending -= 1
+            if ok:
+                self._completed += 1
+            else:
+                self._failed += 1
+            self._latency_total += elapsed
+            self._latency_max = max(self._latency_max, elapsed)
+            self._latencies.append(elapsed)
+
+    def _run(self, fn, *args, inline=False):
+        started = time.perf_counter()
+        with self._lock:
+            self._pending += 1
+        ok = False
+        try:
+            if self.workers > 0 and not inline:
+                result = self._get_pool().submit(fn, *args).result(timeout=self.timeout)
+            else:
+                if not self._inline_ready:
+                    _init_worker(self.issuer_d_hex)
+                    self._inline_ready = True
+                result = fn(*args)
+            ok = True
+            return result
+        finally:
+            self._record(started, ok)
+
+    def sign_cose_sign1(self, tbs: bytes) -> bytes:
+        """Sign a COSE_Sign1 Sig_structure with the issuer key (raw r||s)."""
+        return self._run(_sign_es256_raw, tbs)
+
+    def sign_jwt(self, payload: dict, headers: dict, private_key=None) -> str:
+        """
+        Sign a JWT with private_key (e.g. a holder key) or the issuer key if
+        None. Caller keys are used in-process: shipping one to a worker means
+        serializing it on every call, which costs more than the signature.
+        """
+        if private_key is not None:
+            return self._run(_sign_jwt, payload, headers, private_key, inline=True)
+        return self._run(_sign_jwt, payload, headers)
+
+    def build_mdoc_pymdoccbor(self, doctype: str, data: dict, device_cose_key: dict,
+                              validity: dict, cert_path: str) -> bytes:
+        """Run the whole pymdoccbor build, since it signs the MSO internally."""
+        return self._run(_build_mdoc_pymdoccbor, doctype, data, device_cose_key, validity, cert_path)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            done = self._completed + self._failed
+            recent = sorted(self._latencies)
+        def pct(p):
+            return round(recent[min(len(recent) - 1, int(len(recent) * p))] * 1000, 3) if recent else 0.0
+        return {
+            'mode': 'process_pool' if self.workers > 0 else 'inline',
+            'workers': self.workers,
+            'queue_depth': self._pending,
+            'completed': self._completed,
+            'failed': self._failed,
+            'latency_ms': {
+                'avg': round(self._latency_total / done * 1000, 3) if done else 0.0,
+                'p50': pct(0.50),
+                'p95': pct(0.95),
+                'max': round(self._latency_max * 1000, 3)
+            }
+        }
+
+    def shutdown(self):
+        pool, self._pool = self._pool, None
+        if pool is not None and self._pool_pid == os.getpid():
+            pool.shutdown(wait=False, cancel_futures=True)
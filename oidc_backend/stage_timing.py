@@ -0,0 +1,122 @@
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+
+# Histogram bucket upper bounds in milliseconds (an implicit +Inf bucket follows)
+DEFAULT_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+# Stages recorded by the current request, as [(name, elapsed_ns)]
+_request_stages = contextvars.ContextVar("request_stages", default=None)
+
+
+class StageHistogram:
+    __slots__ = ("counts", "count", "total_ns", "max_ns")
+
+    def __init__(self, n_buckets):
+        self.counts = [0] * (n_buckets + 1)
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+
+class StageTimings:
+    """
+    Per-stage latency histograms for the issuance pipelines.
+
+    ``with timings.stage("issue.mdoc_build"):`` measures the block with
+    perf_counter_ns and adds it to the stage's histogram. Stages recorded on a
+    thread that called begin_request() are also kept for that request, so they
+    can be reported in a Server-Timing header. Stages timed on executor threads
+    only go to the histograms. Histograms are per process.
+    """
+
+    def __init__(self, buckets_ms=DEFAULT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self._bounds_ns = [int(b * 1_000_000) for b in self.buckets_ms]
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def begin_request(self):
+        _request_stages.set([])
+
+    def request_stages(self):
+        return _request_stages.get() or []
+
+    def record(self, name: str, elapsed_ns: int):
+        with self._lock:
+            hist = self._stages.get(name)
+            if hist is None:
+                hist = self._stages[name] = StageHistogram(len(self._bounds_ns))
+            hist.counts[bisect.bisect_left(self._bounds_ns, elapsed_ns)] += 1
+            hist.count += 1
+            hist.total_ns += elapsed_ns
+            hist.max_ns = max(hist.max_ns, elapsed_ns)
+        stages = _request_stages.get()
+        if stages is not None:
+            stages.append((name, elapsed_ns))
+
+    @contextlib.contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter_ns() - started)
+
+    def timed(self, name: str, fn):
+        """Wrap fn so every call is recorded as stage `name`."""
+        def wrapper(*args, **kwargs):
+            with self.stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+
+    def _quantile_ms(self, counts, count, max_ns, q):
+        """Upper bound of the bucket holding the q-quantile (max for the +Inf bucket)."""
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            seen += n
+            if seen >= rank and n:
+                return self.buckets_ms[i] if i < len(self.buckets_ms) else round(max_ns / 1e6, 3)
+        return 0.0
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stages = {
+                name: (list(h.counts), h.count, h.total_ns, h.max_ns)
+                for name, h in self._stages.items()
+            }
+        result = {}
+        for name, (counts, count, total_ns, max_ns) in sorted(stages.items()):
+            cumulative, buckets = 0, []
+            for bound, n in zip(list(self.buckets_ms) + ["+Inf"], counts):
+                cumulative += n
+                buckets.append({'le': bound, 'count': cumulative})
+            result[name] = {
+                'count': count,
+                'sum_ms': round(total_ns / 1e6, 3),
+                'avg_ms': round(total_ns / count / 1e6, 3) if count else 0.0,
+                'max_ms': round(max_ns / 1e6, 3),
+                'p50_ms': self._quantile_ms(counts, count, max_ns, 0.50),
+                'p95_ms': self._quantile_ms(counts, count, max_ns, 0.95),
+                'p99_ms': self._quantile_ms(counts, count, max_ns, 0.99),
+                'buckets': buckets
+            }
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+
+
+def server_timing_header(stages, total_ns=None) -> str:
+    """Format [(name, elapsed_ns)] as a Server-Timing header value (durations in ms)."""
+    totals = {}
+    for name, elapsed_ns in stages:
+        totals[name] = totals.get(name, 0) + elapsed_ns
+    parts = [f"{name};dur={elapsed_ns / 1e6:.3f}" for name, elapsed_ns in totals.items()]
+    if total_ns is not None:
+        parts.append(f"total;dur={total_ns / 1e6:.3f}")
+    return ", ".join(parts)
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for the batch issuance API (/api/issue_credentials/batch)
+"""
+import requests
+import json
+import uuid
+from datetime import datetime
+
+# API base URL
+BASE_URL = "http://localhost:5000"
+
+def generate_unique_credential_id(prefix="BATCH"):
+    """Generate a unique credential ID"""
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    unique_part = uuid.uuid4().hex[:8].upper()
+    return f"{prefix}-{timestamp}-{unique_part}"
+
+def test_issue_credentials_batch(count=10):
+    """Issue a batch with valid items plus one duplicate and one invalid item"""
+    print(f"🧪 Testing issue_credentials/batch API with {count} credentials...")
+
+    items = [
+        {
+            "credential_id": generate_unique_credential_id(),
+            "subject_id": f"did:test:batch-{i}",
+            "type": "Account",
+            "given_name": "Batch",
+            "family_name": f"Holder{i}"
+        }
+        for i in range(count)
+    ]
+    items.append(dict(items[0]))                 # duplicate within the batch
+    items.append({"type": "Account"})            # missing credential_id / subject_id
+
+    try:
+        response = requests.post(
+            f"{BASE_URL}/api/issue_credentials/batch",
+            json={"credentials": items},
+            headers={"Content-Type": "application/json"},
+            stream=True
+        )
+
+        if response.status_code != 200:
+            print(f"❌ Failed to issue batch: {response.status_code}")
+            print(f"   Error: {response.text}")
+            return []
+
+        issued, failed, summary = [], [], None
+        for line in response.iter_lines():
+            if not line:
+                continue
+            result = json.loads(line)
+            if 'summary' in result:
+                summary = result['summary']
+            elif result['success']:
+                issued.append(result)
+            else:
+                failed.append(result)
+
+        print(f"✅ Batch completed: {summary}")
+        for result in failed:
+            print(f"   - item {result['index']} failed as expected: {result['error']}")
+
+        if len(issued) == count and len(failed) == 2:
+            print("✅ Per-item results match expectations")
+        else:
+            print(f"❌ Expected {count} issued / 2 failed, got {len(issued)} / {len(failed)}")
+        return [result['mdoc']['base64url'] for result in issued]
+
+    except Exception as e:
+        print(f"❌ Error testing issue_credentials/batch: {e}")
+        return []
+
+def test_verify_batch_sample(credentials):
+    """Verify the first issued credential from the batch"""
+    print("\n🧪 Verifying a credential from the batch...")
+
+    if not credentials:
+        print("❌ No credential to verify")
+        return
+
+    try:
+        response = requests.post(
+            f"{BASE_URL}/api/verify_credential",
+            json={"credential": credentials[0], "verifier": "Test-Batch-Verifier"},
+            headers={"Content-Type": "application/json"}
+        )
+        result = response.json()
+        print(f"   Result: {result.get('verification', {}).get('result')}")
+    except Exception as e:
+        print(f"❌ Error verifying batch credential: {e}")
+
+def main():
+    print("=" * 60)
+    print("Testing Batch Issuance API")
+    print("=" * 60)
+
+    credentials = test_issue_credentials_batch()
+    test_verify_batch_sample(credentials)
+
+    print("\n" + "=" * 60)
+    print("Test completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
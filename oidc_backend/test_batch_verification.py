@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Test script for the batch verification API (/api/verify_credentials/batch)
+"""
+import requests
+import json
+import uuid
+from datetime import datetime
+
+# API base URL
+BASE_URL = "http://localhost:5000"
+
+def issue_test_credential():
+    """Issue one credential to verify"""
+    credential_id = f"VERIFY-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8].upper()}"
+    response = requests.post(
+        f"{BASE_URL}/api/issue_credential",
+        json={"credential_id": credential_id, "subject_id": "did:test:verify", "type": "Account"},
+        headers={"Content-Type": "application/json"}
+    )
+    if response.status_code != 201:
+        print(f"❌ Failed to issue test credential: {response.status_code}")
+        return None
+    return response.json()['mdoc']['base64url']
+
+def read_results(response):
+    results, summary = [], None
+    for line in response.iter_lines():
+        if not line:
+            continue
+        result = json.loads(line)
+        if 'summary' in result:
+            summary = result['summary']
+        else:
+            results.append(result)
+    return results, summary
+
+def test_verify_batch_json(credential, count=20):
+    """Verify a JSON array with valid credentials plus one invalid item"""
+    print(f"🧪 Testing verify_credentials/batch (JSON) with {count} credentials...")
+    items = [credential] * count + ["not-a-credential"]
+    try:
+        response = requests.post(
+            f"{BASE_URL}/api/verify_credentials/batch",
+            json={"credentials": items, "verifier": "Batch-Processor"},
+            stream=True
+        )
+        if response.status_code != 200:
+            print(f"❌ Failed to verify batch: {response.status_code}")
+            print(f"   Error: {response.text}")
+            return
+        results, summary = read_results(response)
+        print(f"✅ Batch completed: {summary}")
+        if summary and summary['passed'] == count and summary['failed'] == 1:
+            print("✅ Per-item results match expectations")
+        else:
+            print(f"❌ Expected {count} passed / 1 failed")
+        hits = sum(1 for r in results if r.get('verification', {}).get('cache_hit'))
+        print(f"   Cache hits: {hits}/{count}")
+    except Exception as e:
+        print(f"❌ Error testing verify_credentials/batch: {e}")
+
+def test_verify_batch_ndjson(credential, count=5):
+    """Verify the same credential sent as an NDJSON stream"""
+    print(f"\n🧪 Testing verify_credentials/batch (NDJSON) with {count} credentials...")
+    body = "".join(json.dumps({"credential": credential, "verifier": "Partner-System-A"}) + "\n"
+                   for _ in range(count))
+    try:
+        response = requests.post(
+            f"{BASE_URL}/api/verify_credentials/batch",
+            data=body,
+            headers={"Content-Type": "application/x-ndjson"},
+            stream=True
+        )
+        results, summary = read_results(response)
+        print(f"✅ Batch completed: {summary}" if summary and summary['passed'] == count
+              else f"❌ Unexpected result: {summary}")
+    except Exception as e:
+        print(f"❌ Error testing NDJSON batch: {e}")
+
+def main():
+    print("=" * 60)
+    print("Testing Batch Verification API")
+    print("=" * 60)
+
+    credential = issue_test_credential()
+    if credential:
+        test_verify_batch_json(credential)
+        test_verify_batch_ndjson(credential)
+
+    print("\n" + "=" * 60)
+    print("Test completed!")
+    print("=" * 60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Test script for Idempotency-Key on the OID4VCI /credential endpoint
+"""
+import base64
+import time
+import uuid
+
+import jwt
+import requests
+from cryptography.hazmat.primitives.asymmetric import ec
+
+# API base URL
+BASE_URL = "http://localhost:5000"
+PRE_AUTH_GRANT = "urn:ietf:params:oauth:grant-type:pre-authorized_code"
+
+def get_access_token():
+    """Run /offer and /token; returns the /token response"""
+    offer = requests.post(f"{BASE_URL}/offer").json()["credential_offer"]
+    code = offer["grants"][PRE_AUTH_GRANT]["pre-authorized_code"]
+    response = requests.post(f"{BASE_URL}/token", data={"grant_type": PRE_AUTH_GRANT, "pre-authorized_code": code})
+    response.raise_for_status()
+    return response.json()
+
+def create_proof_jwt(audience, nonce):
+    """Proof of possession for a fresh holder key"""
+    key = ec.generate_private_key(ec.SECP256R1())
+    numbers = key.public_key().public_numbers()
+    b64 = lambda i: base64.urlsafe_b64encode(i.to_bytes(32, "big")).rstrip(b"=").decode()
+    jwk = {"kty": "EC", "crv": "P-256", "x": b64(numbers.x), "y": b64(numbers.y)}
+    return jwt.encode({"aud": audience, "iat": int(time.time()), "nonce": nonce}, key, algorithm="ES256",
+                      headers={"typ": "openid4vci-proof+jwt", "jwk": jwk})
+
+def test_replay_requires_original_token():
+    """A stored /credential response is only replayed to the access token that created it"""
+    print("🧪 Testing Idempotency-Key replay on /credential...")
+
+    metadata = requests.get(f"{BASE_URL}/.well-known/openid-credential-issuer").json()
+    token = get_access_token()
+    body = {
+        "credential_configuration_id": next(iter(metadata["credential_configurations_supported"])),
+        "proofs": {"jwt": [create_proof_jwt(metadata["credential_issuer"], token["c_nonce"])]}
+    }
+    key = {"Idempotency-Key": f"test-{uuid.uuid4().hex}"}
+    auth = {"Authorization": f"Bearer {token['access_token']}"}
+
+    first = requests.post(f"{BASE_URL}/credential", json=body, headers={**key, **auth})
+    retry = requests.post(f"{BASE_URL}/credential", json=body, headers={**key, **auth})
+    anonymous = requests.post(f"{BASE_URL}/credential", json=body, headers=key)
+    other = {"Authorization": f"Bearer {get_access_token()['access_token']}"}
+    other_caller = requests.post(f"{BASE_URL}/credential", json=body, headers={**key, **other})
+
+    checks = [
+        ("first request issues", first.status_code == 200),
+        ("retry with the same token is replayed",
+         retry.status_code == 200 and retry.headers.get("Idempotent-Replayed") == "true" and retry.text == first.text),
+        ("retry without a token is refused",
+         anonymous.status_code == 401 and "Idempotent-Replayed" not in anonymous.headers),
+        ("same key from another token is not replayed", "Idempotent-Replayed" not in other_caller.headers),
+    ]
+    for name, ok in checks:
+        print(f"   {'✅' if ok else '❌'} {name}")
+    return all(ok for _, ok in checks)
+
+def main():
+    print("=== Idempotency-Key Tests ===")
+    ok = test_replay_requires_original_token()
+    print("✅ All checks passed" if ok else "❌ Some checks failed")
+
+if __name__ == "__main__":
+    main()
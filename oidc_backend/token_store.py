@@ -0,0 +1,409 @@
+import abc
+import collections
+import datetime
+import json
+import os
+import threading
+import time
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from models import TokenStoreEntry
+
+
+class TokenStoreContention(RuntimeError):
+    """update() lost its compare-and-set race too many times in a row."""
+
+
+class TokenStore(abc.ABC):
+    """
+    Short-lived OID4VCI state (pre-authorized codes, access tokens, used
+    c_nonces, rate-limit buckets) keyed by (namespace, key). Values are
+    JSON-serialisable and expire after their TTL; consume() is an atomic
+    get-and-delete, so a single-use value is handed out at most once across
+    every worker sharing the backend.
+    """
+
+    backend = None
+
+    @abc.abstractmethod
+    def put(self, namespace: str, key: str, value, ttl: float):
+        """Store the value, replacing any existing entry."""
+
+    @abc.abstractmethod
+    def get(self, namespace: str, key: str):
+        """Return the value, or None when missing or expired."""
+
+    @abc.abstractmethod
+    def consume(self, namespace: str, key: str):
+        """Atomically remove and return the value, or None when missing or expired."""
+
+    @abc.abstractmethod
+    def add(self, namespace: str, key: str, value, ttl: float) -> bool:
+        """Atomically store the value unless a live entry exists; True when stored."""
+
+    @abc.abstractmethod
+    def update(self, namespace: str, key: str, fn, ttl: float):
+        """
+        Atomically replace the value with fn(current) and return fn's result.
+        fn gets None when the entry is missing or expired and returns
+        (new_value, result); it may run more than once under contention.
+        """
+
+    @abc.abstractmethod
+    def delete(self, namespace: str, key: str):
+        """Remove the entry if present."""
+
+    def metrics(self) -> dict:
+        return {'backend': self.backend}
+
+
+class _Shard:
+    __slots__ = ("lock", "entries", "wheel", "expirations", "evictions")
+
+    def __init__(self, slots):
+        self.lock = threading.Lock()
+        self.entries = collections.OrderedDict()  # (namespace, key) -> (expires_ts, value), oldest first
+        self.wheel = [set() for _ in range(slots)]  # tick % slots -> keys expiring in that tick
+        self.expirations = 0  # counters are only touched under the shard lock
+        self.evictions = 0
+
+
+class MemoryTokenStore(TokenStore):
+    """
+    Per-process store (correct with a single worker, any number of threads).
+
+    Entries are spread over lock-striped shards so concurrent requests rarely
+    contend. Expiry is active: every key is also filed in its shard's timer
+    wheel under its expiry tick, and a background sweeper clears the slots
+    that came due each tick, touching only keys that expire then (keys a full
+    wheel turn or more away are re-filed). Reads check the deadline too, so an
+    entry is never served late. Past max_entries a shard evicts its oldest
+    entries. The sweeper is started lazily per PID.
+    """
+
+    backend = 'memory'
+
+    def __init__(self, max_entries=100000, shards=16, tick=1.0, wheel_slots=512):
+        self.max_entries = max_entries
+        self.tick = tick
+        self._shards = [_Shard(wheel_slots) for _ in range(shards)]
+        self._shard_cap = max(1, max_entries // shards)
+        self._slots = wheel_slots
+        self._swept_tick = int(time.time() / tick)
+        self._sweeper_pid = None
+        self._sweeper_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.sweeps = 0
+        self.last_sweep_ms = 0.0
+
+    def _shard(self, ck) -> _Shard:
+        return self._shards[hash(ck) % len(self._shards)]
+
+    def _ensure_sweeper(self):
+        pid = os.getpid()
+        if self._sweeper_pid == pid:
+            return
+        with self._sweeper_lock:
+            if self._sweeper_pid != pid:
+                threading.Thread(target=self._run_sweeper, name="token-store-sweeper", daemon=True).start()
+                self._sweeper_pid = pid
+
+    def _store_locked(self, shard, ck, value, expires_ts):
+        shard.entries[ck] = (expires_ts, value)
+        shard.entries.move_to_end(ck)
+        shard.wheel[int(expires_ts / self.tick) % self._slots].add(ck)
+        while len(shard.entries) > self._shard_cap:
+            shard.entries.popitem(last=False)  # its wheel entry is dropped when swept
+            shard.evictions += 1
+
+    def put(self, namespace, key, value, ttl):
+        self._ensure_sweeper()
+        ck = (namespace, key)
+        shard = self._shard(ck)
+        with shard.lock:
+            self._store_locked(shard, ck, value, time.time() + ttl)
+
+    def add(self, namespace, key, value, ttl):
+        self._ensure_sweeper()
+        ck = (namespace, key)
+        shard = self._shard(ck)
+        now = time.time()
+        with shard.lock:
+            entry = shard.entries.get(ck)
+            if entry is not None and entry[0] > now:
+                return False
+            self._store_locked(shard, ck, value, now + ttl)
+            return True
+
+    def update(self, namespace, key, fn, ttl):
+        self._ensure_sweeper()
+        ck = (namespace, key)
+        shard = self._shard(ck)
+        now = time.time()
+        with shard.lock:
+            entry = shard.entries.get(ck)
+            value, result = fn(entry[1] if entry is not None and entry[0] > now else None)
+            self._store_locked(shard, ck, value, now + ttl)
+        return result
+
+    def get(self, namespace, key):
+        ck = (namespace, key)
+        shard = self._shard(ck)
+        with shard.lock:
+            entry = shard.entries.get(ck)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    def consume(self, namespace, key):
+        ck = (namespace, key)
+        shard = self._shard(ck)
+        with shard.lock:
+            entry = shard.entries.pop(ck, None)
+        if entry is None or entry[0] <= time.time():
+            return None
+        return entry[1]
+
+    def delete(self, namespace, key):
+        ck = (namespace, key)
+        shard = self._shard(ck)
+        with shard.lock:
+            shard.entries.pop(ck, None)
+
+    # ---------- active expiry ----------------------------------------
+    def _run_sweeper(self):
+        while not self._stop.wait(self.tick):
+            self.sweep()
+
+    def sweep(self, now=None):
+        """Expire everything filed under the ticks that have passed since the last sweep."""
+        started = time.perf_counter()
+        now = now or time.time()
+        current = int(now / self.tick)
+        first = max(self._swept_tick, current - self._slots + 1)
+        for tick in range(first, current + 1):
+            slot = tick % self._slots
+            for shard in self._shards:
+                with shard.lock:
+                    due, shard.wheel[slot] = shard.wheel[slot], set()
+                    for ck in due:
+                        entry = shard.entries.get(ck)
+                        if entry is None:
+                            continue  # consumed, deleted or evicted
+                        entry_tick = int(entry[0] / self.tick)
+                        if entry[0] <= now:
+                            del shard.entries[ck]
+                            shard.expirations += 1
+                        elif entry_tick % self._slots == slot:
+                            shard.wheel[slot].add(ck)  # due in a later turn of the wheel
+        self._swept_tick = current
+        self.sweeps += 1
+        self.last_sweep_ms = round((time.perf_counter() - started) * 1000, 3)
+
+    def shutdown(self):
+        self._stop.set()
+
+    def metrics(self) -> dict:
+        return {
+            'backend': self.backend,
+            'size': sum(len(shard.entries) for shard in self._shards),
+            'max_entries': self.max_entries,
+            'shards': len(self._shards),
+            'expirations': sum(shard.expirations for shard in self._shards),
+            'evictions': sum(shard.evictions for shard in self._shards),
+            'sweeps': self.sweeps,
+            'last_sweep_ms': self.last_sweep_ms
+        }
+
+
+class PostgresTokenStore(TokenStore):
+    """
+    token_store table shared by all workers and nodes. On PostgreSQL the
+    migration creates it UNLOGGED: no WAL, so writes are cheap, and the
+    contents are lost on a crash, which is acceptable for tokens that live
+    minutes. consume() is a single DELETE ... RETURNING; update() reads the
+    row FOR UPDATE and writes it back with a compare-and-set UPDATE (retried
+    only when the row did not exist yet). Also works on SQLite for
+    development.
+    """
+
+    backend = 'postgres'
+
+    def __init__(self, session_factory, purge_interval=60):
+        self.session_factory = session_factory
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+
+    @staticmethod
+    def _encode(value) -> str:
+        return json.dumps(value, separators=(',', ':'))
+
+    def put(self, namespace, key, value, ttl):
+        now = datetime.datetime.utcnow()
+        row = {'namespace': namespace, 'key': key, 'value': self._encode(value),
+               'expires': now + datetime.timedelta(seconds=ttl)}
+        with self.session_factory() as session:
+            dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(session.get_bind().dialect.name)
+            if dialect is not None:
+                stmt = dialect.insert(TokenStoreEntry).values(**row)
+                session.execute(stmt.on_conflict_do_update(
+                    index_elements=[TokenStoreEntry.namespace, TokenStoreEntry.key],
+                    set_={'value': stmt.excluded.value, 'expires': stmt.excluded.expires}))
+            else:
+                session.merge(TokenStoreEntry(**row))
+            session.commit()
+            self._purge(session)
+
+    def add(self, namespace, key, value, ttl):
+        now = datetime.datetime.utcnow()
+        row = {'namespace': namespace, 'key': key, 'value': self._encode(value),
+               'expires': now + datetime.timedelta(seconds=ttl)}
+        with self.session_factory() as session:
+            dialect = {'postgresql': postgresql, 'sqlite': sqlite}.get(session.get_bind().dialect.name)
+            if dialect is not None:
+                # an expired row with the same key is replaced, a live one wins
+                stmt = dialect.insert(TokenStoreEntry).values(**row)
+                added = session.execute(stmt.on_conflict_do_update(
+                    index_elements=[TokenStoreEntry.namespace, TokenStoreEntry.key],
+                    set_={'value': stmt.excluded.value, 'expires': stmt.excluded.expires},
+                    where=TokenStoreEntry.expires <= now)).rowcount
+            else:
+                try:
+                    session.add(TokenStoreEntry(**row))
+                    session.flush()
+                    added = 1
+                except IntegrityError:
+                    session.rollback()
+                    added = 0
+            session.commit()
+            self._purge(session)
+        return bool(added)
+
+    def update(self, namespace, key, fn, ttl, attempts=8):
+        # the row is locked (FOR UPDATE; ignored by SQLite, which serialises
+        # writers) and the UPDATE also checks it is still the row read
+        for _ in range(attempts):
+            now = datetime.datetime.utcnow()
+            with self.session_factory() as session:
+                row = session.execute(select(TokenStoreEntry.value, TokenStoreEntry.expires).where(
+                    TokenStoreEntry.namespace == namespace, TokenStoreEntry.key == key).with_for_update()).first()
+                value, result = fn(json.loads(row.value) if row is not None and row.expires > now else None)
+                if row is None:
+                    stored = False
+                else:
+                    stored = session.execute(update(TokenStoreEntry).where(
+                        TokenStoreEntry.namespace == namespace, TokenStoreEntry.key == key,
+                        TokenStoreEntry.value == row.value, TokenStoreEntry.expires == row.expires
+                    ).values(value=self._encode(value),
+                             expires=now + datetime.timedelta(seconds=ttl))).rowcount == 1
+                    session.commit()
+            if stored or (row is None and self.add(namespace, key, value, ttl)):
+                return result
+        raise TokenStoreContention(f"token store update of {namespace}:{key} kept conflicting")
+
+    def get(self, namespace, key):
+        with self.session_factory() as session:
+            value = session.scalar(select(TokenStoreEntry.value).where(
+                TokenStoreEntry.namespace == namespace, TokenStoreEntry.key == key,
+                TokenStoreEntry.expires > datetime.datetime.utcnow()))
+        return json.loads(value) if value is not None else None
+
+    def consume(self, namespace, key):
+        with self.session_factory() as session:
+            value = session.scalar(delete(TokenStoreEntry).where(
+                TokenStoreEntry.namespace == namespace, TokenStoreEntry.key == key,
+                TokenStoreEntry.expires > datetime.datetime.utcnow()
+            ).returning(TokenStoreEntry.value))
+            session.commit()
+        return json.loads(value) if value is not None else None
+
+    def delete(self, namespace, key):
+        with self.session_factory() as session:
+            session.execute(delete(TokenStoreEntry).where(
+                TokenStoreEntry.namespace == namespace, TokenStoreEntry.key == key))
+            session.commit()
+
+    def _purge(self, session):
+        """Delete expired rows, at most once per purge_interval per process."""
+        if time.time() - self._last_purge < self.purge_interval:
+            return
+        self._last_purge = time.time()
+        session.execute(delete(TokenStoreEntry).where(TokenStoreEntry.expires <= datetime.datetime.utcnow()))
+        session.commit()
+
+
+class RedisTokenStore(TokenStore):
+    """
+    Any server speaking the Redis protocol (Redis, Valkey, KeyDB, or a local
+    stand-in). Keys are "<prefix><namespace>:<key>" with a PX expiry; consume()
+    runs GET + DEL in one MULTI/EXEC transaction and update() is a WATCH-ed
+    read-modify-write. Needs the redis package.
+    """
+
+    backend = 'redis'
+
+    def __init__(self, url, prefix='oid4vci:', client=None):
+        if client is None:
+            import redis  # only needed for this backend
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    def _key(self, namespace, key):
+        return f"{self.prefix}{namespace}:{key}"
+
+    def put(self, namespace, key, value, ttl):
+        self.client.set(self._key(namespace, key), json.dumps(value, separators=(',', ':')),
+                        px=max(1, int(ttl * 1000)))
+
+    def get(self, namespace, key):
+        value = self.client.get(self._key(namespace, key))
+        return json.loads(value) if value is not None else None
+
+    def consume(self, namespace, key):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.get(self._key(namespace, key))
+        pipe.delete(self._key(namespace, key))
+        value, deleted = pipe.execute()
+        return json.loads(value) if value is not None and deleted else None
+
+    def add(self, namespace, key, value, ttl):
+        return bool(self.client.set(self._key(namespace, key), json.dumps(value, separators=(',', ':')),
+                                    px=max(1, int(ttl * 1000)), nx=True))
+
+    def update(self, namespace, key, fn, ttl, attempts=8):
+        from redis.exceptions import WatchError
+        name = self._key(namespace, key)
+        with self.client.pipeline() as pipe:
+            for _ in range(attempts):
+                try:
+                    pipe.watch(name)  # EXEC fails if another client writes the key meanwhile
+                    current = pipe.get(name)
+                    value, result = fn(json.loads(current) if current is not None else None)
+                    pipe.multi()
+                    pipe.set(name, json.dumps(value, separators=(',', ':')), px=max(1, int(ttl * 1000)))
+                    pipe.execute()
+                    return result
+                except WatchError:
+                    continue
+        raise TokenStoreContention(f"token store update of {name} kept conflicting")
+
+    def delete(self, namespace, key):
+        self.client.delete(self._key(namespace, key))
+
+
+def create_token_store(backend, session_factory=None, url=None, prefix='oid4vci:',
+                       max_entries=100000, shards=16) -> TokenStore:
+    """Build the store named by TOKEN_STORE_BACKEND (memory, postgres or redis)."""
+    if backend == 'memory':
+        return MemoryTokenStore(max_entries=max_entries, shards=shards)
+    if backend == 'postgres':
+        return PostgresTokenStore(session_factory)
+    if backend == 'redis':
+        if not url:
+            raise ValueError("TOKEN_STORE_URL is required for the redis token store")
+        return RedisTokenStore(url, prefix=prefix)
+    raise ValueError(f"Unknown token store backend: {backend}")
@@ -0,0 +1,202 @@
+import collections
+import datetime
+import glob
+import hashlib
+import os
+import threading
+
+import cbor2
+from cryptography import x509
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from pycose.keys.curves import P256, P384, P521
+from pycose.keys.ec2 import EC2Key
+
+from ttl_cache import LRUTTLCache
+
+COSE_HEADER_KID = 4
+COSE_HEADER_X5CHAIN = 33
+
+_COSE_CURVES = {"secp256r1": (P256, 32), "secp384r1": (P384, 48), "secp521r1": (P521, 66)}
+
+# kid: key id it was registered under (or None); fingerprint: SHA-256 hex of the
+# leaf certificate DER (or None for bare keys); public_key: cryptography key;
+# cose_key: the same key as a pycose EC2Key; not_after: epoch seconds or None
+TrustedKey = collections.namedtuple("TrustedKey", "kid fingerprint public_key cose_key not_after source")
+
+
+class UntrustedIssuer(ValueError):
+    """The credential's signing key does not resolve to a trusted issuer."""
+
+
+def _cose_key(public_key) -> EC2Key:
+    if not isinstance(public_key, ec.EllipticCurvePublicKey) or public_key.curve.name not in _COSE_CURVES:
+        raise UntrustedIssuer("only EC P-256/P-384/P-521 issuer keys are supported")
+    crv, size = _COSE_CURVES[public_key.curve.name]
+    nums = public_key.public_numbers()
+    return EC2Key(crv=crv, x=nums.x.to_bytes(size, "big"), y=nums.y.to_bytes(size, "big"))
+
+
+def _utc_ts(dt) -> float:
+    return dt.replace(tzinfo=datetime.timezone.utc).timestamp()
+
+
+def _load_cert(data: bytes) -> x509.Certificate:
+    if data.lstrip().startswith(b"-----BEGIN"):
+        return x509.load_pem_x509_certificate(data)
+    return x509.load_der_x509_certificate(data)
+
+
+class TrustStore:
+    """
+    Issuer verification keys, resolved from a COSE_Sign1's headers.
+
+    Keys are indexed by kid (header 4) and by certificate fingerprint. An
+    x5chain (header 33) is parsed and validated against the trust anchors the
+    first time it is seen; the outcome, good or bad, is cached per distinct
+    chain until the TTL or the leaf's notAfter, so repeat verifications cost
+    one hash and dict lookups. A chain is trusted when its last certificate is
+    an anchor or was issued by one, and every certificate is within validity.
+    """
+
+    def __init__(self, chain_cache_size=1000, chain_cache_ttl=3600, default_key=None):
+        self._by_kid = {}
+        self._by_fingerprint = {}
+        self._anchors = {}          # fingerprint -> x509.Certificate
+        self._lock = threading.Lock()
+        self._chains = LRUTTLCache(max_entries=chain_cache_size, ttl_seconds=chain_cache_ttl)
+        self.default_key = default_key
+        self.chain_validations = 0
+        self.rejections = 0
+
+    # ---------- registration -----------------------------------------
+    def add_key(self, kid, public_key, source="configured") -> TrustedKey:
+        """Trust a bare public key under a kid (str or bytes)."""
+        if isinstance(kid, str):
+            kid = kid.encode()
+        key = TrustedKey(kid, None, public_key, _cose_key(public_key), None, source)
+        with self._lock:
+            self._by_kid[kid] = key
+        return key
+
+    def add_anchor(self, cert_der: bytes, kid=None) -> TrustedKey:
+        """Trust a certificate (DER or PEM) as an anchor; its key is indexed too."""
+        cert = _load_cert(cert_der)
+        fingerprint = hashlib.sha256(cert.public_bytes(serialization.Encoding.DER)).hexdigest()
+        key = TrustedKey(kid.encode() if isinstance(kid, str) else kid, fingerprint, cert.public_key(),
+                         _cose_key(cert.public_key()), _utc_ts(cert.not_valid_after), "anchor")
+        with self._lock:
+            self._anchors[fingerprint] = cert
+            self._by_fingerprint[fingerprint] = key
+            if key.kid is not None:
+                self._by_kid[key.kid] = key
+        self._chains.invalidate()
+        return key
+
+    def load_anchor_dir(self, path) -> int:
+        """Add every *.der / *.pem / *.crt file in path as an anchor."""
+        count = 0
+        for pattern in ("*.der", "*.pem", "*.crt"):
+            for file_path in sorted(glob.glob(os.path.join(path, pattern))):
+                with open(file_path, "rb") as f:
+                    self.add_anchor(f.read())
+                count += 1
+        return count
+
+    # ---------- resolution -------------------------------------------
+    def resolve(self, protected: dict, unprotected: dict) -> TrustedKey:
+        """Return the TrustedKey for a COSE_Sign1 header pair or raise UntrustedIssuer."""
+        x5chain = unprotected.get(COSE_HEADER_X5CHAIN, protected.get(COSE_HEADER_X5CHAIN))
+        if x5chain is not None:
+            return self._resolve_chain(x5chain)
+        kid = protected.get(COSE_HEADER_KID, unprotected.get(COSE_HEADER_KID))
+        if kid is not None:
+            key = self._by_kid.get(kid.encode() if isinstance(kid, str) else kid)
+            if key is None:
+                self.rejections += 1
+                raise UntrustedIssuer("unknown kid")
+            return key
+        if self.default_key is not None:
+            return self.default_key
+        self.rejections += 1
+        raise UntrustedIssuer("issuerAuth carries neither kid nor x5chain")
+
+    def resolve_sign1(self, issuer_auth) -> TrustedKey:
+        """resolve() for issuerAuth as [protected bstr, unprotected map, payload, signature]."""
+        protected = cbor2.loads(issuer_auth[0]) if issuer_auth[0] else {}
+        return self.resolve(protected if isinstance(protected, dict) else {}, issuer_auth[1] or {})
+
+    def _resolve_chain(self, x5chain) -> TrustedKey:
+        ders = [x5chain] if isinstance(x5chain, (bytes, bytearray)) else list(x5chain)
+        if not ders or not all(isinstance(d, (bytes, bytearray)) for d in ders):
+            self.rejections += 1
+            raise UntrustedIssuer("malformed x5chain")
+        leaf_fingerprint = hashlib.sha256(ders[0]).hexdigest()
+        chain_key = leaf_fingerprint if len(ders) == 1 else \
+            hashlib.sha256(b"".join(hashlib.sha256(d).digest() for d in ders)).hexdigest()
+
+        cached = self._chains.get(chain_key)
+        if cached is None:
+            cached = self._validate_chain(ders, leaf_fingerprint)
+            expires_at = cached.not_after if isinstance(cached, TrustedKey) else None
+            self._chains.put(chain_key, cached, expires_at=expires_at)
+        if isinstance(cached, TrustedKey):
+            return cached
+        self.rejections += 1
+        raise UntrustedIssuer(cached)
+
+    def _validate_chain(self, ders, leaf_fingerprint):
+        """TrustedKey for the leaf, or the reason (str) the chain is rejected."""
+        self.chain_validations += 1
+        try:
+            certs = [x509.load_der_x509_certificate(bytes(d)) for d in ders]
+        except ValueError:
+            return "x5chain certificate could not be parsed"
+        now = datetime.datetime.utcnow()
+        for cert in certs:
+            if not cert.not_valid_before <= now <= cert.not_valid_after:
+                return "x5chain certificate is expired or not yet valid"
+        try:
+            for child, parent in zip(certs, certs[1:]):
+                child.verify_directly_issued_by(parent)
+        except (ValueError, TypeError, InvalidSignature):
+            return "x5chain is not a valid certificate chain"
+        if not self._anchored(certs[-1], hashlib.sha256(ders[-1]).hexdigest()):
+            return "x5chain does not lead to a trust anchor"
+
+        leaf = certs[0]
+        try:
+            cose_key = _cose_key(leaf.public_key())
+        except UntrustedIssuer as e:
+            return str(e)
+        not_after = min(_utc_ts(cert.not_valid_after) for cert in certs)
+        key = TrustedKey(None, leaf_fingerprint, leaf.public_key(), cose_key, not_after, "x5chain")
+        with self._lock:
+            self._by_fingerprint[leaf_fingerprint] = key
+        return key
+
+    def _anchored(self, top, top_fingerprint) -> bool:
+        if top_fingerprint in self._anchors:
+            return True
+        for anchor in list(self._anchors.values()):
+            try:
+                top.verify_directly_issued_by(anchor)
+            except (ValueError, TypeError, InvalidSignature):
+                continue
+            if anchor.not_valid_before <= datetime.datetime.utcnow() <= anchor.not_valid_after:
+                return True
+        return False
+
+    def by_fingerprint(self, fingerprint):
+        return self._by_fingerprint.get(fingerprint)
+
+    def metrics(self) -> dict:
+        return {
+            'kids': len(self._by_kid),
+            'anchors': len(self._anchors),
+            'fingerprints': len(self._by_fingerprint),
+            'chain_validations': self.chain_validations,
+            'rejections': self.rejections,
+            'chain_cache': self._chains.metrics()
+        }
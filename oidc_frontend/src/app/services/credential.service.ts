@@ -1,7 +1,7 @@
 import { Injectable } from '@angular/core';
 import { HttpClient, HttpHeaders } from '@angular/common/http';
-import { Observable, of, throwError } from 'rxjs';
-import { delay, map, catchError } from 'rxjs/operators';
+import { EMPTY, Observable, of, throwError } from 'rxjs';
+import { delay, map, catchError, expand, reduce } from 'rxjs/operators';
 import {
   Credential,
   CredentialMetrics,
@@ -35,32 +35,39 @@ interface BackendCredentialResponse {
   nonce: string;
 }
 
-interface BackendCredentialsResponse {
+interface BackendCredential {
+  id: number;
+  credential_id: string;
+  subject_id: string;
+  type: string;
+  format: string;
+  status: string;
+  issued: string;
+  expires: string | null;
+}
+
+interface BackendVerificationLog {
+  id: number;
+  checked_at: string;
+  credential_id: string;
+  result: string;
+  response_time: number;
+  verifier: string;
+}
+
+// Listing endpoints return one page at a time; next_cursor is null on the last page
+interface BackendPage<T> {
   success: boolean;
   count: number;
-  data: Array<{
-    id: number;
-    credential_id: string;
-    subject_id: string;
-    type: string;
-    format: string;
-    status: string;
-    issued: string;
-    expires: string | null;
-  }>;
+  limit: number;
+  next_cursor: string | null;
+  total?: number;
+  data: T[];
 }
 
-interface BackendVerificationLogsResponse {
+interface BackendCredentialDetailResponse {
   success: boolean;
-  count: number;
-  data: Array<{
-    id: number;
-    checked_at: string;
-    credential_id: string;
-    result: string;
-    response_time: number;
-    verifier: string;
-  }>;
+  data: BackendCredential;
 }
 
 interface BackendRevokeResponse {
@@ -124,6 +131,7 @@ interface BackendExtendResponse {
 export class CredentialService {
 
   private apiUrl = environment.apiUrl;
+  private listPageSize = 1000;  // the backend's PAGE_SIZE_MAX
   private httpOptions = {
     headers: new HttpHeaders({
       'Content-Type': 'application/json',
@@ -220,8 +228,25 @@ export class CredentialService {
       );
   }
 
+  /**
+   * Fetch every page of a keyset-paginated listing by following next_cursor
+   */
+  private getAllPages<T>(path: string): Observable<{ success: boolean; data: T[] }> {
+    const fetchPage = (cursor: string | null) => this.http.get<BackendPage<T>>(`${this.apiUrl}${path}`, {
+      ...this.httpOptions,
+      params: cursor ? { limit: this.listPageSize, cursor } : { limit: this.listPageSize }
+    });
+    return fetchPage(null).pipe(
+      expand(page => page.success && page.next_cursor ? fetchPage(page.next_cursor) : EMPTY),
+      reduce(
+        (all, page) => ({ success: all.success && page.success, data: all.data.concat(page.data || []) }),
+        { success: true, data: [] as T[] }
+      )
+    );
+  }
+
   getCredentials(): Observable<Credential[]> {
-    return this.http.get<BackendCredentialsResponse>(`${this.apiUrl}/api/credentials`, this.httpOptions)
+    return this.getAllPages<BackendCredential>('/api/credentials')
       .pipe(
         map(response => {
           if (response.success) {
@@ -241,7 +266,7 @@ export class CredentialService {
   }
 
   getVerificationLogs(): Observable<VerificationLog[]> {
-    return this.http.get<BackendVerificationLogsResponse>(`${this.apiUrl}/api/verification-logs`, this.httpOptions)
+    return this.getAllPages<BackendVerificationLog>('/api/verification-logs')
       .pipe(
         map(response => {
           if (response.success) {
@@ -261,9 +286,17 @@ export class CredentialService {
   }
 
   getCredentialById(id: string): Observable<Credential | undefined> {
-    return this.getCredentials().pipe(
-      map(credentials => credentials.find(cred => cred.id === id))
-    );
+    return this.http.get<BackendCredentialDetailResponse>(`${this.apiUrl}/api/credentials/${encodeURIComponent(id)}`, this.httpOptions)
+      .pipe(
+        map(response => response.success ? this.mapBackendCredentialToFrontend(response.data) : undefined),
+        catchError(error => {
+          if (error.status === 404) {
+            return of(undefined);
+          }
+          console.warn('Backend API not available, using mock data:', error);
+          return of(this.mockCredentials.find(cred => cred.id === id));
+        })
+      );
   }
 
   /**